@@ -6,6 +6,7 @@
 
 # ========== IMPORTS ==========
 import streamlit as st
+import os
 import json
 import time
 import pandas as pd
@@ -18,12 +19,14 @@ try:
     from queries import (
         get_occupation_salles,
         get_stats_departement,
-        generer_planning_optimise,
-        detecter_tous_les_conflits,
+        get_stats_departement_freshness,
+        compter_conflits_actifs,
+        detecter_chevauchements,
         get_planning_examens,
         valider_examen,
         valider_tout_le_planning
     )
+    from conflict_browser import render_conflict_browser
 except ImportError:
     # Si les imports échouent, définissez des fonctions vides pour le test
     def execute_query(query, params=None, fetch=False):
@@ -37,10 +40,16 @@ except ImportError:
     def get_stats_departement():
         return pd.DataFrame()
     
-    def generer_planning_optimise(date_debut, date_fin):
-        return pd.DataFrame()
+    def get_stats_departement_freshness():
+        return None
+    
+    def render_conflict_browser(key, page_size=100):
+        st.info("Liste des conflits non disponible")
+    
+    def compter_conflits_actifs():
+        return 0
     
-    def detecter_tous_les_conflits():
+    def detecter_chevauchements(date_debut=None, date_fin=None):
         return pd.DataFrame()
     
     def get_planning_examens():
@@ -54,266 +63,19 @@ except ImportError:
         st.info("Validation globale simulée")
         return True
 
-# ========== CLASSE PRINCIPALE D'OPTIMISATION ==========
-
-class ExamScheduleOptimizer:
-    """
-    Algorithme d'optimisation automatique des emplois du temps
-    Objectif: Générer un planning optimal en < 45 secondes
-    """
-    
-    def __init__(self, start_date: date, end_date: date, department_id: int = None):
-        self.start_date = start_date
-        self.end_date = end_date
-        self.department_id = department_id
-        self.conflicts = []
-        self.generated_schedule = []
-        
-    def load_data(self):
-        """Charge toutes les données nécessaires depuis la BD"""
-        start_time = time.time()
-        
-        # Appeler la fonction SQL d'optimisation
-        query = """
-        SELECT * FROM load_optimization_data(%s, %s, %s)
-        """
-        
-        self.modules_data = execute_query(
-            query, 
-            (self.start_date, self.end_date, self.department_id)
-        )
-        
-        # Charger les salles disponibles
-        self.rooms = execute_query("""
-            SELECT id, nom, capacite, type, batiment
-            FROM lieux_examen
-            WHERE is_disponible = TRUE
-            ORDER BY capacite DESC
-        """)
-        
-        # Charger les professeurs
-        self.professors = execute_query("""
-            SELECT id, nom, prenom, departement_id, heures_max
-            FROM professeurs
-            WHERE is_active = TRUE
-            ORDER BY departement_id
-        """)
-        
-        load_time = time.time() - start_time
-        st.info(f"⚡ Données chargées en {load_time:.2f}s")
-        
-        return len(self.modules_data or []) > 0
-    
-    def generate_schedule(self):
-        """
-        Génère le planning optimisé automatiquement
-        Algorithme principal d'optimisation
-        """
-        start_time = time.time()
-        
-        st.info("🔄 Génération du planning en cours...")
-        
-        progress_bar = st.progress(0)
-        status_text = st.empty()
-        
-        # Étape 1: Tri par priorité (30% du temps)
-        status_text.text("📊 Calcul des priorités...")
-        modules_sorted = self._sort_modules_by_priority()
-        progress_bar.progress(30)
-        
-        # Étape 2: Attribution des salles (40% du temps)
-        status_text.text("🏫 Attribution des salles...")
-        schedule_with_rooms = self._assign_rooms(modules_sorted)
-        progress_bar.progress(70)
-        
-        # Étape 3: Résolution des conflits (30% du temps)
-        status_text.text("⚠️ Résolution des conflits...")
-        final_schedule = self._resolve_conflicts(schedule_with_rooms)
-        progress_bar.progress(100)
-        
-        generation_time = time.time() - start_time
-        
-        status_text.empty()
-        progress_bar.empty()
-        
-        if generation_time < 45:
-            st.success(f"✅ Planning généré en {generation_time:.2f}s (< 45s)")
-        else:
-            st.warning(f"⚠️ Planning généré en {generation_time:.2f}s (> 45s)")
-        
-        self.generated_schedule = final_schedule
-        return final_schedule
-    
-    def _sort_modules_by_priority(self):
-        """Trie les modules par priorité"""
-        if not self.modules_data:
-            return []
-        
-        sorted_modules = []
-        for module in self.modules_data:
-            priority_score = self._calculate_priority(module)
-            sorted_modules.append({
-                **module,
-                'priority_score': priority_score
-            })
-        
-        return sorted(sorted_modules, key=lambda x: x['priority_score'], reverse=True)
-    
-    def _calculate_priority(self, module):
-        """Calcule le score de priorité d'un module"""
-        score = 0
-        
-        # Critère 1: Nombre d'étudiants (40%)
-        student_count = module.get('student_count', 0)
-        score += (student_count / 100) * 40
-        
-        # Critère 2: Nombre de crédits (30%)
-        credits = module.get('credits', 0)
-        score += (credits / 12) * 30
-        
-        # Critère 3: Priorité département (30%)
-        if self.department_id and module.get('departement_id') == self.department_id:
-            score += 30
-        
-        return score
-    
-    def _assign_rooms(self, modules):
-        """Attribue les salles optimales"""
-        schedule = []
-        
-        for module in modules:
-            student_count = module.get('student_count', 0)
-            
-            # Trouver la salle la plus adaptée
-            best_room = self._find_best_room(student_count)
-            
-            if best_room:
-                # Trouver un créneau disponible
-                time_slot = self._find_available_slot(module, best_room)
-                
-                if time_slot:
-                    schedule.append({
-                        'module_id': module['module_id'],
-                        'module_name': module['module_name'],
-                        'room_id': best_room['id'],
-                        'room_name': best_room['nom'],
-                        'professor_id': module.get('professor_id'),
-                        'exam_time': time_slot,
-                        'duration_minutes': module.get('duration_minutes', 120),
-                        'student_count': student_count,
-                        'priority_score': module.get('priority_score', 0)
-                    })
-        
-        return schedule
-    
-    def _find_best_room(self, student_count):
-        """Trouve la meilleure salle pour un nombre d'étudiants"""
-        if not self.rooms:
-            return None
-        
-        # Chercher une salle avec capacité >= 60% remplie
-        for room in self.rooms:
-            capacity = room.get('capacite', 0)
-            if capacity == 0:
-                continue
-            
-            occupation_rate = (student_count / capacity) * 100
-            
-            # Salle idéale: entre 60% et 90% d'occupation
-            if 60 <= occupation_rate <= 90:
-                return room
-        
-        # Sinon, prendre la plus petite salle suffisante
-        for room in sorted(self.rooms, key=lambda x: x.get('capacite', 0)):
-            if room.get('capacite', 0) >= student_count:
-                return room
-        
-        return None
-    
-    def _find_available_slot(self, module, room):
-        """Trouve un créneau disponible"""
-        current_date = self.start_date
-        
-        while current_date <= self.end_date:
-            # Sauter les week-ends
-            if current_date.weekday() >= 5:
-                current_date += timedelta(days=1)
-                continue
-            
-            # Créneaux possibles: 8h, 10h, 14h, 16h
-            for hour in [8, 10, 14, 16]:
-                slot_time = datetime.combine(current_date, datetime.min.time().replace(hour=hour))
-                
-                # Vérifier si le créneau est libre
-                if self._is_slot_available(slot_time, room['id'], module):
-                    return slot_time
-            
-            current_date += timedelta(days=1)
-        
-        return None
-    
-    def _is_slot_available(self, slot_time, room_id, module):
-        """Vérifie si un créneau est disponible"""
-        # Vérifier dans le planning généré
-        for exam in self.generated_schedule:
-            if exam['room_id'] == room_id:
-                exam_time = exam['exam_time']
-                exam_end = exam_time + timedelta(minutes=exam['duration_minutes'])
-                slot_end = slot_time + timedelta(minutes=module.get('duration_minutes', 120))
-                
-                # Chevauchement?
-                if not (slot_end <= exam_time or slot_time >= exam_end):
-                    return False
-        
-        return True
-    
-    def _resolve_conflicts(self, schedule):
-        """Résout les conflits dans le planning"""
-        # Détection rapide des conflits
-        conflicts = self._detect_conflicts(schedule)
-        
-        if not conflicts:
-            return schedule
-        
-        # Résolution simple: décaler les examens en conflit
-        resolved_schedule = schedule.copy()
-        
-        for conflict in conflicts:
-            # Logique de résolution à implémenter
-            pass
-        
-        return resolved_schedule
-    
-    def _detect_conflicts(self, schedule):
-        """Détecte tous les conflits"""
-        conflicts = []
-        
-        # Conflit 1: Étudiants avec > 1 examen/jour
-        # Conflit 2: Professeurs avec > 3 examens/jour
-        # Conflit 3: Chevauchements de salles
-        
-        return conflicts
-    
-    def save_schedule(self):
-        """Sauvegarde le planning dans la BD"""
-        if not self.generated_schedule:
-            return False, "Aucun planning à sauvegarder"
-        
-        try:
-            # Convertir en JSON pour la fonction SQL
-            schedule_json = json.dumps(self.generated_schedule, default=str)
-            
-            query = "SELECT save_optimized_schedule(%s::jsonb)"
-            result = execute_query(query, (schedule_json,), fetch=True)
-            
-            if result:
-                count = result[0].get('save_optimized_schedule', 0)
-                return True, f"✅ {count} examens sauvegardés"
-            
-            return False, "Erreur lors de la sauvegarde"
-            
-        except Exception as e:
-            return False, f"Erreur: {str(e)}"
+from generation_jobs import submit_job, get_job, discard_job, TERMINE, ANNULE
+from schedule_checkpoint import new_checkpoint_path, list_checkpoints
+from exam_optimizer import (
+    ExamScheduleOptimizer,
+    CONSTRUCTION_STRATEGIES,
+    IMPROVEMENT_STRATEGIES,
+    build_schedule
+)
+from schedule_scenarios import Scenario, run_scenarios, compare_scenarios
+from schedule_scoring import DEFAULT_WEIGHTS
+from schedule_profiling import PROFILING_MODES, COUNTER_LABELS
+from session_batch import SessionBatch, SESSIONS, build_sessions
+from conflict_suggestions import compute_suggestions, apply_suggestion
 
 
 def admin_dashboard():
@@ -414,6 +176,7 @@ def admin_dashboard():
         [
             "🏠 Tableau de bord",
             "🚀 Génération optimisée",
+            "🧪 Scénarios",
             "⚠️ Conflits",
             "✅ Validation"
         ],
@@ -465,9 +228,7 @@ def admin_dashboard():
             )
         """, 0.0)
 
-        conflits_total = q1("""
-            SELECT COUNT(*) FROM (SELECT * FROM detecter_conflits()) _
-        """, 0)
+        conflits_total = compter_conflits_actifs()
 
         taux_confirmes = q1("""
             SELECT ROUND(
@@ -508,6 +269,9 @@ def admin_dashboard():
         section_header("📈 Statistiques par département")
         stats = get_stats_departement()
         if not stats.empty:
+            refreshed_at = get_stats_departement_freshness()
+            if refreshed_at:
+                st.caption(f"🕒 Données au {refreshed_at:%d/%m/%Y %H:%M}")
             st.dataframe(stats, use_container_width=True, height=300 if compact else 400)
         else:
             st.info("Aucune statistique disponible.")
@@ -523,7 +287,7 @@ def admin_dashboard():
                 FROM examens e JOIN inscriptions i USING(module_id)
                 WHERE i.statut = 'Inscrit' AND e.statut IN ('Planifie','Confirme')
                 GROUP BY etudiant_id, DATE(date_heure)
-                HAVING COUNT(*) > 1
+                HAVING COUNT(DISTINCT e.module_id) > 1
               ) _) AS etu_viol,
               (SELECT COUNT(*) FROM (
                 SELECT professeur_id, DATE(date_heure)
@@ -536,8 +300,10 @@ def admin_dashboard():
                 SELECT e.id
                 FROM examens e
                 JOIN lieux_examen l ON e.salle_id = l.id
-                JOIN (SELECT module_id, COUNT(*) nb FROM inscriptions WHERE statut='Inscrit' GROUP BY module_id) i ON e.module_id = i.module_id
-                WHERE e.statut IN ('Planifie','Confirme') AND i.nb > l.capacite
+                JOIN v_inscrits_module i ON e.module_id = i.module_id
+                  AND i.session = session_examen(e.type_examen)
+                WHERE e.statut IN ('Planifie','Confirme')
+                  AND CASE WHEN e.groupe_examen IS NULL THEN i.nb_inscrits ELSE e.max_etudiants END > l.capacite
               ) _) AS cap_viol
         """, {"etu_viol": 0, "prof_viol": 0, "cap_viol": 0})
 
@@ -569,31 +335,358 @@ def admin_dashboard():
             return
 
         st.markdown("### Options d'optimisation")
-        opt1 = st.toggle("Optimiser occupation salles", True)
-        opt2 = st.toggle("Équilibrer surveillances profs", True)
-        opt3 = st.toggle("Priorité département", True)
-
-        if st.button("🚀 Lancer génération", type="primary", use_container_width=True):
-            with st.spinner("Génération en cours..."):
-                start_time = datetime.now()
-                try:
-                    df = generer_planning_optimise(date_debut, date_fin)
-                    elapsed = (datetime.now() - start_time).total_seconds()
-                    st.success(f"✅ Généré en {elapsed:.2f}s {'🎯' if elapsed < 45 else '⚠️'}")
-                    st.dataframe(df, use_container_width=True, height=500)
-
-                    if not df.empty and "score_optimisation" in df.columns:
-                        fig = px.histogram(df, x="score_optimisation", nbins=20, title="Distribution du score d'optimisation")
-                        st.plotly_chart(fig, use_container_width=True)
-
-                    st.download_button(
-                        "📥 Télécharger planning (CSV)",
-                        df.to_csv(index=False).encode("utf-8"),
-                        "planning_genere.csv",
-                        "text/csv"
+        # Critères du score (schedule_scoring.DEFAULT_WEIGHTS): un critère désactivé pèse 0
+        # dans l'évaluation et dans la phase d'amélioration
+        criteria = {
+            "remplissage": st.toggle("Optimiser occupation salles", True),
+            "equilibre_profs": st.toggle("Équilibrer surveillances profs", True),
+            "priorite_departement": st.toggle("Priorité département", True),
+        }
+        score_weights = {name: 0.0 for name, enabled in criteria.items() if not enabled} or None
+
+        s1, s2, s3 = st.columns(3)
+        with s1:
+            construction = st.selectbox("Construction", list(CONSTRUCTION_STRATEGIES),
+                                        format_func=CONSTRUCTION_STRATEGIES.get)
+        with s2:
+            improvement = st.selectbox("Amélioration", list(IMPROVEMENT_STRATEGIES),
+                                       format_func=IMPROVEMENT_STRATEGIES.get)
+        with s3:
+            time_budget = st.slider("Budget de temps (s)", 5, 300, 45, step=5,
+                                    disabled=improvement == "aucune")
+        profiling = st.selectbox("Profilage", list(PROFILING_MODES), format_func=PROFILING_MODES.get,
+                                 help="Mesures détaillées de la génération (l'échantillonnage coûte peu, cProfile ralentit)")
+
+        # Session de rattrapage générée dans la même tâche (mêmes salles, inscriptions en échec)
+        with_rattrapage = st.toggle("Générer aussi la session de rattrapage", False)
+        periods = {"Principale": (date_debut, date_fin)}
+        if with_rattrapage:
+            r1, r2 = st.columns(2)
+            with r1:
+                rattrapage_debut = st.date_input("Début du rattrapage", value=date_fin + timedelta(days=7))
+            with r2:
+                rattrapage_fin = st.date_input("Fin du rattrapage", value=date_fin + timedelta(days=21))
+            if rattrapage_debut >= rattrapage_fin:
+                st.error("La fin du rattrapage doit être après son début.")
+                return
+            periods["Rattrapage"] = (rattrapage_debut, rattrapage_fin)
+
+        # La génération tourne en arrière-plan: la session ne garde que l'identifiant de la tâche
+        job_id = st.session_state.get("generation_job_id")
+        job = get_job(job_id) if job_id else None
+
+        if job is None:
+            with st.expander("♻️ Reprise et démarrage à chaud"):
+                checkpoints = list_checkpoints()
+                checkpoint = st.selectbox(
+                    "Point de reprise",
+                    checkpoints,
+                    format_func=os.path.basename,
+                    index=None,
+                    placeholder="Aucun" if not checkpoints else "Choisir une génération interrompue"
+                )
+                warm_file = st.file_uploader("Ou planning enregistré (CSV exporté)", type="csv")
+
+            if st.button("🚀 Lancer génération", type="primary", use_container_width=True):
+                warm_start = pd.read_csv(warm_file) if warm_file is not None else None
+
+                def run_generation(job, debut=date_debut, fin=date_fin, construction=construction,
+                                   improvement=improvement, time_budget=time_budget, profiling=profiling,
+                                   checkpoint=checkpoint, warm_start=warm_start, periods=periods,
+                                   score_weights=score_weights):
+                    callbacks = {'progress_callback': job.update, 'cancel_event': job.cancel_event,
+                                 'profiling': profiling, 'score_weights': score_weights}
+                    if len(periods) > 1 and not checkpoint:
+                        batch = build_sessions(
+                            periods, construction=construction, improvement=improvement,
+                            time_budget=time_budget, **callbacks
+                        )
+                        if not batch.generated_schedule:
+                            raise ValueError("Aucun module à planifier sur ces périodes")
+                        return batch
+                    if checkpoint:
+                        return ExamScheduleOptimizer.resume(
+                            checkpoint, improvement=improvement, time_budget=time_budget, **callbacks
+                        )
+
+                    optimizer = build_schedule(
+                        debut, fin,
+                        construction=construction,
+                        improvement=improvement,
+                        time_budget=time_budget,
+                        initial_schedule=warm_start,
+                        checkpoint_path=new_checkpoint_path(debut, fin),
+                        **callbacks
                     )
-                except Exception as e:
-                    st.error(f"Erreur lors de la génération : {str(e)}")
+                    if not optimizer.modules_data:
+                        raise ValueError("Aucun module à planifier sur cette période")
+                    return optimizer
+
+                label = os.path.basename(checkpoint) if checkpoint else " + ".join(
+                    f"{session} {start} → {end}" if len(periods) > 1 else f"{start} → {end}"
+                    for session, (start, end) in periods.items()
+                )
+                job = submit_job(run_generation, label)
+                st.session_state["generation_job_id"] = job.id
+                st.rerun()
+
+        elif job.is_running:
+            progress = job.snapshot()
+            st.progress(min(int(progress.get("pourcentage", 0)), 100), text=progress.get("phase", "Génération en cours..."))
+            m1, m2, m3, m4 = st.columns(4)
+            with m1: kpi_card("📦 Modules placés", f"{progress.get('modules_places', 0)}/{progress.get('modules_total', '-')}")
+            with m2: kpi_card("🎯 Remplissage salles", f"{progress.get('objectif', 0)}%")
+            with m3: kpi_card("🚫 Modules non placés", progress.get("non_places", 0),
+                              tone="warn" if progress.get("non_places") else "ok")
+            with m4: kpi_card("⏱️ Durée", f"{job.elapsed:.1f}s")
+
+            if st.button("⛔ Annuler la génération", use_container_width=True):
+                job.cancel()
+            time.sleep(1)
+            st.rerun()
+
+        elif job.status == TERMINE and isinstance(job.result, SessionBatch):
+            batch = job.result
+            st.success(f"✅ {len(batch.optimizers)} sessions générées en {batch.generation_time:.2f}s — {job.label}")
+            st.dataframe(batch.summary(), use_container_width=True, hide_index=True)
+            if batch.conflicts:
+                st.warning(f"⚠️ {len(batch.conflicts)} conflit(s) restant(s)")
+
+            tabs = st.tabs([SESSIONS[session][0] for session in batch.optimizers])
+            for tab, session_optimizer in zip(tabs, batch.optimizers.values()):
+                with tab:
+                    st.dataframe(session_optimizer.schedule_dataframe(), use_container_width=True, height=400)
+
+            st.download_button(
+                "📥 Télécharger les sessions (CSV)",
+                batch.schedule_dataframe().to_csv(index=False).encode("utf-8"),
+                "planning_sessions.csv",
+                "text/csv"
+            )
+
+            c1, c2 = st.columns(2)
+            with c1:
+                if st.button("💾 Enregistrer les sessions", type="primary", use_container_width=True):
+                    success, message = batch.save_schedule()
+                    if success:
+                        discard_job(job.id)
+                        st.session_state.pop("generation_job_id", None)
+                        st.success(message)
+                    else:
+                        st.error(message)
+            with c2:
+                if st.button("🗑️ Abandonner ces plannings", use_container_width=True):
+                    discard_job(job.id)
+                    st.session_state.pop("generation_job_id", None)
+                    st.rerun()
+
+            if batch.publish_report:
+                st.markdown("### ❌ Rapport de rejet")
+                st.dataframe(pd.DataFrame(batch.publish_report), use_container_width=True, hide_index=True)
+
+        elif job.status == TERMINE:
+            optimizer = job.result
+            elapsed = optimizer.generation_time
+            st.success(f"✅ Généré en {elapsed:.2f}s {'🎯' if elapsed < 45 else '⚠️'} — {job.label}")
+
+            score_report = optimizer.score_report
+            if score_report:
+                cols = st.columns(1 + len(score_report["composantes"]))
+                with cols[0]: kpi_card("🎯 Score global", f"{score_report['global']:.1f}/100")
+                for col, (name, value) in zip(cols[1:], score_report["composantes"].items()):
+                    with col: kpi_card(name.replace("_", " ").capitalize(), f"{value:.0f}")
+            if optimizer.conflicts:
+                st.warning(f"⚠️ {len(optimizer.conflicts)} conflit(s) restant(s)")
+            if optimizer.unplaced_modules:
+                st.warning(f"⚠️ {len(optimizer.unplaced_modules)} module(s) non placé(s)")
+            stats = optimizer.improvement_stats
+            if stats:
+                st.info(f"🔧 {IMPROVEMENT_STRATEGIES[stats['strategie']]} : score {stats['score_initial']:.1f} → "
+                        f"{stats['score_final']:.1f} en {stats['duree']:.1f}s "
+                        f"({stats['iterations']} essais, {stats['acceptes']} déplacements gardés)")
+
+            df = optimizer.schedule_dataframe()
+            st.dataframe(df, use_container_width=True, height=500)
+
+            st.markdown("### 📐 Qualité du planning")
+            bounds = optimizer.lower_bounds
+            if bounds.get("jours_min", 0) > bounds.get("jours_disponibles", 0):
+                st.error(f"❌ Période trop courte : au moins {bounds['jours_min']} jours sont nécessaires "
+                         f"({bounds['jours_disponibles']} jours ouvrés disponibles)")
+            if bounds.get("creneaux_min", 0) > bounds.get("creneaux_disponibles", 0):
+                st.error(f"❌ Capacité des salles insuffisante : au moins {bounds['creneaux_min']} créneaux nécessaires")
+            gap = pd.DataFrame(optimizer.optimality_gap())
+            st.dataframe(gap, use_container_width=True, hide_index=True)
+            st.caption("Borne : valeur minimale atteignable pour cette instance. Un écart élevé indique "
+                       "qu'un budget de calcul supplémentaire peut améliorer le planning.")
+
+            if not df.empty and "score_optimisation" in df.columns:
+                fig = px.histogram(df, x="score_optimisation", nbins=20, title="Distribution du score d'optimisation")
+                st.plotly_chart(fig, use_container_width=True)
+
+            profile = optimizer.profiling_report()
+            if profile:
+                with st.expander(f"🔬 Profilage — {PROFILING_MODES[profile['mode']]}"):
+                    p1, p2 = st.columns(2)
+                    with p1:
+                        st.markdown("**Durée par phase**")
+                        phases = pd.DataFrame(list(profile["phases"].items()), columns=["Phase", "Durée (s)"])
+                        st.dataframe(phases, use_container_width=True, hide_index=True)
+                    with p2:
+                        st.markdown("**Compteurs**")
+                        counters = pd.DataFrame(
+                            [(COUNTER_LABELS.get(name, name), value) for name, value in profile["compteurs"].items()],
+                            columns=["Compteur", "Valeur"]
+                        )
+                        st.dataframe(counters, use_container_width=True, hide_index=True)
+                    if profile["points_chauds"]:
+                        st.markdown("**Points chauds** (temps propre décroissant)")
+                        st.dataframe(pd.DataFrame(profile["points_chauds"]), use_container_width=True, hide_index=True)
+                        if profile["mode"] == "echantillonnage":
+                            st.caption(f"{profile['echantillons']} échantillons : durées estimées.")
+                    e1, e2 = st.columns(2)
+                    with e1:
+                        st.download_button(
+                            "📥 Exporter le profilage (JSON)",
+                            optimizer.profiler.to_json(optimizer.phase_times).encode("utf-8"),
+                            "profilage_generation.json",
+                            "application/json"
+                        )
+                    raw_profile = optimizer.profiler.profile_bytes()
+                    if raw_profile:
+                        with e2:
+                            st.download_button(
+                                "📥 Capture cProfile (.prof)",
+                                raw_profile,
+                                "generation.prof",
+                                "application/octet-stream"
+                            )
+
+            # Export au format des placements: rechargeable pour un démarrage à chaud
+            st.download_button(
+                "📥 Télécharger planning (CSV)",
+                pd.DataFrame(optimizer.generated_schedule).to_csv(index=False).encode("utf-8"),
+                "planning_genere.csv",
+                "text/csv"
+            )
+
+            c1, c2 = st.columns(2)
+            with c1:
+                if st.button("💾 Enregistrer le planning", type="primary", use_container_width=True):
+                    success, message = optimizer.save_schedule()
+                    if success:
+                        discard_job(job.id)
+                        st.session_state.pop("generation_job_id", None)
+                        st.success(message)
+                    else:
+                        st.error(message)
+            with c2:
+                if st.button("🗑️ Abandonner ce planning", use_container_width=True):
+                    discard_job(job.id)
+                    st.session_state.pop("generation_job_id", None)
+                    st.rerun()
+
+            if optimizer.publish_report:
+                st.markdown("### ❌ Rapport de rejet")
+                report = pd.DataFrame(optimizer.publish_report)
+                st.dataframe(report, use_container_width=True, hide_index=True)
+                st.download_button(
+                    "📥 Télécharger le rapport (CSV)",
+                    report.to_csv(index=False).encode("utf-8"),
+                    "rapport_rejet.csv",
+                    "text/csv"
+                )
+
+        else:
+            if job.status != ANNULE:
+                st.error(f"Erreur lors de la génération : {job.error}")
+            else:
+                st.warning("⛔ Génération annulée.")
+            if st.button("🔄 Nouvelle génération", use_container_width=True):
+                discard_job(job.id)
+                st.session_state.pop("generation_job_id", None)
+                st.rerun()
+
+    # =====================================================
+    # PAGE 2 bis — SCÉNARIOS « ET SI »
+    # =====================================================
+    elif page == "🧪 Scénarios":
+        section_header("🧪 Scénarios « et si »", "Comparer des variantes du planning sans modifier les examens")
+
+        col1, col2 = st.columns(2)
+        with col1:
+            date_debut = st.date_input("Date de début", value=datetime.today().date(), key="scn_debut")
+        with col2:
+            date_fin = st.date_input("Date de fin", value=(datetime.today() + timedelta(days=21)).date(), key="scn_fin")
+
+        # Données de base chargées une seule fois, partagées par tous les scénarios
+        base = st.session_state.get("scenario_base")
+        if base is None or (base.start_date, base.end_date) != (date_debut, date_fin):
+            if st.button("📥 Charger les données de la période", type="primary", use_container_width=True):
+                base = ExamScheduleOptimizer(date_debut, date_fin)
+                with st.spinner("Chargement..."):
+                    base.load_data()
+                st.session_state["scenario_base"] = base
+                st.session_state["scenarios"] = [Scenario("Référence")]
+                st.session_state.pop("scenario_results", None)
+                st.rerun()
+            return
+
+        st.caption(f"{len(base.modules_data)} modules, {len(base.rooms)} salles, {len(base.professors)} professeurs")
+        scenarios = st.session_state.setdefault("scenarios", [Scenario("Référence")])
+
+        with st.expander("➕ Nouveau scénario", expanded=len(scenarios) == 1):
+            name = st.text_input("Nom du scénario", value=f"Scénario {len(scenarios)}")
+            closed_rooms = st.multiselect("Salles fermées", [room["nom"] for room in base.rooms])
+            c1, c2 = st.columns(2)
+            with c1:
+                extra_days = st.number_input("Jours ajoutés en fin de période", 0, 30, 0)
+            with c2:
+                shift_days = st.number_input("Décalage de la période (jours)", -30, 30, 0)
+            weights = {}
+            if st.toggle("Pondérations personnalisées", False):
+                wcols = st.columns(len(DEFAULT_WEIGHTS))
+                for wcol, (component, default) in zip(wcols, DEFAULT_WEIGHTS.items()):
+                    with wcol:
+                        weights[component] = st.slider(component.replace("_", " ").capitalize(), 0.0, 1.0, default, 0.05)
+            c3, c4 = st.columns(2)
+            with c3:
+                improvement = st.selectbox("Amélioration", list(IMPROVEMENT_STRATEGIES),
+                                           format_func=IMPROVEMENT_STRATEGIES.get, key="scn_amelioration")
+            with c4:
+                time_budget = st.slider("Budget de temps (s)", 5, 120, 30, step=5, key="scn_budget",
+                                        disabled=improvement == "aucune")
+            if st.button("Ajouter le scénario", use_container_width=True):
+                scenarios.append(Scenario(name, closed_rooms, extra_days, shift_days, weights,
+                                          improvement=improvement, time_budget=time_budget))
+                st.rerun()
+
+        for scenario in scenarios:
+            st.markdown(f"- **{scenario.name}** — {scenario.describe()}")
+
+        c1, c2 = st.columns(2)
+        with c1:
+            if st.button("▶️ Comparer les scénarios", type="primary", use_container_width=True):
+                with st.spinner(f"Génération de {len(scenarios)} scénario(s) en parallèle..."):
+                    st.session_state["scenario_results"] = run_scenarios(base, scenarios)
+        with c2:
+            if st.button("🗑️ Réinitialiser", use_container_width=True):
+                st.session_state["scenarios"] = [Scenario("Référence")]
+                st.session_state.pop("scenario_results", None)
+                st.rerun()
+
+        results = st.session_state.get("scenario_results")
+        if results:
+            comparison = compare_scenarios(results)
+            st.markdown("### 📊 Comparaison")
+            st.dataframe(comparison, use_container_width=True, hide_index=True)
+            fig = px.bar(comparison, x="scenario", y="score_global", color="modules_non_places",
+                         title="Score global par scénario")
+            st.plotly_chart(fig, use_container_width=True)
+
+            selected = st.selectbox("Planning du scénario", range(len(results)),
+                                    format_func=lambda idx: results[idx]["resume"]["scenario"])
+            st.dataframe(results[selected]["planning"], use_container_width=True, height=400)
 
     # =====================================================
     # PAGE 3 — CONFLITS
@@ -601,21 +694,102 @@ def admin_dashboard():
     elif page == "⚠️ Conflits":
         section_header("🔍 Analyse des conflits")
 
-        if st.button("🔍 Détecter les conflits", type="primary", use_container_width=True):
-            with st.spinner("Détection en cours..."):
-                conflits = detecter_tous_les_conflits()
-                st.session_state["conflits"] = conflits
-        else:
-            conflits = st.session_state.get("conflits", pd.DataFrame())
+        # Registre maintenu par triggers: agrégats SQL et lecture page par page
+        render_conflict_browser("admin_conflits")
 
-        if conflits.empty:
-            st.success("🎉 Aucun conflit détecté.")
-        else:
-            st.error(f"⚠️ {len(conflits)} conflit(s) détecté(s)")
-            if "severite" in conflits.columns:
-                fig = px.histogram(conflits, x="severite", title="Répartition par sévérité")
-                st.plotly_chart(fig, use_container_width=True)
-            st.dataframe(conflits, use_container_width=True, height=500)
+        section_header("💡 Suggestions de résolution")
+        st.caption("Pour chaque conflit ouvert, les meilleurs déplacements (créneau, salle) faisables, "
+                   "classés par conflits résolus moins conflits créés.")
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            sug_debut = st.date_input("Début", value=datetime.today().date(), key="sug_debut")
+        with col2:
+            sug_fin = st.date_input("Fin", value=(datetime.today() + timedelta(days=60)).date(), key="sug_fin")
+        with col3:
+            sug_k = st.number_input("Suggestions par conflit", min_value=1, max_value=10, value=3, key="sug_k")
+
+        if st.button("💡 Calculer les suggestions", use_container_width=True):
+            with st.spinner("Calcul des suggestions..."):
+                nb, duree = compute_suggestions(sug_debut, sug_fin, int(sug_k))
+            st.success(f"✅ Suggestions calculées pour {nb} conflit(s) en {duree:.1f}s")
+
+        suggested = execute_query("""
+            SELECT id, type_conflit, severite, description, suggestions
+            FROM conflits_examens
+            WHERE cle_type IS NOT NULL AND statut <> 'Résolu' AND suggestions IS NOT NULL
+            ORDER BY rang_severite(severite), jour, id
+            LIMIT 20
+        """) or []
+        for conflict in suggested:
+            payload = json.loads(conflict["suggestions"])
+            options = payload.get("deplacements") or []
+            with st.expander(f"{conflict['severite']} • {conflict['type_conflit']} — {conflict['description']}"):
+                st.caption(f"Calculé le {payload.get('calcule_le', '-')}")
+                if not options:
+                    st.info("Aucun déplacement faisable trouvé.")
+                for rank, option in enumerate(options):
+                    salles = ", ".join(room["nom"] for room in option["salles"])
+                    st.write(f"**{option['module_nom']}** : {option['ancienne_date'][:16].replace('T', ' ')} → "
+                             f"{option['date_heure'][:16].replace('T', ' ')} ({salles}) • "
+                             f"résout {option['conflits_resolus']}, crée {option['conflits_crees']}")
+                    if st.button("✅ Appliquer", key=f"sug_{conflict['id']}_{rank}"):
+                        success, message = apply_suggestion(option)
+                        if success:
+                            st.success(message)
+                            st.rerun()
+                        else:
+                            st.error(message)
+
+        section_header("⏱️ Chevauchements horaires")
+        st.caption("Recouvrements réels des horaires (début + durée) pour les salles, les surveillants et les étudiants.")
+        col1, col2 = st.columns(2)
+        with col1:
+            chev_debut = st.date_input("Début", value=datetime.today().date(), key="chev_debut")
+        with col2:
+            chev_fin = st.date_input("Fin", value=(datetime.today() + timedelta(days=60)).date(), key="chev_fin")
+
+        if st.button("⏱️ Contrôler les chevauchements", use_container_width=True):
+            with st.spinner("Contrôle en cours..."):
+                st.session_state["chevauchements"] = detecter_chevauchements(chev_debut, chev_fin)
+                # Index réutilisé pour les contrôles de déplacement ci-dessous
+                from queries import OptimizationQueries
+                st.session_state["chev_index"] = OptimizationQueries.build_overlap_index(chev_debut, chev_fin)
+
+        chevauchements = st.session_state.get("chevauchements")
+        if chevauchements is not None:
+            if chevauchements.empty:
+                st.success("🎉 Aucun chevauchement horaire.")
+            else:
+                st.error(f"⚠️ {len(chevauchements)} chevauchement(s)")
+                st.dataframe(chevauchements.groupby("description").size().rename("nombre").reset_index(),
+                             use_container_width=True, hide_index=True)
+                st.dataframe(chevauchements, use_container_width=True, height=400, hide_index=True)
+
+        if "chev_index" in st.session_state:
+            with st.expander("🔁 Vérifier un déplacement"):
+                index, exams_by_id, enrolments = st.session_state["chev_index"]
+                col1, col2, col3 = st.columns(3)
+                with col1:
+                    moved_id = st.number_input("ID de l'examen", min_value=1, step=1, key="chev_exam")
+                with col2:
+                    moved_day = st.date_input("Nouvelle date", key="chev_date")
+                with col3:
+                    moved_time = st.time_input("Nouvelle heure", key="chev_heure")
+                if st.button("Vérifier", key="chev_verifier"):
+                    exam = exams_by_id.get(int(moved_id))
+                    if exam is None:
+                        st.warning("Examen introuvable dans la période contrôlée.")
+                    else:
+                        # Les autres parties d'un module réparti se déplacent avec l'examen
+                        siblings = [other['id'] for other in exams_by_id.values()
+                                    if other['module_id'] == exam['module_id'] and other['date_heure'] == exam['date_heure']]
+                        candidate = dict(exam, date_heure=datetime.combine(moved_day, moved_time))
+                        found = index.check_exam(candidate, enrolments.get(exam['module_id']) or [], ignore=siblings)
+                        if found:
+                            st.error(f"⚠️ {len(found)} chevauchement(s) à ce créneau")
+                            st.dataframe(pd.DataFrame(found), use_container_width=True, hide_index=True)
+                        else:
+                            st.success("✅ Créneau libre pour la salle, le surveillant et les étudiants.")
 
     # =====================================================
     # PAGE 4 — VALIDATION
@@ -636,7 +810,7 @@ def admin_dashboard():
         with col2: kpi_card("⏳ Planifiés", f"{planifies:,}", tone="warn" if planifies > 0 else "ok")
         with col3: kpi_card("✅ Confirmés", f"{confirmes:,}")
 
-        tab1, tab2 = st.tabs(["Validation individuelle", "Validation globale"])
+        tab1, tab2, tab3 = st.tabs(["Validation individuelle", "Validation globale", "Réparation incrémentale"])
 
         with tab1:
             st.dataframe(planning.head(300), use_container_width=True, height=400)
@@ -661,6 +835,39 @@ def admin_dashboard():
                         else:
                             st.error("❌ Erreur lors de la validation globale.")
 
+        with tab3:
+            st.caption("Après un déplacement, une annulation ou une salle rendue indisponible: "
+                       "seuls les examens en conflit sont replacés, le reste du planning est conservé.")
+            col1, col2 = st.columns(2)
+            with col1:
+                rep_debut = st.date_input("Début de la période", value=datetime.today().date(), key="rep_debut")
+            with col2:
+                rep_fin = st.date_input("Fin de la période", value=(datetime.today() + timedelta(days=21)).date(), key="rep_fin")
+            ids_modifies = st.text_input("ID des examens modifiés (séparés par des virgules)", key="rep_ids")
+
+            if st.button("🔧 Calculer les réparations", type="primary"):
+                changed = [int(x) for x in ids_modifies.replace(";", ",").split(",") if x.strip().isdigit()]
+                optimizer = ExamScheduleOptimizer(rep_debut, rep_fin)
+                st.session_state["repair_moves"] = optimizer.reoptimize(changed)
+                st.session_state["repair_optimizer"] = optimizer
+
+            moves = st.session_state.get("repair_moves")
+            if moves is not None:
+                optimizer = st.session_state["repair_optimizer"]
+                if not moves:
+                    st.success(f"✅ Aucun mouvement nécessaire ({optimizer.repair_time * 1000:.0f} ms)")
+                else:
+                    st.info(f"{len(moves)} mouvement(s) calculé(s) en {optimizer.repair_time * 1000:.0f} ms")
+                    st.dataframe(pd.DataFrame(moves), use_container_width=True, hide_index=True)
+                    if st.button("✅ Appliquer les mouvements"):
+                        success, message = optimizer.apply_moves(moves)
+                        if success:
+                            st.success(message)
+                            del st.session_state["repair_moves"]
+                            st.rerun()
+                        else:
+                            st.error(message)
+
 # Point d'entrée pour tester
 if __name__ == "__main__":
     admin_dashboard()
\ No newline at end of file
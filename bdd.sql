@@ -1685,4 +1685,1795 @@ BEGIN
     ORDER BY COUNT(i.etudiant_id) DESC
     LIMIT 20;
 END;
-$$ LANGUAGE plpgsql;
\ No newline at end of file
+$$ LANGUAGE plpgsql;
+-- ============================================
+-- PARTIE 10: EXAMENS RÉPARTIS SUR PLUSIEURS SALLES
+-- ============================================
+
+-- Un module dont l'effectif dépasse la plus grande salle est découpé en parties
+-- (une ligne examens par salle, chacune avec son surveillant) reliées par groupe_examen
+ALTER TABLE examens ADD COLUMN IF NOT EXISTS groupe_examen UUID;
+ALTER TABLE examens ADD COLUMN IF NOT EXISTS partie_num INT;
+ALTER TABLE examens ADD COLUMN IF NOT EXISTS nb_parties INT;
+
+CREATE INDEX IF NOT EXISTS idx_examens_groupe
+ON examens(groupe_examen) WHERE groupe_examen IS NOT NULL;
+
+-- Sauvegarde du planning optimisé (insertion ensembliste, parties comprises)
+CREATE OR REPLACE FUNCTION save_optimized_schedule(
+    p_schedule JSONB
+)
+RETURNS INTEGER AS $$
+DECLARE
+    v_inserted_count INTEGER := 0;
+BEGIN
+    INSERT INTO examens (
+        module_id,
+        professeur_id,
+        salle_id,
+        date_heure,
+        duree_minutes,
+        type_examen,
+        statut,
+        max_etudiants,
+        groupe_examen,
+        partie_num,
+        nb_parties,
+        created_at
+    )
+    SELECT
+        x.module_id,
+        x.professor_id,
+        x.room_id,
+        x.exam_time,
+        x.duration_minutes,
+        'Final',
+        'Planifie',
+        x.student_count,
+        x.split_group,
+        x.part_index,
+        x.part_count,
+        CURRENT_TIMESTAMP
+    FROM jsonb_to_recordset(p_schedule) AS x(
+        module_id INT,
+        professor_id INT,
+        room_id INT,
+        exam_time TIMESTAMP,
+        duration_minutes INT,
+        student_count INT,
+        split_group UUID,
+        part_index INT,
+        part_count INT
+    );
+    
+    GET DIAGNOSTICS v_inserted_count = ROW_COUNT;
+    RETURN v_inserted_count;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Détection des conflits: les parties d'un même module comptent pour un seul examen
+-- et la capacité d'une partie se vérifie sur son effectif (max_etudiants)
+CREATE OR REPLACE FUNCTION detecter_conflits()
+RETURNS TABLE(
+    type_conflit VARCHAR(50),
+    details TEXT,
+    severite VARCHAR(20)
+) AS $$
+BEGIN
+    -- Conflit étudiant: >1 examen/jour
+    RETURN QUERY
+    SELECT 
+        'Étudiant >1 examen/jour'::VARCHAR(50) as type_conflit,
+        ('Étudiant ID: ' || i.etudiant_id || ' a ' || COUNT(DISTINCT e.module_id) || ' examens le ' || DATE(e.date_heure))::TEXT as details,
+        'CRITIQUE'::VARCHAR(20) as severite
+    FROM inscriptions i
+    JOIN examens e ON i.module_id = e.module_id
+    WHERE e.statut IN ('Planifie', 'Confirme')
+    GROUP BY i.etudiant_id, DATE(e.date_heure)
+    HAVING COUNT(DISTINCT e.module_id) > 1;
+    
+    -- Conflit professeur: >3 examens/jour
+    RETURN QUERY
+    SELECT 
+        'Professeur >3 examens/jour'::VARCHAR(50) as type_conflit,
+        ('Professeur ID: ' || e.professeur_id || ' a ' || COUNT(*) || ' examens le ' || DATE(e.date_heure))::TEXT as details,
+        'CRITIQUE'::VARCHAR(20) as severite
+    FROM examens e
+    WHERE e.statut IN ('Planifie', 'Confirme')
+    GROUP BY e.professeur_id, DATE(e.date_heure)
+    HAVING COUNT(*) > 3;
+    
+    -- Conflit salle: chevauchement
+    RETURN QUERY
+    SELECT 
+        'Chevauchement salle'::VARCHAR(50) as type_conflit,
+        ('Salle ID: ' || e1.salle_id || ' - Examens ' || e1.id || ' et ' || e2.id || ' se chevauchent')::TEXT as details,
+        'ÉLEVÉ'::VARCHAR(20) as severite
+    FROM examens e1
+    JOIN examens e2 ON e1.salle_id = e2.salle_id
+    WHERE e1.id < e2.id
+        AND e1.statut IN ('Planifie', 'Confirme')
+        AND e2.statut IN ('Planifie', 'Confirme')
+        AND e1.date_heure < e2.date_heure + (e2.duree_minutes || ' minutes')::INTERVAL
+        AND e2.date_heure < e1.date_heure + (e1.duree_minutes || ' minutes')::INTERVAL;
+    
+    -- Conflit capacité: trop d'étudiants
+    RETURN QUERY
+    SELECT 
+        'Dépassement capacité'::VARCHAR(50) as type_conflit,
+        ('Examen ID: ' || e.id || ' - ' ||
+         CASE WHEN e.groupe_examen IS NULL THEN COUNT(i.etudiant_id) ELSE e.max_etudiants END ||
+         ' étudiants pour ' || l.capacite || ' places')::TEXT as details,
+        'MOYEN'::VARCHAR(20) as severite
+    FROM examens e
+    JOIN lieux_examen l ON e.salle_id = l.id
+    JOIN inscriptions i ON e.module_id = i.module_id
+    WHERE e.statut IN ('Planifie', 'Confirme')
+        AND i.statut = 'Inscrit'
+    GROUP BY e.id, e.groupe_examen, e.max_etudiants, l.capacite
+    HAVING CASE WHEN e.groupe_examen IS NULL THEN COUNT(i.etudiant_id) ELSE e.max_etudiants END > l.capacite;
+END;
+$$ LANGUAGE plpgsql;
+-- ============================================
+-- PARTIE 11: CALENDRIER DES CRÉNEAUX CONFIGURABLE
+-- ============================================
+
+-- Grille horaire des examens (remplace les heures codées en dur côté application)
+CREATE TABLE IF NOT EXISTS creneaux_examen (
+    id SERIAL PRIMARY KEY,
+    heure_debut TIME NOT NULL UNIQUE,
+    duree_minutes INT NOT NULL DEFAULT 120 CHECK (duree_minutes BETWEEN 60 AND 240),
+    is_actif BOOLEAN DEFAULT TRUE
+);
+
+INSERT INTO creneaux_examen (heure_debut, duree_minutes) VALUES
+('08:00', 120),
+('10:00', 120),
+('14:00', 120),
+('16:00', 120)
+ON CONFLICT (heure_debut) DO NOTHING;
+
+-- Jours fériés et fermetures exceptionnelles (week-ends exclus par défaut)
+CREATE TABLE IF NOT EXISTS jours_fermeture (
+    jour DATE PRIMARY KEY,
+    motif VARCHAR(100)
+);
+
+-- Horaires d'ouverture propres à chaque salle
+ALTER TABLE lieux_examen ADD COLUMN IF NOT EXISTS heure_ouverture TIME DEFAULT '08:00';
+ALTER TABLE lieux_examen ADD COLUMN IF NOT EXISTS heure_fermeture TIME DEFAULT '20:00';
+
+-- ============================================
+-- PARTIE 12: RÉOPTIMISATION INCRÉMENTALE
+-- ============================================
+
+-- Applique en une transaction les mouvements calculés par la réparation locale
+-- (DEPLACER: mise à jour d'une ligne, CREER: nouvelle partie, ANNULER: partie supprimée)
+CREATE OR REPLACE FUNCTION apply_schedule_moves(p_moves JSONB)
+RETURNS INTEGER AS $$
+DECLARE
+    v_count INTEGER := 0;
+    v_rows INTEGER;
+BEGIN
+    UPDATE examens e
+    SET statut = 'Annule',
+        updated_at = CURRENT_TIMESTAMP
+    FROM jsonb_to_recordset(p_moves) AS x(action TEXT, exam_id INT)
+    WHERE x.action = 'ANNULER'
+        AND e.id = x.exam_id;
+    GET DIAGNOSTICS v_rows = ROW_COUNT;
+    v_count := v_count + v_rows;
+    
+    UPDATE examens e
+    SET date_heure = x.exam_time,
+        salle_id = x.room_id,
+        professeur_id = x.professor_id,
+        max_etudiants = x.student_count,
+        groupe_examen = x.split_group,
+        partie_num = x.part_index,
+        nb_parties = x.part_count,
+        updated_at = CURRENT_TIMESTAMP
+    FROM jsonb_to_recordset(p_moves) AS x(
+        action TEXT,
+        exam_id INT,
+        professor_id INT,
+        room_id INT,
+        exam_time TIMESTAMP,
+        student_count INT,
+        split_group UUID,
+        part_index INT,
+        part_count INT
+    )
+    WHERE x.action = 'DEPLACER'
+        AND e.id = x.exam_id;
+    GET DIAGNOSTICS v_rows = ROW_COUNT;
+    v_count := v_count + v_rows;
+    
+    INSERT INTO examens (
+        module_id,
+        professeur_id,
+        salle_id,
+        date_heure,
+        duree_minutes,
+        type_examen,
+        statut,
+        max_etudiants,
+        groupe_examen,
+        partie_num,
+        nb_parties,
+        created_at
+    )
+    SELECT
+        x.module_id,
+        x.professor_id,
+        x.room_id,
+        x.exam_time,
+        x.duration_minutes,
+        'Final',
+        'Planifie',
+        x.student_count,
+        x.split_group,
+        x.part_index,
+        x.part_count,
+        CURRENT_TIMESTAMP
+    FROM jsonb_to_recordset(p_moves) AS x(
+        action TEXT,
+        module_id INT,
+        professor_id INT,
+        room_id INT,
+        exam_time TIMESTAMP,
+        duration_minutes INT,
+        student_count INT,
+        split_group UUID,
+        part_index INT,
+        part_count INT
+    )
+    WHERE x.action = 'CREER';
+    GET DIAGNOSTICS v_rows = ROW_COUNT;
+    v_count := v_count + v_rows;
+    
+    RETURN v_count;
+END;
+$$ LANGUAGE plpgsql;
+
+-- ============================================
+-- PARTIE 13: PUBLICATION TRANSACTIONNELLE DU PLANNING
+-- ============================================
+
+-- Les examens à publier sont copiés (COPY) dans la table temporaire planning_stage
+-- de la transaction de publication (voir schedule_publish.py):
+--   ligne, module_id, professeur_id, salle_id, date_heure, duree_minutes,
+--   nb_etudiants, groupe_examen, partie_num, nb_parties
+
+-- Contrôles ensemblistes du planning en attente contre les examens enregistrés
+-- Une ligne par rejet; aucune ligne: le planning peut être publié
+CREATE OR REPLACE FUNCTION verifier_planning_stage()
+RETURNS TABLE(
+    type_conflit VARCHAR(30),
+    ligne INT,
+    module_id INT,
+    salle_id INT,
+    professeur_id INT,
+    date_heure TIMESTAMP,
+    conflit_avec TEXT,
+    nb_etudiants INT,
+    details TEXT
+) AS $$
+#variable_conflict use_column
+BEGIN
+    -- Aucune écriture concurrente sur examens entre les contrôles et l'insertion
+    LOCK TABLE examens IN SHARE ROW EXCLUSIVE MODE;
+
+    RETURN QUERY
+    WITH engages AS (
+        -- Examens enregistrés et examens en attente sur les jours concernés
+        SELECT NULL::INT AS ligne, e.id AS examen_id, e.module_id, e.salle_id, e.professeur_id,
+               e.date_heure, e.date_heure + e.duree_minutes * INTERVAL '1 minute' AS date_fin
+        FROM examens e
+        WHERE e.statut IN ('Planifie', 'Confirme')
+            AND e.date_heure::date IN (SELECT DISTINCT s.date_heure::date FROM planning_stage s)
+        UNION ALL
+        SELECT s.ligne, NULL::INT, s.module_id, s.salle_id, s.professeur_id,
+               s.date_heure, s.date_heure + s.duree_minutes * INTERVAL '1 minute'
+        FROM planning_stage s
+    ),
+    chevauchements AS (
+        -- Salle ou surveillant déjà pris sur un intervalle qui se recoupe
+        SELECT 'SALLE'::VARCHAR(30) AS nature, a.ligne, a.module_id, a.salle_id, a.professeur_id, a.date_heure,
+               COALESCE('examen ' || b.examen_id, 'ligne ' || b.ligne) AS autre,
+               'Salle déjà occupée sur ce créneau' AS motif
+        FROM engages a
+        JOIN engages b
+            ON b.salle_id = a.salle_id
+            AND a.date_heure < b.date_fin
+            AND b.date_heure < a.date_fin
+        WHERE a.ligne IS NOT NULL
+            AND (b.ligne IS NULL OR b.ligne > a.ligne)
+        UNION ALL
+        SELECT 'SURVEILLANT'::VARCHAR(30), a.ligne, a.module_id, a.salle_id, a.professeur_id, a.date_heure,
+               COALESCE('examen ' || b.examen_id, 'ligne ' || b.ligne),
+               'Surveillant déjà affecté sur ce créneau'
+        FROM engages a
+        JOIN engages b
+            ON b.professeur_id = a.professeur_id
+            AND a.date_heure < b.date_fin
+            AND b.date_heure < a.date_fin
+        WHERE a.ligne IS NOT NULL
+            AND (b.ligne IS NULL OR b.ligne > a.ligne)
+    ),
+    module_jours AS (
+        SELECT x.module_id, x.date_heure::date AS jour,
+               MIN(x.ligne) AS ligne, MIN(x.examen_id) AS examen_id
+        FROM engages x
+        GROUP BY x.module_id, x.date_heure::date, x.ligne IS NULL
+    )
+    -- Module déjà planifié sur la période (double publication)
+    SELECT 'MODULE_DEJA_PLANIFIE'::VARCHAR(30), s.ligne, s.module_id, s.salle_id, s.professeur_id,
+           s.date_heure, 'examen ' || e.id, NULL::INT,
+           'Le module a déjà un examen le ' || TO_CHAR(e.date_heure, 'DD/MM/YYYY HH24:MI')
+    FROM planning_stage s
+    JOIN examens e ON e.module_id = s.module_id
+    WHERE e.statut IN ('Planifie', 'Confirme')
+        AND e.date_heure BETWEEN (SELECT MIN(p.date_heure) FROM planning_stage p)::date
+                             AND (SELECT MAX(p.date_heure) FROM planning_stage p)::date + 1
+
+    UNION ALL
+    -- Chevauchements de salle et de surveillant
+    SELECT c.nature, c.ligne, c.module_id, c.salle_id, c.professeur_id, c.date_heure,
+           c.autre, NULL::INT, c.motif
+    FROM chevauchements c
+
+    UNION ALL
+    -- Capacité de la salle dépassée
+    SELECT 'CAPACITE'::VARCHAR(30), s.ligne, s.module_id, s.salle_id, s.professeur_id, s.date_heure,
+           NULL::TEXT, s.nb_etudiants,
+           s.nb_etudiants || ' étudiants pour ' || l.capacite || ' places'
+    FROM planning_stage s
+    JOIN lieux_examen l ON l.id = s.salle_id
+    WHERE s.nb_etudiants > l.capacite
+
+    UNION ALL
+    -- Professeur au-delà de 3 examens par jour
+    SELECT 'PROFESSEUR'::VARCHAR(30), MIN(x.ligne), NULL::INT, NULL::INT, x.professeur_id,
+           MIN(x.date_heure), NULL::TEXT, NULL::INT,
+           COUNT(*) || ' examens le ' || TO_CHAR(x.date_heure::date, 'DD/MM/YYYY')
+    FROM engages x
+    GROUP BY x.professeur_id, x.date_heure::date
+    HAVING COUNT(*) > 3 AND BOOL_OR(x.ligne IS NOT NULL)
+
+    UNION ALL
+    -- Étudiants avec deux examens le même jour (un module réparti compte une fois)
+    SELECT 'ETUDIANT'::VARCHAR(30), a.ligne, a.module_id, NULL::INT, NULL::INT, a.jour::TIMESTAMP,
+           COALESCE('ligne ' || b.ligne, 'examen ' || b.examen_id), COUNT(DISTINCT ia.etudiant_id)::INT,
+           COUNT(DISTINCT ia.etudiant_id) || ' étudiant(s) communs avec le module ' || b.module_id || ' le ' || TO_CHAR(a.jour, 'DD/MM/YYYY')
+    FROM module_jours a
+    JOIN module_jours b
+        ON b.jour = a.jour
+        AND b.module_id <> a.module_id
+        AND (b.ligne IS NULL OR b.module_id > a.module_id)
+    JOIN inscriptions ia ON ia.module_id = a.module_id AND ia.statut = 'Inscrit'
+    JOIN inscriptions ib ON ib.module_id = b.module_id AND ib.statut = 'Inscrit'
+        AND ib.etudiant_id = ia.etudiant_id
+    WHERE a.ligne IS NOT NULL
+    GROUP BY a.ligne, a.module_id, a.jour, b.ligne, b.examen_id, b.module_id;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Insertion en bloc du planning en attente (après verifier_planning_stage, même transaction)
+CREATE OR REPLACE FUNCTION publier_planning_stage()
+RETURNS INTEGER AS $$
+DECLARE
+    v_inserted_count INTEGER := 0;
+BEGIN
+    INSERT INTO examens (
+        module_id,
+        professeur_id,
+        salle_id,
+        date_heure,
+        duree_minutes,
+        type_examen,
+        statut,
+        max_etudiants,
+        groupe_examen,
+        partie_num,
+        nb_parties,
+        created_at
+    )
+    SELECT
+        s.module_id,
+        s.professeur_id,
+        s.salle_id,
+        s.date_heure,
+        s.duree_minutes,
+        'Final',
+        'Planifie',
+        s.nb_etudiants,
+        s.groupe_examen,
+        s.partie_num,
+        s.nb_parties,
+        CURRENT_TIMESTAMP
+    FROM planning_stage s
+    ORDER BY s.ligne;
+    
+    GET DIAGNOSTICS v_inserted_count = ROW_COUNT;
+    RETURN v_inserted_count;
+END;
+$$ LANGUAGE plpgsql;
+
+-- ============================================
+-- PARTIE 14: GÉNÉRATION MULTI-SESSIONS (PRINCIPALE + RATTRAPAGE)
+-- ============================================
+
+-- Modules à planifier pour une session (voir session_batch.py)
+-- Principale: inscriptions 'Inscrit' de la session principale
+-- Rattrapage: échecs de la session principale, plus les inscriptions explicites au rattrapage
+CREATE OR REPLACE FUNCTION load_session_optimization_data(
+    p_start_date TIMESTAMP,
+    p_end_date TIMESTAMP,
+    p_session VARCHAR DEFAULT 'Principale',
+    p_department_id INT DEFAULT NULL
+)
+RETURNS TABLE (
+    module_id INT,
+    module_code VARCHAR,
+    module_name VARCHAR,
+    credits INT,
+    formation_id INT,
+    formation_name VARCHAR,
+    departement_id INT,
+    professor_id INT,
+    student_count BIGINT,
+    student_ids INT[],
+    duration_minutes INT
+) AS $$
+BEGIN
+    RETURN QUERY
+    SELECT 
+        m.id,
+        m.code,
+        m.nom,
+        m.credits,
+        m.formation_id,
+        f.nom,
+        f.departement_id,
+        COALESCE(m.responsable_id, 
+            (SELECT id FROM professeurs 
+             WHERE departement_id = f.departement_id 
+             LIMIT 1)),
+        COUNT(DISTINCT i.etudiant_id)::BIGINT,
+        ARRAY_AGG(DISTINCT i.etudiant_id),
+        CASE 
+            WHEN m.credits >= 6 THEN 180
+            WHEN m.credits >= 4 THEN 120
+            ELSE 90
+        END
+    FROM modules m
+    JOIN formations f ON m.formation_id = f.id
+    JOIN inscriptions i ON m.id = i.module_id
+    WHERE i.annee_academique = EXTRACT(YEAR FROM CURRENT_DATE)
+        AND CASE p_session
+            WHEN 'Principale' THEN
+                i.statut = 'Inscrit' AND COALESCE(i.session, 'Principale') = 'Principale'
+            WHEN 'Rattrapage' THEN
+                (i.statut = 'Echoue' AND COALESCE(i.session, 'Principale') = 'Principale')
+                OR (i.statut = 'Inscrit' AND i.session = 'Rattrapage')
+            ELSE FALSE
+        END
+        AND NOT EXISTS (
+            SELECT 1 FROM examens e 
+            WHERE e.module_id = m.id 
+            AND e.statut IN ('Planifie', 'Confirme')
+            AND e.date_heure BETWEEN p_start_date AND p_end_date
+        )
+        AND (p_department_id IS NULL OR f.departement_id = p_department_id)
+    GROUP BY m.id, m.code, m.nom, m.credits, m.formation_id, 
+             f.nom, f.departement_id, m.responsable_id;
+END;
+$$ LANGUAGE plpgsql;
+
+-- La table temporaire planning_stage porte le type d'examen de chaque ligne (Final par défaut)
+CREATE OR REPLACE FUNCTION publier_planning_stage()
+RETURNS INTEGER AS $$
+DECLARE
+    v_inserted_count INTEGER := 0;
+BEGIN
+    INSERT INTO examens (
+        module_id,
+        professeur_id,
+        salle_id,
+        date_heure,
+        duree_minutes,
+        type_examen,
+        statut,
+        max_etudiants,
+        groupe_examen,
+        partie_num,
+        nb_parties,
+        created_at
+    )
+    SELECT
+        s.module_id,
+        s.professeur_id,
+        s.salle_id,
+        s.date_heure,
+        s.duree_minutes,
+        COALESCE(s.type_examen, 'Final'),
+        'Planifie',
+        s.nb_etudiants,
+        s.groupe_examen,
+        s.partie_num,
+        s.nb_parties,
+        CURRENT_TIMESTAMP
+    FROM planning_stage s
+    ORDER BY s.ligne;
+    
+    GET DIAGNOSTICS v_inserted_count = ROW_COUNT;
+    RETURN v_inserted_count;
+END;
+$$ LANGUAGE plpgsql;
+
+SELECT '✅ PARTIE 14 terminée: génération Principale + Rattrapage' AS resultat;
+
+-- ============================================
+-- PARTIE 15: REGISTRE DES CONFLITS MAINTENU EN CONTINU
+-- ============================================
+
+-- conflits_examens devient le registre vivant des conflits du planning:
+-- une ligne par clé (cle_type, entite_id, jour), recalculée uniquement pour les clés touchées
+--   ETUDIANT   : étudiant x jour, plus d'un module le même jour
+--   PROFESSEUR : professeur x jour, plus de 3 examens le même jour
+--   SALLE      : salle x jour, examens qui se chevauchent
+--   CAPACITE   : examen x jour, effectif supérieur à la capacité de la salle
+-- Un conflit qui disparaît passe à 'Résolu' (historique conservé), il redevient 'Non résolu' s'il réapparaît
+-- Les lignes saisies à la main (cle_type NULL) ne sont pas touchées
+ALTER TABLE conflits_examens
+    ADD COLUMN IF NOT EXISTS cle_type VARCHAR(20),
+    ADD COLUMN IF NOT EXISTS entite_id INT,
+    ADD COLUMN IF NOT EXISTS jour DATE,
+    ADD COLUMN IF NOT EXISTS nb INT,
+    ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP;
+
+CREATE UNIQUE INDEX IF NOT EXISTS ux_conflits_cle
+    ON conflits_examens(cle_type, entite_id, jour) WHERE cle_type IS NOT NULL;
+CREATE INDEX IF NOT EXISTS idx_conflits_actifs
+    ON conflits_examens(cle_type, jour) WHERE cle_type IS NOT NULL AND statut <> 'Résolu';
+
+-- Accès par clé utilisés par le recalcul
+CREATE INDEX IF NOT EXISTS idx_examens_module_date_actifs
+    ON examens(module_id, date_heure) WHERE statut IN ('Planifie', 'Confirme');
+CREATE INDEX IF NOT EXISTS idx_examens_professeur_date_actifs
+    ON examens(professeur_id, date_heure) WHERE statut IN ('Planifie', 'Confirme');
+CREATE INDEX IF NOT EXISTS idx_examens_salle_date_actifs
+    ON examens(salle_id, date_heure) WHERE statut IN ('Planifie', 'Confirme');
+CREATE INDEX IF NOT EXISTS idx_inscriptions_etudiant_inscrit
+    ON inscriptions(etudiant_id, module_id) WHERE statut = 'Inscrit';
+CREATE INDEX IF NOT EXISTS idx_inscriptions_module_inscrit
+    ON inscriptions(module_id, etudiant_id) WHERE statut = 'Inscrit';
+
+-- Recalcule les conflits des clés données (tableaux parallèles type / entité / jour)
+-- Retourne le nombre de lignes du registre modifiées
+CREATE OR REPLACE FUNCTION recalculer_conflits(
+    p_types VARCHAR[],
+    p_entites INT[],
+    p_jours DATE[]
+)
+RETURNS INTEGER AS $$
+DECLARE
+    v_count INTEGER := 0;
+BEGIN
+    IF p_types IS NULL OR cardinality(p_types) = 0 THEN
+        RETURN 0;
+    END IF;
+
+    WITH cles AS (
+        SELECT DISTINCT k.cle_type, k.entite_id, k.jour
+        FROM unnest(p_types, p_entites, p_jours) AS k(cle_type, entite_id, jour)
+        WHERE k.jour IS NOT NULL
+    ),
+    actuels AS (
+        -- Étudiant: plus d'un module le même jour (un module réparti sur plusieurs salles compte une fois)
+        SELECT 'ETUDIANT'::VARCHAR(20) AS cle_type, k.entite_id, k.jour,
+               'Étudiant >1 examen/jour'::VARCHAR(50) AS type_conflit,
+               'CRITIQUE'::VARCHAR(20) AS severite,
+               COUNT(DISTINCT e.module_id)::INT AS nb,
+               'Étudiant ID: ' || k.entite_id || ' a ' || COUNT(DISTINCT e.module_id) || ' examens le ' || k.jour AS description,
+               JSONB_AGG(DISTINCT e.id) AS examens_impliques
+        FROM cles k
+        JOIN inscriptions i ON i.etudiant_id = k.entite_id AND i.statut = 'Inscrit'
+        JOIN examens e ON e.module_id = i.module_id
+            AND e.statut IN ('Planifie', 'Confirme')
+            AND e.date_heure >= k.jour AND e.date_heure < k.jour + 1
+        WHERE k.cle_type = 'ETUDIANT'
+        GROUP BY k.entite_id, k.jour
+        HAVING COUNT(DISTINCT e.module_id) > 1
+
+        UNION ALL
+        -- Professeur: plus de 3 examens le même jour
+        SELECT 'PROFESSEUR', k.entite_id, k.jour,
+               'Professeur >3 examens/jour', 'CRITIQUE',
+               COUNT(*)::INT,
+               'Professeur ID: ' || k.entite_id || ' a ' || COUNT(*) || ' examens le ' || k.jour,
+               JSONB_AGG(e.id ORDER BY e.date_heure)
+        FROM cles k
+        JOIN examens e ON e.professeur_id = k.entite_id
+            AND e.statut IN ('Planifie', 'Confirme')
+            AND e.date_heure >= k.jour AND e.date_heure < k.jour + 1
+        WHERE k.cle_type = 'PROFESSEUR'
+        GROUP BY k.entite_id, k.jour
+        HAVING COUNT(*) > 3
+
+        UNION ALL
+        -- Salle: examens de la journée qui se chevauchent (nb = paires en chevauchement)
+        SELECT 'SALLE', k.entite_id, k.jour,
+               'Chevauchement salle', 'ÉLEVÉ',
+               COUNT(*)::INT,
+               'Salle ID: ' || k.entite_id || ' - ' || COUNT(*) || ' chevauchement(s) le ' || k.jour,
+               (SELECT JSONB_AGG(DISTINCT x) FROM UNNEST(ARRAY_AGG(e1.id) || ARRAY_AGG(e2.id)) AS x)
+        FROM cles k
+        JOIN examens e1 ON e1.salle_id = k.entite_id
+            AND e1.statut IN ('Planifie', 'Confirme')
+            AND e1.date_heure >= k.jour AND e1.date_heure < k.jour + 1
+        JOIN examens e2 ON e2.salle_id = e1.salle_id
+            AND e2.id > e1.id
+            AND e2.statut IN ('Planifie', 'Confirme')
+            AND e1.date_heure < e2.date_heure + e2.duree_minutes * INTERVAL '1 minute'
+            AND e2.date_heure < e1.date_heure + e1.duree_minutes * INTERVAL '1 minute'
+        WHERE k.cle_type = 'SALLE'
+        GROUP BY k.entite_id, k.jour
+
+        UNION ALL
+        -- Capacité: effectif de l'examen (ou de sa partie) supérieur à la capacité de la salle
+        SELECT 'CAPACITE', k.entite_id, k.jour,
+               'Dépassement capacité', 'MOYEN',
+               n.effectif::INT,
+               'Examen ID: ' || e.id || ' - ' || n.effectif || ' étudiants pour ' || l.capacite || ' places',
+               JSONB_BUILD_ARRAY(e.id)
+        FROM cles k
+        JOIN examens e ON e.id = k.entite_id
+            AND e.statut IN ('Planifie', 'Confirme')
+            AND e.date_heure >= k.jour AND e.date_heure < k.jour + 1
+        JOIN lieux_examen l ON l.id = e.salle_id
+        CROSS JOIN LATERAL (
+            SELECT CASE WHEN e.groupe_examen IS NULL
+                        THEN (SELECT COUNT(*) FROM inscriptions i WHERE i.module_id = e.module_id AND i.statut = 'Inscrit')
+                        ELSE e.max_etudiants END AS effectif
+        ) n
+        WHERE k.cle_type = 'CAPACITE'
+            AND n.effectif > l.capacite
+    ),
+    ouverts AS (
+        INSERT INTO conflits_examens (
+            cle_type, entite_id, jour, type_conflit, severite, nb, description, examens_impliques, statut, updated_at
+        )
+        SELECT a.cle_type, a.entite_id, a.jour, a.type_conflit, a.severite, a.nb, a.description,
+               a.examens_impliques, 'Non résolu', CURRENT_TIMESTAMP
+        FROM actuels a
+        ON CONFLICT (cle_type, entite_id, jour) WHERE cle_type IS NOT NULL
+        DO UPDATE SET
+            nb = EXCLUDED.nb,
+            description = EXCLUDED.description,
+            examens_impliques = EXCLUDED.examens_impliques,
+            severite = EXCLUDED.severite,
+            statut = CASE WHEN conflits_examens.statut = 'Résolu' THEN 'Non résolu' ELSE conflits_examens.statut END,
+            resolved_at = CASE WHEN conflits_examens.statut = 'Résolu' THEN NULL ELSE conflits_examens.resolved_at END,
+            date_detection = CASE WHEN conflits_examens.statut = 'Résolu' THEN CURRENT_TIMESTAMP
+                                  ELSE conflits_examens.date_detection END,
+            updated_at = CURRENT_TIMESTAMP
+        WHERE conflits_examens.statut = 'Résolu'
+            OR (conflits_examens.nb, conflits_examens.examens_impliques, conflits_examens.severite)
+               IS DISTINCT FROM (EXCLUDED.nb, EXCLUDED.examens_impliques, EXCLUDED.severite)
+        RETURNING 1
+    ),
+    resolus AS (
+        -- Clés recalculées sans conflit: le conflit a disparu
+        UPDATE conflits_examens c
+        SET statut = 'Résolu', resolved_at = CURRENT_TIMESTAMP, updated_at = CURRENT_TIMESTAMP
+        FROM cles k
+        WHERE c.cle_type = k.cle_type
+            AND c.entite_id = k.entite_id
+            AND c.jour = k.jour
+            AND c.statut <> 'Résolu'
+            AND NOT EXISTS (
+                SELECT 1 FROM actuels a
+                WHERE a.cle_type = k.cle_type AND a.entite_id = k.entite_id AND a.jour = k.jour
+            )
+        RETURNING 1
+    )
+    SELECT (SELECT COUNT(*) FROM ouverts) + (SELECT COUNT(*) FROM resolus) INTO v_count;
+
+    RETURN v_count;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Clés touchées par un ensemble d'examens (avant et/ou après modification)
+CREATE OR REPLACE FUNCTION recalculer_conflits_examens(
+    p_examens INT[],
+    p_modules INT[],
+    p_professeurs INT[],
+    p_salles INT[],
+    p_jours DATE[]
+)
+RETURNS INTEGER AS $$
+DECLARE
+    v_types VARCHAR[];
+    v_entites INT[];
+    v_jours DATE[];
+BEGIN
+    WITH touches AS (
+        SELECT DISTINCT *
+        FROM unnest(p_examens, p_modules, p_professeurs, p_salles, p_jours)
+            AS t(examen_id, module_id, professeur_id, salle_id, jour)
+    ),
+    cles AS (
+        SELECT 'PROFESSEUR'::VARCHAR AS cle_type, t.professeur_id AS entite_id, t.jour FROM touches t
+        UNION
+        SELECT 'SALLE', t.salle_id, t.jour FROM touches t
+        UNION
+        SELECT 'CAPACITE', t.examen_id, t.jour FROM touches t
+        UNION
+        SELECT 'ETUDIANT', i.etudiant_id, t.jour
+        FROM (SELECT DISTINCT module_id, jour FROM touches) t
+        JOIN inscriptions i ON i.module_id = t.module_id AND i.statut = 'Inscrit'
+    )
+    SELECT ARRAY_AGG(cle_type), ARRAY_AGG(entite_id), ARRAY_AGG(jour)
+    INTO v_types, v_entites, v_jours
+    FROM cles;
+
+    RETURN recalculer_conflits(v_types, v_entites, v_jours);
+END;
+$$ LANGUAGE plpgsql;
+
+-- Clés touchées par des inscriptions (étudiant x module): jours des examens actifs du module
+CREATE OR REPLACE FUNCTION recalculer_conflits_inscriptions(
+    p_etudiants INT[],
+    p_modules INT[]
+)
+RETURNS INTEGER AS $$
+DECLARE
+    v_types VARCHAR[];
+    v_entites INT[];
+    v_jours DATE[];
+BEGIN
+    WITH touches AS (
+        SELECT DISTINCT * FROM unnest(p_etudiants, p_modules) AS t(etudiant_id, module_id)
+    ),
+    cles AS (
+        SELECT 'ETUDIANT'::VARCHAR AS cle_type, t.etudiant_id AS entite_id, e.date_heure::date AS jour
+        FROM touches t
+        JOIN examens e ON e.module_id = t.module_id AND e.statut IN ('Planifie', 'Confirme')
+        UNION
+        SELECT 'CAPACITE', e.id, e.date_heure::date
+        FROM (SELECT DISTINCT module_id FROM touches) t
+        JOIN examens e ON e.module_id = t.module_id AND e.statut IN ('Planifie', 'Confirme')
+    )
+    SELECT ARRAY_AGG(cle_type), ARRAY_AGG(entite_id), ARRAY_AGG(jour)
+    INTO v_types, v_entites, v_jours
+    FROM cles;
+
+    RETURN recalculer_conflits(v_types, v_entites, v_jours);
+END;
+$$ LANGUAGE plpgsql;
+
+-- Triggers d'instruction: une seule passe par INSERT/UPDATE/DELETE, quel que soit le nombre de lignes
+-- (les tables de transition n'acceptent qu'un événement par trigger, d'où trois triggers par table)
+CREATE OR REPLACE FUNCTION trg_conflits_examens()
+RETURNS TRIGGER AS $$
+DECLARE
+    v_examens INT[];
+    v_modules INT[];
+    v_professeurs INT[];
+    v_salles INT[];
+    v_jours DATE[];
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        SELECT ARRAY_AGG(id), ARRAY_AGG(module_id), ARRAY_AGG(professeur_id), ARRAY_AGG(salle_id), ARRAY_AGG(date_heure::date)
+        INTO v_examens, v_modules, v_professeurs, v_salles, v_jours
+        FROM nouveaux;
+    ELSIF TG_OP = 'DELETE' THEN
+        SELECT ARRAY_AGG(id), ARRAY_AGG(module_id), ARRAY_AGG(professeur_id), ARRAY_AGG(salle_id), ARRAY_AGG(date_heure::date)
+        INTO v_examens, v_modules, v_professeurs, v_salles, v_jours
+        FROM anciens;
+    ELSE
+        -- Seules les lignes dont un champ utile a changé comptent (ancienne et nouvelle position)
+        SELECT ARRAY_AGG(x.id), ARRAY_AGG(x.module_id), ARRAY_AGG(x.professeur_id), ARRAY_AGG(x.salle_id), ARRAY_AGG(x.jour)
+        INTO v_examens, v_modules, v_professeurs, v_salles, v_jours
+        FROM (
+            SELECT n.id, n.module_id, n.professeur_id, n.salle_id, n.date_heure::date AS jour
+            FROM nouveaux n JOIN anciens o ON o.id = n.id
+            WHERE (n.module_id, n.professeur_id, n.salle_id, n.date_heure, n.duree_minutes, n.statut, n.max_etudiants)
+                IS DISTINCT FROM (o.module_id, o.professeur_id, o.salle_id, o.date_heure, o.duree_minutes, o.statut, o.max_etudiants)
+            UNION ALL
+            SELECT o.id, o.module_id, o.professeur_id, o.salle_id, o.date_heure::date
+            FROM anciens o JOIN nouveaux n ON n.id = o.id
+            WHERE (n.module_id, n.professeur_id, n.salle_id, n.date_heure, n.duree_minutes, n.statut, n.max_etudiants)
+                IS DISTINCT FROM (o.module_id, o.professeur_id, o.salle_id, o.date_heure, o.duree_minutes, o.statut, o.max_etudiants)
+        ) x;
+    END IF;
+
+    PERFORM recalculer_conflits_examens(v_examens, v_modules, v_professeurs, v_salles, v_jours);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION trg_conflits_inscriptions()
+RETURNS TRIGGER AS $$
+DECLARE
+    v_etudiants INT[];
+    v_modules INT[];
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        SELECT ARRAY_AGG(etudiant_id), ARRAY_AGG(module_id) INTO v_etudiants, v_modules
+        FROM nouveaux WHERE statut = 'Inscrit';
+    ELSIF TG_OP = 'DELETE' THEN
+        SELECT ARRAY_AGG(etudiant_id), ARRAY_AGG(module_id) INTO v_etudiants, v_modules
+        FROM anciens WHERE statut = 'Inscrit';
+    ELSE
+        SELECT ARRAY_AGG(x.etudiant_id), ARRAY_AGG(x.module_id) INTO v_etudiants, v_modules
+        FROM (
+            SELECT n.etudiant_id, n.module_id
+            FROM nouveaux n JOIN anciens o ON o.id = n.id
+            WHERE (n.etudiant_id, n.module_id, n.statut) IS DISTINCT FROM (o.etudiant_id, o.module_id, o.statut)
+            UNION ALL
+            SELECT o.etudiant_id, o.module_id
+            FROM anciens o JOIN nouveaux n ON n.id = o.id
+            WHERE (n.etudiant_id, n.module_id, n.statut) IS DISTINCT FROM (o.etudiant_id, o.module_id, o.statut)
+        ) x;
+    END IF;
+
+    PERFORM recalculer_conflits_inscriptions(v_etudiants, v_modules);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Vidage complet (TRUNCATE ne déclenche pas les triggers de ligne ni de transition)
+CREATE OR REPLACE FUNCTION trg_conflits_vidage()
+RETURNS TRIGGER AS $$
+BEGIN
+    UPDATE conflits_examens
+    SET statut = 'Résolu', resolved_at = CURRENT_TIMESTAMP, updated_at = CURRENT_TIMESTAMP
+    WHERE cle_type IS NOT NULL
+        AND statut <> 'Résolu'
+        AND (TG_TABLE_NAME = 'examens' OR cle_type IN ('ETUDIANT', 'CAPACITE'));
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_conflits_examens_ins ON examens;
+CREATE TRIGGER trg_conflits_examens_ins
+AFTER INSERT ON examens
+REFERENCING NEW TABLE AS nouveaux
+FOR EACH STATEMENT EXECUTE FUNCTION trg_conflits_examens();
+
+DROP TRIGGER IF EXISTS trg_conflits_examens_upd ON examens;
+CREATE TRIGGER trg_conflits_examens_upd
+AFTER UPDATE ON examens
+REFERENCING OLD TABLE AS anciens NEW TABLE AS nouveaux
+FOR EACH STATEMENT EXECUTE FUNCTION trg_conflits_examens();
+
+DROP TRIGGER IF EXISTS trg_conflits_examens_del ON examens;
+CREATE TRIGGER trg_conflits_examens_del
+AFTER DELETE ON examens
+REFERENCING OLD TABLE AS anciens
+FOR EACH STATEMENT EXECUTE FUNCTION trg_conflits_examens();
+
+DROP TRIGGER IF EXISTS trg_conflits_examens_trunc ON examens;
+CREATE TRIGGER trg_conflits_examens_trunc
+AFTER TRUNCATE ON examens
+FOR EACH STATEMENT EXECUTE FUNCTION trg_conflits_vidage();
+
+DROP TRIGGER IF EXISTS trg_conflits_inscriptions_ins ON inscriptions;
+CREATE TRIGGER trg_conflits_inscriptions_ins
+AFTER INSERT ON inscriptions
+REFERENCING NEW TABLE AS nouveaux
+FOR EACH STATEMENT EXECUTE FUNCTION trg_conflits_inscriptions();
+
+DROP TRIGGER IF EXISTS trg_conflits_inscriptions_upd ON inscriptions;
+CREATE TRIGGER trg_conflits_inscriptions_upd
+AFTER UPDATE ON inscriptions
+REFERENCING OLD TABLE AS anciens NEW TABLE AS nouveaux
+FOR EACH STATEMENT EXECUTE FUNCTION trg_conflits_inscriptions();
+
+DROP TRIGGER IF EXISTS trg_conflits_inscriptions_del ON inscriptions;
+CREATE TRIGGER trg_conflits_inscriptions_del
+AFTER DELETE ON inscriptions
+REFERENCING OLD TABLE AS anciens
+FOR EACH STATEMENT EXECUTE FUNCTION trg_conflits_inscriptions();
+
+DROP TRIGGER IF EXISTS trg_conflits_inscriptions_trunc ON inscriptions;
+CREATE TRIGGER trg_conflits_inscriptions_trunc
+AFTER TRUNCATE ON inscriptions
+FOR EACH STATEMENT EXECUTE FUNCTION trg_conflits_vidage();
+
+-- Reconstruction complète (installation, ou après une modification hors triggers)
+CREATE OR REPLACE FUNCTION reconstruire_conflits()
+RETURNS INTEGER AS $$
+DECLARE
+    v_types VARCHAR[];
+    v_entites INT[];
+    v_jours DATE[];
+BEGIN
+    WITH cles AS (
+        SELECT 'PROFESSEUR'::VARCHAR AS cle_type, e.professeur_id AS entite_id, e.date_heure::date AS jour
+        FROM examens e WHERE e.statut IN ('Planifie', 'Confirme')
+        UNION
+        SELECT 'SALLE', e.salle_id, e.date_heure::date
+        FROM examens e WHERE e.statut IN ('Planifie', 'Confirme')
+        UNION
+        SELECT 'CAPACITE', e.id, e.date_heure::date
+        FROM examens e WHERE e.statut IN ('Planifie', 'Confirme')
+        UNION
+        SELECT 'ETUDIANT', i.etudiant_id, e.date_heure::date
+        FROM examens e
+        JOIN inscriptions i ON i.module_id = e.module_id AND i.statut = 'Inscrit'
+        WHERE e.statut IN ('Planifie', 'Confirme')
+        UNION
+        -- Conflits encore ouverts dont la clé n'a plus d'examen
+        SELECT c.cle_type, c.entite_id, c.jour
+        FROM conflits_examens c
+        WHERE c.cle_type IS NOT NULL AND c.statut <> 'Résolu'
+    )
+    SELECT ARRAY_AGG(cle_type), ARRAY_AGG(entite_id), ARRAY_AGG(jour)
+    INTO v_types, v_entites, v_jours
+    FROM cles;
+
+    RETURN recalculer_conflits(v_types, v_entites, v_jours);
+END;
+$$ LANGUAGE plpgsql;
+
+SELECT reconstruire_conflits();
+
+-- Nombre de conflits ouverts (KPI): comptage sur l'index partiel idx_conflits_actifs
+CREATE OR REPLACE FUNCTION nb_conflits_actifs()
+RETURNS INTEGER AS $$
+    SELECT COUNT(*)::INTEGER
+    FROM conflits_examens
+    WHERE cle_type IS NOT NULL AND statut <> 'Résolu';
+$$ LANGUAGE sql STABLE;
+
+-- detecter_conflits() lit désormais le registre (même signature pour les pages existantes)
+CREATE OR REPLACE FUNCTION detecter_conflits()
+RETURNS TABLE(
+    type_conflit VARCHAR(50),
+    details TEXT,
+    severite VARCHAR(20)
+) AS $$
+BEGIN
+    RETURN QUERY
+    SELECT c.type_conflit::VARCHAR(50), c.description::TEXT, c.severite::VARCHAR(20)
+    FROM conflits_examens c
+    WHERE c.cle_type IS NOT NULL AND c.statut <> 'Résolu'
+    ORDER BY c.jour, c.cle_type, c.entite_id;
+END;
+$$ LANGUAGE plpgsql STABLE;
+
+SELECT '✅ PARTIE 15 terminée: registre des conflits maintenu par triggers' AS resultat;
+
+-- ============================================
+-- PARTIE 16: DÉTECTION DES CONFLITS PAR PÉRIMÈTRE
+-- ============================================
+
+-- Conflits touchant un département, une formation et/ou une période (paramètres NULL = pas de filtre)
+-- Le filtre est appliqué dès la sélection des examens du périmètre; les autres examens ne sont lus
+-- que par clé (étudiant, professeur, salle x jour) via les index partiels des examens actifs
+-- Colonnes structurées: une ligne par clé en conflit
+CREATE OR REPLACE FUNCTION detecter_conflits_perimetre(
+    p_departement_id INT DEFAULT NULL,
+    p_formation_id INT DEFAULT NULL,
+    p_date_debut DATE DEFAULT NULL,
+    p_date_fin DATE DEFAULT NULL
+)
+RETURNS TABLE(
+    type_conflit VARCHAR(50),
+    severite VARCHAR(20),
+    cle_type VARCHAR(20),
+    entite_id INT,
+    jour DATE,
+    nb INT,
+    examens INT[],
+    details TEXT
+) AS $$
+BEGIN
+    RETURN QUERY
+    WITH perimetre AS (
+        -- Examens actifs du périmètre
+        SELECT e.id, e.module_id, e.professeur_id, e.salle_id, e.date_heure, e.duree_minutes,
+               e.groupe_examen, e.max_etudiants, e.date_heure::date AS jour
+        FROM examens e
+        JOIN modules m ON m.id = e.module_id
+        JOIN formations f ON f.id = m.formation_id
+        WHERE e.statut IN ('Planifie', 'Confirme')
+            AND (p_departement_id IS NULL OR f.departement_id = p_departement_id)
+            AND (p_formation_id IS NULL OR m.formation_id = p_formation_id)
+            AND (p_date_debut IS NULL OR e.date_heure >= p_date_debut)
+            AND (p_date_fin IS NULL OR e.date_heure < p_date_fin + 1)
+    ),
+    etudiants_jours AS (
+        -- Étudiants inscrits aux modules du périmètre, jours de ces examens
+        SELECT DISTINCT i.etudiant_id, p.jour
+        FROM perimetre p
+        JOIN inscriptions i ON i.module_id = p.module_id AND i.statut = 'Inscrit'
+    )
+    -- Étudiant: plus d'un module le même jour (tous ses examens comptent, y compris hors périmètre)
+    SELECT 'Étudiant >1 examen/jour'::VARCHAR(50), 'CRITIQUE'::VARCHAR(20), 'ETUDIANT'::VARCHAR(20),
+           k.etudiant_id, k.jour, COUNT(DISTINCT e.module_id)::INT,
+           ARRAY_AGG(DISTINCT e.id),
+           'Étudiant ID: ' || k.etudiant_id || ' a ' || COUNT(DISTINCT e.module_id) || ' examens le ' || k.jour
+    FROM etudiants_jours k
+    JOIN inscriptions i ON i.etudiant_id = k.etudiant_id AND i.statut = 'Inscrit'
+    JOIN examens e ON e.module_id = i.module_id
+        AND e.statut IN ('Planifie', 'Confirme')
+        AND e.date_heure >= k.jour AND e.date_heure < k.jour + 1
+    GROUP BY k.etudiant_id, k.jour
+    HAVING COUNT(DISTINCT e.module_id) > 1
+
+    UNION ALL
+    -- Professeur: plus de 3 examens le jour d'une surveillance du périmètre
+    SELECT 'Professeur >3 examens/jour', 'CRITIQUE', 'PROFESSEUR',
+           k.professeur_id, k.jour, COUNT(*)::INT,
+           ARRAY_AGG(e.id ORDER BY e.date_heure),
+           'Professeur ID: ' || k.professeur_id || ' a ' || COUNT(*) || ' examens le ' || k.jour
+    FROM (SELECT DISTINCT professeur_id, jour FROM perimetre) k
+    JOIN examens e ON e.professeur_id = k.professeur_id
+        AND e.statut IN ('Planifie', 'Confirme')
+        AND e.date_heure >= k.jour AND e.date_heure < k.jour + 1
+    GROUP BY k.professeur_id, k.jour
+    HAVING COUNT(*) > 3
+
+    UNION ALL
+    -- Salle: un examen du périmètre chevauche un autre examen de la même salle
+    SELECT 'Chevauchement salle', 'ÉLEVÉ', 'SALLE',
+           p.salle_id, p.jour, COUNT(DISTINCT e.id)::INT,
+           ARRAY_AGG(DISTINCT e.id) || ARRAY_AGG(DISTINCT p.id),
+           'Salle ID: ' || p.salle_id || ' - ' || COUNT(DISTINCT e.id) || ' examen(s) en chevauchement le ' || p.jour
+    FROM perimetre p
+    JOIN examens e ON e.salle_id = p.salle_id
+        AND e.id <> p.id
+        AND e.statut IN ('Planifie', 'Confirme')
+        AND e.date_heure >= p.jour AND e.date_heure < p.jour + 1
+        AND e.date_heure < p.date_heure + p.duree_minutes * INTERVAL '1 minute'
+        AND p.date_heure < e.date_heure + e.duree_minutes * INTERVAL '1 minute'
+    GROUP BY p.salle_id, p.jour
+
+    UNION ALL
+    -- Capacité: effectif d'un examen du périmètre supérieur à la capacité de sa salle
+    SELECT 'Dépassement capacité', 'MOYEN', 'CAPACITE',
+           p.id, p.jour, n.effectif::INT,
+           ARRAY[p.id],
+           'Examen ID: ' || p.id || ' - ' || n.effectif || ' étudiants pour ' || l.capacite || ' places'
+    FROM perimetre p
+    JOIN lieux_examen l ON l.id = p.salle_id
+    CROSS JOIN LATERAL (
+        SELECT CASE WHEN p.groupe_examen IS NULL
+                    THEN (SELECT COUNT(*) FROM inscriptions i WHERE i.module_id = p.module_id AND i.statut = 'Inscrit')
+                    ELSE p.max_etudiants END AS effectif
+    ) n
+    WHERE n.effectif > l.capacite;
+END;
+$$ LANGUAGE plpgsql STABLE;
+
+-- Sélection des examens d'un département: formation -> modules -> examens actifs
+CREATE INDEX IF NOT EXISTS idx_formations_departement ON formations(departement_id, id);
+
+SELECT '✅ PARTIE 16 terminée: détection des conflits par périmètre' AS resultat;
+
+-- ============================================
+-- PARTIE 17: CONTRAINTES D'EXCLUSION SALLE / SURVEILLANT
+-- ============================================
+
+-- UNIQUE(salle_id, date_heure) ne bloque que deux examens qui commencent à la même heure:
+-- la période réelle [début, fin) de chaque examen est exclue par GiST pour une même salle
+-- et un même surveillant, sur les examens actifs uniquement (Annule/Termine ne bloquent rien)
+-- Les contraintes sont DEFERRABLE (vérifiées en fin d'instruction): une réparation qui échange
+-- deux examens en une seule mise à jour (apply_schedule_moves) reste possible
+CREATE EXTENSION IF NOT EXISTS btree_gist;
+
+ALTER TABLE examens
+    ADD COLUMN IF NOT EXISTS periode TSRANGE
+    GENERATED ALWAYS AS (tsrange(date_heure, date_heure + duree_minutes * INTERVAL '1 minute', '[)')) STORED;
+
+-- Une base existante qui contient déjà des chevauchements actifs garde ses contrôles applicatifs:
+-- la contrainte n'est pas créée (avertissement), il suffit de relancer cette partie une fois les
+-- chevauchements résolus (page Conflits > Chevauchements horaires)
+DO $$
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM pg_constraint WHERE conname = 'excl_examens_salle_periode') THEN
+        BEGIN
+            ALTER TABLE examens ADD CONSTRAINT excl_examens_salle_periode
+                EXCLUDE USING gist (salle_id WITH =, periode WITH &&)
+                WHERE (statut IN ('Planifie', 'Confirme'))
+                DEFERRABLE INITIALLY IMMEDIATE;
+        EXCEPTION WHEN exclusion_violation THEN
+            RAISE WARNING 'excl_examens_salle_periode non créée: salles déjà occupées deux fois (%)', SQLERRM;
+        END;
+    END IF;
+
+    IF NOT EXISTS (SELECT 1 FROM pg_constraint WHERE conname = 'excl_examens_surveillant_periode') THEN
+        BEGIN
+            ALTER TABLE examens ADD CONSTRAINT excl_examens_surveillant_periode
+                EXCLUDE USING gist (professeur_id WITH =, periode WITH &&)
+                WHERE (statut IN ('Planifie', 'Confirme'))
+                DEFERRABLE INITIALLY IMMEDIATE;
+        EXCEPTION WHEN exclusion_violation THEN
+            RAISE WARNING 'excl_examens_surveillant_periode non créée: surveillants déjà sur deux examens (%)', SQLERRM;
+        END;
+    END IF;
+
+    -- L'exclusion couvre les examens actifs; un créneau libéré par une annulation redevient utilisable
+    IF EXISTS (SELECT 1 FROM pg_constraint WHERE conname = 'excl_examens_salle_periode') THEN
+        ALTER TABLE examens DROP CONSTRAINT IF EXISTS unique_salle_temps;
+    END IF;
+END $$;
+
+-- Contraintes d'exclusion en place: les chevauchements salle/surveillant ne peuvent plus exister
+CREATE OR REPLACE FUNCTION chevauchements_exclus()
+RETURNS BOOLEAN AS $$
+    SELECT COUNT(*) = 2
+    FROM pg_constraint
+    WHERE conrelid = 'examens'::regclass
+        AND conname IN ('excl_examens_salle_periode', 'excl_examens_surveillant_periode');
+$$ LANGUAGE sql STABLE;
+
+-- Publication: les chevauchements salle/surveillant ne sont plus recherchés par jointure quand
+-- les contraintes sont en place, l'insertion échoue directement sur l'index (voir schedule_publish.py)
+CREATE OR REPLACE FUNCTION verifier_planning_stage()
+RETURNS TABLE(
+    type_conflit VARCHAR(30),
+    ligne INT,
+    module_id INT,
+    salle_id INT,
+    professeur_id INT,
+    date_heure TIMESTAMP,
+    conflit_avec TEXT,
+    nb_etudiants INT,
+    details TEXT
+) AS $$
+#variable_conflict use_column
+DECLARE
+    v_exclus BOOLEAN := chevauchements_exclus();
+BEGIN
+    -- Aucune écriture concurrente sur examens entre les contrôles et l'insertion
+    LOCK TABLE examens IN SHARE ROW EXCLUSIVE MODE;
+
+    RETURN QUERY
+    WITH engages AS (
+        -- Examens enregistrés et examens en attente sur les jours concernés
+        SELECT NULL::INT AS ligne, e.id AS examen_id, e.module_id, e.salle_id, e.professeur_id,
+               e.date_heure, e.date_heure + e.duree_minutes * INTERVAL '1 minute' AS date_fin
+        FROM examens e
+        WHERE e.statut IN ('Planifie', 'Confirme')
+            AND e.date_heure::date IN (SELECT DISTINCT s.date_heure::date FROM planning_stage s)
+        UNION ALL
+        SELECT s.ligne, NULL::INT, s.module_id, s.salle_id, s.professeur_id,
+               s.date_heure, s.date_heure + s.duree_minutes * INTERVAL '1 minute'
+        FROM planning_stage s
+    ),
+    chevauchements AS (
+        -- Salle ou surveillant déjà pris sur un intervalle qui se recoupe
+        SELECT 'SALLE'::VARCHAR(30) AS nature, a.ligne, a.module_id, a.salle_id, a.professeur_id, a.date_heure,
+               COALESCE('examen ' || b.examen_id, 'ligne ' || b.ligne) AS autre,
+               'Salle déjà occupée sur ce créneau' AS motif
+        FROM engages a
+        JOIN engages b
+            ON b.salle_id = a.salle_id
+            AND a.date_heure < b.date_fin
+            AND b.date_heure < a.date_fin
+        WHERE NOT v_exclus
+            AND a.ligne IS NOT NULL
+            AND (b.ligne IS NULL OR b.ligne > a.ligne)
+        UNION ALL
+        SELECT 'SURVEILLANT'::VARCHAR(30), a.ligne, a.module_id, a.salle_id, a.professeur_id, a.date_heure,
+               COALESCE('examen ' || b.examen_id, 'ligne ' || b.ligne),
+               'Surveillant déjà affecté sur ce créneau'
+        FROM engages a
+        JOIN engages b
+            ON b.professeur_id = a.professeur_id
+            AND a.date_heure < b.date_fin
+            AND b.date_heure < a.date_fin
+        WHERE NOT v_exclus
+            AND a.ligne IS NOT NULL
+            AND (b.ligne IS NULL OR b.ligne > a.ligne)
+    ),
+    module_jours AS (
+        SELECT x.module_id, x.date_heure::date AS jour,
+               MIN(x.ligne) AS ligne, MIN(x.examen_id) AS examen_id
+        FROM engages x
+        GROUP BY x.module_id, x.date_heure::date, x.ligne IS NULL
+    )
+    -- Module déjà planifié sur la période (double publication)
+    SELECT 'MODULE_DEJA_PLANIFIE'::VARCHAR(30), s.ligne, s.module_id, s.salle_id, s.professeur_id,
+           s.date_heure, 'examen ' || e.id, NULL::INT,
+           'Le module a déjà un examen le ' || TO_CHAR(e.date_heure, 'DD/MM/YYYY HH24:MI')
+    FROM planning_stage s
+    JOIN examens e ON e.module_id = s.module_id
+    WHERE e.statut IN ('Planifie', 'Confirme')
+        AND e.date_heure BETWEEN (SELECT MIN(p.date_heure) FROM planning_stage p)::date
+                             AND (SELECT MAX(p.date_heure) FROM planning_stage p)::date + 1
+
+    UNION ALL
+    -- Chevauchements de salle et de surveillant
+    SELECT c.nature, c.ligne, c.module_id, c.salle_id, c.professeur_id, c.date_heure,
+           c.autre, NULL::INT, c.motif
+    FROM chevauchements c
+
+    UNION ALL
+    -- Capacité de la salle dépassée
+    SELECT 'CAPACITE'::VARCHAR(30), s.ligne, s.module_id, s.salle_id, s.professeur_id, s.date_heure,
+           NULL::TEXT, s.nb_etudiants,
+           s.nb_etudiants || ' étudiants pour ' || l.capacite || ' places'
+    FROM planning_stage s
+    JOIN lieux_examen l ON l.id = s.salle_id
+    WHERE s.nb_etudiants > l.capacite
+
+    UNION ALL
+    -- Professeur au-delà de 3 examens par jour
+    SELECT 'PROFESSEUR'::VARCHAR(30), MIN(x.ligne), NULL::INT, NULL::INT, x.professeur_id,
+           MIN(x.date_heure), NULL::TEXT, NULL::INT,
+           COUNT(*) || ' examens le ' || TO_CHAR(x.date_heure::date, 'DD/MM/YYYY')
+    FROM engages x
+    GROUP BY x.professeur_id, x.date_heure::date
+    HAVING COUNT(*) > 3 AND BOOL_OR(x.ligne IS NOT NULL)
+
+    UNION ALL
+    -- Étudiants avec deux examens le même jour (un module réparti compte une fois)
+    SELECT 'ETUDIANT'::VARCHAR(30), a.ligne, a.module_id, NULL::INT, NULL::INT, a.jour::TIMESTAMP,
+           COALESCE('ligne ' || b.ligne, 'examen ' || b.examen_id), COUNT(DISTINCT ia.etudiant_id)::INT,
+           COUNT(DISTINCT ia.etudiant_id) || ' étudiant(s) communs avec le module ' || b.module_id || ' le ' || TO_CHAR(a.jour, 'DD/MM/YYYY')
+    FROM module_jours a
+    JOIN module_jours b
+        ON b.jour = a.jour
+        AND b.module_id <> a.module_id
+        AND (b.ligne IS NULL OR b.module_id > a.module_id)
+    JOIN inscriptions ia ON ia.module_id = a.module_id AND ia.statut = 'Inscrit'
+    JOIN inscriptions ib ON ib.module_id = b.module_id AND ib.statut = 'Inscrit'
+        AND ib.etudiant_id = ia.etudiant_id
+    WHERE a.ligne IS NOT NULL
+    GROUP BY a.ligne, a.module_id, a.jour, b.ligne, b.examen_id, b.module_id;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Registre des conflits: les clés SALLE ne sont plus recalculées quand l'exclusion est garantie
+CREATE OR REPLACE FUNCTION recalculer_conflits_examens(
+    p_examens INT[],
+    p_modules INT[],
+    p_professeurs INT[],
+    p_salles INT[],
+    p_jours DATE[]
+)
+RETURNS INTEGER AS $$
+DECLARE
+    v_types VARCHAR[];
+    v_entites INT[];
+    v_jours DATE[];
+BEGIN
+    WITH touches AS (
+        SELECT DISTINCT *
+        FROM unnest(p_examens, p_modules, p_professeurs, p_salles, p_jours)
+            AS t(examen_id, module_id, professeur_id, salle_id, jour)
+    ),
+    cles AS (
+        SELECT 'PROFESSEUR'::VARCHAR AS cle_type, t.professeur_id AS entite_id, t.jour FROM touches t
+        UNION
+        SELECT 'SALLE', t.salle_id, t.jour FROM touches t WHERE NOT chevauchements_exclus()
+        UNION
+        SELECT 'CAPACITE', t.examen_id, t.jour FROM touches t
+        UNION
+        SELECT 'ETUDIANT', i.etudiant_id, t.jour
+        FROM (SELECT DISTINCT module_id, jour FROM touches) t
+        JOIN inscriptions i ON i.module_id = t.module_id AND i.statut = 'Inscrit'
+    )
+    SELECT ARRAY_AGG(cle_type), ARRAY_AGG(entite_id), ARRAY_AGG(jour)
+    INTO v_types, v_entites, v_jours
+    FROM cles;
+
+    RETURN recalculer_conflits(v_types, v_entites, v_jours);
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION reconstruire_conflits()
+RETURNS INTEGER AS $$
+DECLARE
+    v_types VARCHAR[];
+    v_entites INT[];
+    v_jours DATE[];
+BEGIN
+    WITH cles AS (
+        SELECT 'PROFESSEUR'::VARCHAR AS cle_type, e.professeur_id AS entite_id, e.date_heure::date AS jour
+        FROM examens e WHERE e.statut IN ('Planifie', 'Confirme')
+        UNION
+        SELECT 'SALLE', e.salle_id, e.date_heure::date
+        FROM examens e WHERE e.statut IN ('Planifie', 'Confirme') AND NOT chevauchements_exclus()
+        UNION
+        SELECT 'CAPACITE', e.id, e.date_heure::date
+        FROM examens e WHERE e.statut IN ('Planifie', 'Confirme')
+        UNION
+        SELECT 'ETUDIANT', i.etudiant_id, e.date_heure::date
+        FROM examens e
+        JOIN inscriptions i ON i.module_id = e.module_id AND i.statut = 'Inscrit'
+        WHERE e.statut IN ('Planifie', 'Confirme')
+        UNION
+        -- Conflits encore ouverts dont la clé n'a plus d'examen
+        SELECT c.cle_type, c.entite_id, c.jour
+        FROM conflits_examens c
+        WHERE c.cle_type IS NOT NULL AND c.statut <> 'Résolu'
+    )
+    SELECT ARRAY_AGG(cle_type), ARRAY_AGG(entite_id), ARRAY_AGG(jour)
+    INTO v_types, v_entites, v_jours
+    FROM cles;
+
+    RETURN recalculer_conflits(v_types, v_entites, v_jours);
+END;
+$$ LANGUAGE plpgsql;
+
+SELECT '✅ PARTIE 17 terminée: contraintes d''exclusion salle/surveillant' AS resultat;
+
+-- ============================================
+-- PARTIE 18: CALENDRIER ET CONFLITS D'UN ÉTUDIANT
+-- ============================================
+
+-- Chemin d'accès par étudiant: inscriptions (etudiant_id, module_id) puis examens actifs du module
+-- triés par date; id et durée sont dans l'index, la lecture des examens se fait sur l'index seul
+DROP INDEX IF EXISTS idx_examens_module_date_actifs;
+CREATE INDEX idx_examens_module_date_actifs
+    ON examens(module_id, date_heure) INCLUDE (id, duree_minutes)
+    WHERE statut IN ('Planifie', 'Confirme');
+
+-- Examens actifs d'un étudiant par ordre chronologique (un module réparti compte une fois)
+CREATE OR REPLACE FUNCTION calendrier_etudiant(p_etudiant_id INT)
+RETURNS TABLE(
+    module_id INT,
+    module_nom VARCHAR,
+    date_heure TIMESTAMP,
+    date_fin TIMESTAMP,
+    examens_ids INT[]
+) AS $$
+    SELECT e.module_id, m.nom, e.date_heure,
+           e.date_heure + MAX(e.duree_minutes) * INTERVAL '1 minute',
+           ARRAY_AGG(e.id ORDER BY e.id)
+    FROM inscriptions i
+    JOIN examens e ON e.module_id = i.module_id
+        AND e.statut IN ('Planifie', 'Confirme')
+    JOIN modules m ON m.id = e.module_id
+    WHERE i.etudiant_id = p_etudiant_id
+        AND i.statut = 'Inscrit'
+    GROUP BY e.module_id, m.nom, e.date_heure
+    ORDER BY e.date_heure, e.module_id;
+$$ LANGUAGE sql STABLE;
+
+-- Conflits d'un étudiant en un seul parcours ordonné du calendrier:
+--   plusieurs examens le même jour (comptage par jour) et moins de 2h entre deux débuts consécutifs (LAG)
+CREATE OR REPLACE FUNCTION conflits_etudiant(p_etudiant_id INT)
+RETURNS TABLE(
+    type_conflit TEXT,
+    details TEXT,
+    severite TEXT,
+    examens_ids INT[]
+) AS $$
+    WITH parcours AS (
+        SELECT c.*,
+               c.date_heure::date AS jour,
+               COUNT(*) OVER (PARTITION BY c.date_heure::date) AS nb_jour,
+               ARRAY_AGG(c.examens_ids[1]) OVER (PARTITION BY c.date_heure::date) AS ids_jour,
+               ROW_NUMBER() OVER w AS rang_jour,
+               LAG(c.module_nom) OVER w AS precedent_nom,
+               LAG(c.date_heure) OVER w AS precedent_debut,
+               LAG(c.examens_ids) OVER w AS precedent_ids
+        FROM calendrier_etudiant(p_etudiant_id) c
+        WINDOW w AS (PARTITION BY c.date_heure::date ORDER BY c.date_heure, c.module_id)
+    )
+    SELECT 'Conflit horaire',
+           'Vous avez ' || p.nb_jour || ' examens le ' || p.jour,
+           'CRITIQUE',
+           p.ids_jour
+    FROM parcours p
+    WHERE p.nb_jour > 1 AND p.rang_jour = 1
+
+    UNION ALL
+
+    SELECT 'Intervalle trop court',
+           'Seulement ' || EXTRACT(HOUR FROM (p.date_heure - p.precedent_debut)) || 'h entre ' ||
+           p.precedent_nom || ' et ' || p.module_nom,
+           'ÉLEVÉ',
+           p.precedent_ids[1:1] || p.examens_ids[1:1]
+    FROM parcours p
+    WHERE p.precedent_debut IS NOT NULL
+        AND p.date_heure - p.precedent_debut <= INTERVAL '120 minutes';
+$$ LANGUAGE sql STABLE;
+
+SELECT '✅ PARTIE 18 terminée: calendrier et conflits par étudiant' AS resultat;
+
+-- ============================================
+-- PARTIE 19: PAGINATION DES CONFLITS PAR CURSEUR
+-- ============================================
+
+-- Ordre d'affichage des conflits ouverts: sévérité, jour, id (clé de curseur)
+CREATE OR REPLACE FUNCTION rang_severite(p_severite VARCHAR)
+RETURNS INTEGER AS $$
+    SELECT CASE p_severite
+        WHEN 'CRITIQUE' THEN 1
+        WHEN 'ÉLEVÉ' THEN 2
+        WHEN 'MOYEN' THEN 3
+        ELSE 4
+    END;
+$$ LANGUAGE sql IMMUTABLE;
+
+CREATE INDEX IF NOT EXISTS idx_conflits_pagination
+    ON conflits_examens(rang_severite(severite), jour, id)
+    WHERE cle_type IS NOT NULL AND statut <> 'Résolu';
+
+-- Une page de conflits ouverts après le curseur (rang, jour, id) de la dernière ligne reçue
+-- Curseur NULL: première page; p_severite NULL: toutes les sévérités
+CREATE OR REPLACE FUNCTION conflits_page(
+    p_limite INT DEFAULT 100,
+    p_severite VARCHAR DEFAULT NULL,
+    p_apres_rang INT DEFAULT NULL,
+    p_apres_jour DATE DEFAULT NULL,
+    p_apres_id INT DEFAULT NULL
+)
+RETURNS TABLE(
+    id INT,
+    type_conflit VARCHAR,
+    severite VARCHAR,
+    cle_type VARCHAR,
+    entite_id INT,
+    jour DATE,
+    nb INT,
+    details TEXT,
+    examens_impliques JSONB,
+    rang INT
+) AS $$
+    SELECT c.id, c.type_conflit, c.severite, c.cle_type, c.entite_id, c.jour, c.nb,
+           c.description, c.examens_impliques, rang_severite(c.severite)
+    FROM conflits_examens c
+    WHERE c.cle_type IS NOT NULL AND c.statut <> 'Résolu'
+        AND (p_severite IS NULL
+             OR (c.severite = p_severite AND rang_severite(c.severite) = rang_severite(p_severite)))
+        AND (p_apres_id IS NULL
+             OR (rang_severite(c.severite), c.jour, c.id) > (p_apres_rang, p_apres_jour, p_apres_id))
+    ORDER BY rang_severite(c.severite), c.jour, c.id
+    LIMIT p_limite;
+$$ LANGUAGE sql STABLE;
+
+-- Agrégats des conflits ouverts pour les indicateurs et graphiques (quelques lignes au plus)
+CREATE OR REPLACE FUNCTION resume_conflits(p_severite VARCHAR DEFAULT NULL)
+RETURNS TABLE(
+    severite VARCHAR,
+    type_conflit VARCHAR,
+    nb_conflits BIGINT,
+    premier_jour DATE,
+    dernier_jour DATE
+) AS $$
+    SELECT c.severite, c.type_conflit, COUNT(*), MIN(c.jour), MAX(c.jour)
+    FROM conflits_examens c
+    WHERE c.cle_type IS NOT NULL AND c.statut <> 'Résolu'
+        AND (p_severite IS NULL OR c.severite = p_severite)
+    GROUP BY c.severite, c.type_conflit
+    ORDER BY rang_severite(c.severite), COUNT(*) DESC;
+$$ LANGUAGE sql STABLE;
+
+-- Conflits ouverts par jour et sévérité (courbe de charge du planning)
+CREATE OR REPLACE FUNCTION resume_conflits_par_jour(p_severite VARCHAR DEFAULT NULL)
+RETURNS TABLE(
+    jour DATE,
+    severite VARCHAR,
+    nb_conflits BIGINT
+) AS $$
+    SELECT c.jour, c.severite, COUNT(*)
+    FROM conflits_examens c
+    WHERE c.cle_type IS NOT NULL AND c.statut <> 'Résolu'
+        AND (p_severite IS NULL OR c.severite = p_severite)
+    GROUP BY c.jour, c.severite
+    ORDER BY c.jour, rang_severite(c.severite);
+$$ LANGUAGE sql STABLE;
+
+SELECT '✅ PARTIE 19 terminée: pagination des conflits par curseur' AS resultat;
+
+-- ============================================
+-- PARTIE 20: EFFECTIFS INSCRITS PAR MODULE MAINTENUS PAR TRIGGERS
+-- ============================================
+
+-- Nombre d'inscrits (statut 'Inscrit') par module, session et année: remplace les COUNT corrélés
+-- sur inscriptions dans les calculs de capacité (une lecture d'index par module)
+-- Une inscription sans session compte dans la session principale
+CREATE TABLE IF NOT EXISTS module_enrolment_stats (
+    module_id INT NOT NULL REFERENCES modules(id) ON DELETE CASCADE,
+    session VARCHAR(10) NOT NULL,
+    annee INT NOT NULL,
+    nb_inscrits INT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (module_id, session, annee)
+);
+
+-- Reconstruction complète (initialisation, contrôle de cohérence)
+CREATE OR REPLACE FUNCTION reconstruire_module_enrolment_stats()
+RETURNS INTEGER AS $$
+DECLARE
+    v_nb INTEGER;
+BEGIN
+    DELETE FROM module_enrolment_stats;
+    INSERT INTO module_enrolment_stats (module_id, session, annee, nb_inscrits)
+    SELECT module_id, COALESCE(session, 'Principale'), annee_academique, COUNT(*)
+    FROM inscriptions
+    WHERE statut = 'Inscrit'
+    GROUP BY module_id, COALESCE(session, 'Principale'), annee_academique;
+    GET DIAGNOSTICS v_nb = ROW_COUNT;
+    RETURN v_nb;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Les lignes de l'instruction sont agrégées en écarts par clé (+1 nouvelle, -1 ancienne) puis
+-- ajoutées aux compteurs: une mise à jour par clé touchée, quel que soit le volume importé
+-- Seules les clés des anciennes lignes peuvent tomber à zéro: le nettoyage se limite à elles
+CREATE OR REPLACE FUNCTION trg_module_enrolment_stats()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'TRUNCATE' THEN
+        DELETE FROM module_enrolment_stats;
+        RETURN NULL;
+    END IF;
+
+    IF TG_OP = 'INSERT' THEN
+        INSERT INTO module_enrolment_stats AS s (module_id, session, annee, nb_inscrits)
+        SELECT module_id, COALESCE(session, 'Principale'), annee_academique, COUNT(*)
+        FROM nouveaux
+        WHERE statut = 'Inscrit'
+        GROUP BY 1, 2, 3
+        ON CONFLICT (module_id, session, annee) DO UPDATE
+        SET nb_inscrits = s.nb_inscrits + EXCLUDED.nb_inscrits, updated_at = CURRENT_TIMESTAMP;
+    ELSIF TG_OP = 'DELETE' THEN
+        UPDATE module_enrolment_stats s
+        SET nb_inscrits = s.nb_inscrits - d.nb, updated_at = CURRENT_TIMESTAMP
+        FROM (
+            SELECT module_id, COALESCE(session, 'Principale') AS session, annee_academique AS annee, COUNT(*) AS nb
+            FROM anciens
+            WHERE statut = 'Inscrit'
+            GROUP BY 1, 2, 3
+        ) d
+        WHERE s.module_id = d.module_id AND s.session = d.session AND s.annee = d.annee;
+
+        DELETE FROM module_enrolment_stats s
+        USING (SELECT DISTINCT module_id, COALESCE(session, 'Principale') AS session, annee_academique AS annee
+               FROM anciens WHERE statut = 'Inscrit') d
+        WHERE s.module_id = d.module_id AND s.session = d.session AND s.annee = d.annee
+            AND s.nb_inscrits <= 0;
+    ELSE
+        -- Changement de statut, de module ou de session: l'écart net par clé suffit
+        INSERT INTO module_enrolment_stats AS s (module_id, session, annee, nb_inscrits)
+        SELECT module_id, session, annee, SUM(delta)
+        FROM (
+            SELECT module_id, COALESCE(session, 'Principale') AS session, annee_academique AS annee, 1 AS delta
+            FROM nouveaux WHERE statut = 'Inscrit'
+            UNION ALL
+            SELECT module_id, COALESCE(session, 'Principale'), annee_academique, -1
+            FROM anciens WHERE statut = 'Inscrit'
+        ) x
+        GROUP BY module_id, session, annee
+        HAVING SUM(delta) <> 0
+        ON CONFLICT (module_id, session, annee) DO UPDATE
+        SET nb_inscrits = s.nb_inscrits + EXCLUDED.nb_inscrits, updated_at = CURRENT_TIMESTAMP;
+
+        DELETE FROM module_enrolment_stats s
+        USING (SELECT DISTINCT module_id, COALESCE(session, 'Principale') AS session, annee_academique AS annee
+               FROM anciens WHERE statut = 'Inscrit') d
+        WHERE s.module_id = d.module_id AND s.session = d.session AND s.annee = d.annee
+            AND s.nb_inscrits <= 0;
+    END IF;
+
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_module_enrolment_stats_ins ON inscriptions;
+CREATE TRIGGER trg_module_enrolment_stats_ins
+AFTER INSERT ON inscriptions
+REFERENCING NEW TABLE AS nouveaux
+FOR EACH STATEMENT EXECUTE FUNCTION trg_module_enrolment_stats();
+
+DROP TRIGGER IF EXISTS trg_module_enrolment_stats_upd ON inscriptions;
+CREATE TRIGGER trg_module_enrolment_stats_upd
+AFTER UPDATE ON inscriptions
+REFERENCING OLD TABLE AS anciens NEW TABLE AS nouveaux
+FOR EACH STATEMENT EXECUTE FUNCTION trg_module_enrolment_stats();
+
+DROP TRIGGER IF EXISTS trg_module_enrolment_stats_del ON inscriptions;
+CREATE TRIGGER trg_module_enrolment_stats_del
+AFTER DELETE ON inscriptions
+REFERENCING OLD TABLE AS anciens
+FOR EACH STATEMENT EXECUTE FUNCTION trg_module_enrolment_stats();
+
+DROP TRIGGER IF EXISTS trg_module_enrolment_stats_trunc ON inscriptions;
+CREATE TRIGGER trg_module_enrolment_stats_trunc
+AFTER TRUNCATE ON inscriptions
+FOR EACH STATEMENT EXECUTE FUNCTION trg_module_enrolment_stats();
+
+SELECT reconstruire_module_enrolment_stats();
+
+-- Session d'inscription concernée par un examen: un rattrapage convoque les inscrits au rattrapage
+CREATE OR REPLACE FUNCTION session_examen(p_type_examen VARCHAR)
+RETURNS VARCHAR AS $$
+    SELECT CASE WHEN p_type_examen = 'Rattrapage' THEN 'Rattrapage' ELSE 'Principale' END;
+$$ LANGUAGE sql IMMUTABLE;
+
+-- Inscrits d'un module par session, pour son année universitaire courante (la plus récente)
+-- Une ligne de compteur par (module, session, année) et une inscription par étudiant et clé
+-- (UNIQUE sur inscriptions): chaque effectif compte des étudiants distincts, sans additionner
+-- les réinscriptions d'autres années ni le rattrapage avec la session principale
+-- Jointure attendue: s.module_id = e.module_id AND s.session = session_examen(e.type_examen)
+CREATE OR REPLACE VIEW v_inscrits_module AS
+SELECT module_id, session, nb_inscrits
+FROM (
+    SELECT module_id, session, annee, nb_inscrits,
+           MAX(annee) OVER (PARTITION BY module_id) AS annee_courante
+    FROM module_enrolment_stats
+) s
+WHERE annee = annee_courante;
+
+-- Vues de planning: effectifs lus dans les compteurs au lieu d'un comptage par examen
+CREATE OR REPLACE VIEW v_planning_examens AS
+SELECT
+    e.id,
+    e.uuid,
+    m.code as module_code,
+    m.nom as module_nom,
+    f.nom as formation_nom,
+    d.nom as departement_nom,
+    p.nom || ' ' || p.prenom as professeur_nom,
+    l.nom as salle_nom,
+    l.type as salle_type,
+    l.capacite,
+    e.date_heure,
+    e.duree_minutes,
+    e.type_examen,
+    e.statut,
+    COALESCE(s.nb_inscrits, 0) as etudiants_inscrits
+FROM examens e
+JOIN modules m ON e.module_id = m.id
+JOIN formations f ON m.formation_id = f.id
+JOIN departements d ON f.departement_id = d.id
+JOIN professeurs p ON e.professeur_id = p.id
+JOIN lieux_examen l ON e.salle_id = l.id
+LEFT JOIN v_inscrits_module s ON s.module_id = e.module_id
+    AND s.session = session_examen(e.type_examen);
+
+CREATE OR REPLACE VIEW v_occupation_salles AS
+SELECT
+    l.id,
+    l.nom,
+    l.type,
+    l.capacite,
+    COUNT(e.id) as nb_examens_planifies,
+    COALESCE(AVG(COALESCE(s.nb_inscrits, 0)::FLOAT / l.capacite * 100), 0) as taux_occupation_moyen
+FROM lieux_examen l
+LEFT JOIN examens e ON l.id = e.salle_id
+    AND e.statut IN ('Planifie', 'Confirme')
+    AND e.date_heure >= CURRENT_DATE
+LEFT JOIN v_inscrits_module s ON s.module_id = e.module_id
+    AND s.session = session_examen(e.type_examen)
+GROUP BY l.id, l.nom, l.type, l.capacite;
+
+SELECT '✅ PARTIE 20 terminée: effectifs inscrits par module maintenus par triggers' AS resultat;
+
+-- ============================================
+-- PARTIE 21: STATISTIQUES DÉPARTEMENT MATÉRIALISÉES
+-- ============================================
+
+-- v_stats_departement devient une vue matérialisée: les tableaux de bord lisent une ligne par
+-- département au lieu de huit sous-requêtes corrélées à chaque affichage
+-- Rafraîchie après publication d'un planning ou validation d'examens, et périodiquement
+-- (stats_refresh.py); rafraichi_le indique la fraîcheur affichée à côté du tableau
+DO $$
+BEGIN
+    IF (SELECT relkind FROM pg_class WHERE oid = to_regclass('v_stats_departement')) = 'v' THEN
+        DROP VIEW v_stats_departement;
+    END IF;
+END $$;
+
+CREATE MATERIALIZED VIEW IF NOT EXISTS v_stats_departement AS
+WITH formations_dep AS (
+    SELECT departement_id, COUNT(*) AS nb
+    FROM formations
+    GROUP BY departement_id
+), etudiants_dep AS (
+    SELECT f.departement_id, COUNT(*) AS nb
+    FROM etudiants e
+    JOIN formations f ON e.formation_id = f.id
+    WHERE e.statut = 'Actif'
+    GROUP BY f.departement_id
+), professeurs_dep AS (
+    SELECT departement_id, COUNT(*) AS nb
+    FROM professeurs
+    WHERE is_active = TRUE
+    GROUP BY departement_id
+), modules_dep AS (
+    SELECT f.departement_id, COUNT(*) AS nb
+    FROM modules m
+    JOIN formations f ON m.formation_id = f.id
+    GROUP BY f.departement_id
+), examens_dep AS (
+    SELECT f.departement_id,
+        COUNT(*) FILTER (WHERE e.statut IN ('Planifie', 'Confirme')) AS nb_planifies,
+        COUNT(*) FILTER (WHERE e.statut = 'Termine') AS nb_termines,
+        MAX(e.date_heure) AS dernier,
+        MIN(e.date_heure) FILTER (WHERE e.date_heure > CURRENT_TIMESTAMP) AS premier
+    FROM examens e
+    JOIN modules m ON e.module_id = m.id
+    JOIN formations f ON m.formation_id = f.id
+    GROUP BY f.departement_id
+)
+SELECT
+    d.id as departement_id,
+    d.nom as departement_nom,
+    COALESCE(fo.nb, 0) as nb_formations,
+    COALESCE(et.nb, 0) as nb_etudiants,
+    COALESCE(pr.nb, 0) as nb_professeurs,
+    COALESCE(mo.nb, 0) as nb_modules,
+    COALESCE(ex.nb_planifies, 0) as nb_examens_planifies,
+    COALESCE(ex.nb_termines, 0) as nb_examens_termines,
+    (SELECT AVG(capacite) FROM lieux_examen WHERE is_disponible = TRUE) as capacite_moyenne_salles,
+    ex.dernier as dernier_examen,
+    ex.premier as premier_examen,
+    CURRENT_TIMESTAMP as rafraichi_le
+FROM departements d
+LEFT JOIN formations_dep fo ON fo.departement_id = d.id
+LEFT JOIN etudiants_dep et ON et.departement_id = d.id
+LEFT JOIN professeurs_dep pr ON pr.departement_id = d.id
+LEFT JOIN modules_dep mo ON mo.departement_id = d.id
+LEFT JOIN examens_dep ex ON ex.departement_id = d.id;
+
+-- Index unique requis par REFRESH ... CONCURRENTLY (les lectures ne sont pas bloquées)
+CREATE UNIQUE INDEX IF NOT EXISTS idx_stats_departement_id
+ON v_stats_departement(departement_id);
+
+CREATE OR REPLACE FUNCTION rafraichir_stats_departement()
+RETURNS TIMESTAMPTZ AS $$
+BEGIN
+    REFRESH MATERIALIZED VIEW CONCURRENTLY v_stats_departement;
+    RETURN CURRENT_TIMESTAMP;
+END;
+$$ LANGUAGE plpgsql;
+
+SELECT '✅ PARTIE 21 terminée: statistiques département matérialisées' AS resultat;
+
+-- ============================================
+-- PARTIE 22: CONFLITS D'UN ÉTUDIANT SUR TOUTE LA FENÊTRE DE 2H
+-- ============================================
+
+-- conflits_etudiant (PARTIE 18) ne comparait un examen qu'à son prédécesseur immédiat (LAG):
+-- avec des examens à 08:00, 09:00 et 10:00, la paire 08:00-10:00 n'était pas signalée
+-- Chaque examen est maintenant apparié à tous les examens du même jour commençant dans les
+-- 120 minutes qui précèdent (jointure bornée sur le calendrier de l'étudiant, quelques lignes)
+CREATE OR REPLACE FUNCTION conflits_etudiant(p_etudiant_id INT)
+RETURNS TABLE(
+    type_conflit TEXT,
+    details TEXT,
+    severite TEXT,
+    examens_ids INT[]
+) AS $$
+    WITH parcours AS MATERIALIZED (
+        SELECT c.*,
+               c.date_heure::date AS jour,
+               COUNT(*) OVER (PARTITION BY c.date_heure::date) AS nb_jour,
+               ARRAY_AGG(c.examens_ids[1]) OVER (PARTITION BY c.date_heure::date) AS ids_jour,
+               ROW_NUMBER() OVER (PARTITION BY c.date_heure::date ORDER BY c.date_heure, c.module_id) AS rang_jour
+        FROM calendrier_etudiant(p_etudiant_id) c
+    )
+    SELECT 'Conflit horaire',
+           'Vous avez ' || p.nb_jour || ' examens le ' || p.jour,
+           'CRITIQUE',
+           p.ids_jour
+    FROM parcours p
+    WHERE p.nb_jour > 1 AND p.rang_jour = 1
+
+    UNION ALL
+
+    SELECT 'Intervalle trop court',
+           'Seulement ' || EXTRACT(HOUR FROM (p.date_heure - a.date_heure)) || 'h entre ' ||
+           a.module_nom || ' et ' || p.module_nom,
+           'ÉLEVÉ',
+           a.examens_ids[1:1] || p.examens_ids[1:1]
+    FROM parcours p
+    JOIN parcours a ON a.jour = p.jour
+        AND a.rang_jour < p.rang_jour
+        AND a.date_heure >= p.date_heure - INTERVAL '120 minutes';
+$$ LANGUAGE sql STABLE;
+
+SELECT '✅ PARTIE 22 terminée: conflits étudiant sur toute la fenêtre de 2h' AS resultat;
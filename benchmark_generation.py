@@ -0,0 +1,232 @@
+"""
+Banc d'essai de la génération d'emplois du temps (objectif affiché : génération EDT < 45s)
+Chaque instance synthétique (petit, moyen, production) est générée dans un processus neuf pour mesurer
+la mémoire maximale de la génération seule. On relève la durée de chaque phase de ExamScheduleOptimizer
+(chargement, priorités, affectation, conflits, amélioration, sauvegarde), le score et les conflits,
+on écrit les résultats en JSON et CSV et on les compare à une référence enregistrée
+
+Exemples:
+    python benchmark_generation.py --instances petit moyen production
+    python benchmark_generation.py --improvement recherche_locale --time-budget 30 --save-baseline
+    python benchmark_generation.py --database 2026-06-01 2026-06-28
+
+Sans --database rien n'est lu ni écrit en base : le chargement construit le modèle en mémoire
+(synthetic_data) et la sauvegarde mesure la préparation du flux COPY de publication
+Code de sortie 1 si une régression est détectée par rapport à la référence
+"""
+import argparse
+import csv
+import json
+import multiprocessing
+import os
+import platform
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime
+
+from exam_optimizer import build_schedule, CONSTRUCTION_STRATEGIES, IMPROVEMENT_STRATEGIES, DEFAULT_TIME_BUDGET
+from synthetic_data import SyntheticUniversity, PRESETS, DEFAULT_ACADEMIC_YEAR, default_period
+
+# Phases mesurées, dans l'ordre du pipeline (clés de ExamScheduleOptimizer.phase_times)
+PHASES = ['chargement', 'index', 'priorites', 'affectation', 'amelioration', 'conflits', 'evaluation', 'bornes',
+          'sauvegarde']
+
+TARGET_SECONDS = 45.0
+DEFAULT_OUTPUT_DIR = 'benchmarks'
+DEFAULT_BASELINE = os.path.join(DEFAULT_OUTPUT_DIR, 'baseline.json')
+
+# Seuils de régression: une durée régresse si elle dépasse la référence de plus de TOLERANCE_PCT %
+# et d'au moins MIN_DELTA_SECONDS (les phases très courtes sont dominées par le bruit de mesure)
+TOLERANCE_PCT = 25.0
+MIN_DELTA_SECONDS = 0.5
+SCORE_TOLERANCE = 1.0
+
+
+def _peak_memory_mb():
+    """Mémoire résidente maximale du processus courant (Mo), None si non mesurable"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss est en octets sous macOS, en kilo-octets sous Linux
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+def _run_instance(instance, options):
+    """Génère une instance (exécuté dans un processus neuf) et retourne ses mesures"""
+    from schedule_publish import _copy_buffer
+
+    start_time = time.perf_counter()
+    if options.get('database'):
+        optimizer = build_schedule(
+            options['database'][0], options['database'][1],
+            construction=options['construction'], improvement=options['improvement'],
+            time_budget=options['time_budget'], seed=options['seed']
+        )
+    else:
+        load_start = time.perf_counter()
+        university = SyntheticUniversity.from_preset(
+            instance, seed=options['seed'], academic_year=options['academic_year']
+        )
+        optimizer = university.to_optimizer(*default_period(options['academic_year']))
+        load_time = time.perf_counter() - load_start
+        optimizer.generate_schedule(
+            parallel=options['construction'] == 'parallele', improvement=options['improvement'],
+            time_budget=options['time_budget'], seed=options['seed']
+        )
+        optimizer.phase_times['chargement'] = load_time
+
+    # Sauvegarde: préparation du flux COPY, sans écriture en base
+    with optimizer._phase('sauvegarde'):
+        _copy_buffer(optimizer.generated_schedule).getvalue()
+    total = time.perf_counter() - start_time
+
+    result = {
+        'instance': instance,
+        'modules': len(optimizer.modules_data),
+        'examens': len(optimizer.generated_schedule),
+        'score_global': round(optimizer.score_report.get('global', 0.0), 2),
+        'conflits': len(optimizer.conflicts),
+        'modules_non_places': len(optimizer.unplaced_modules),
+        'duree_totale_s': round(total, 3),
+        'memoire_max_mo': _peak_memory_mb(),
+    }
+    result['objectif_45s'] = total < TARGET_SECONDS
+    for phase in PHASES:
+        result[f'{phase}_s'] = round(optimizer.phase_times.get(phase, 0.0), 3)
+    return result
+
+
+def run_benchmark(instances, construction='glouton', improvement='aucune', time_budget=DEFAULT_TIME_BUDGET,
+                  seed=42, database=None, academic_year=DEFAULT_ACADEMIC_YEAR) -> list:
+    """Mesure chaque instance dans son propre processus; retourne une ligne de résultats par instance"""
+    options = {
+        'construction': construction, 'improvement': improvement,
+        'time_budget': time_budget, 'seed': seed, 'database': database,
+        'academic_year': academic_year,
+    }
+    if database:
+        instances = [f"base {database[0]} → {database[1]}"]
+
+    # 'spawn': le processus part de zéro, sa mémoire maximale ne mesure que l'instance
+    context = multiprocessing.get_context('spawn')
+    results = []
+    for instance in instances:
+        print(f"⏱️  {instance}...", flush=True)
+        with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+            result = executor.submit(_run_instance, instance, options).result()
+        print(f"   → {result['duree_totale_s']}s, {result['memoire_max_mo']} Mo, "
+              f"score {result['score_global']}, {result['conflits']} conflit(s)")
+        results.append(result)
+    return results
+
+
+def write_results(results, meta, output_dir=DEFAULT_OUTPUT_DIR) -> tuple:
+    """Écrit les résultats en JSON (avec le contexte d'exécution) et en CSV; retourne les chemins"""
+    os.makedirs(output_dir, exist_ok=True)
+    stamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    json_path = os.path.join(output_dir, f'benchmark_{stamp}.json')
+    csv_path = os.path.join(output_dir, f'benchmark_{stamp}.csv')
+
+    with open(json_path, 'w', encoding='utf-8') as handle:
+        json.dump({'meta': meta, 'resultats': results}, handle, ensure_ascii=False, indent=2)
+    with open(csv_path, 'w', encoding='utf-8', newline='') as handle:
+        writer = csv.DictWriter(handle, fieldnames=list(results[0]))
+        writer.writeheader()
+        writer.writerows(results)
+    return json_path, csv_path
+
+
+def compare_to_baseline(results, baseline, tolerance_pct=TOLERANCE_PCT, min_delta=MIN_DELTA_SECONDS) -> list:
+    """
+    Régressions par rapport à la référence (mêmes instances uniquement)
+    Durées: au-delà de la tolérance relative ET de l'écart minimal; score: baisse de plus de SCORE_TOLERANCE;
+    conflits et modules non placés: toute hausse
+    """
+    reference = {row['instance']: row for row in baseline.get('resultats', [])}
+    regressions = []
+    for result in results:
+        base = reference.get(result['instance'])
+        if base is None:
+            continue
+        for key in ['duree_totale_s'] + [f'{phase}_s' for phase in PHASES]:
+            old, new = base.get(key, 0.0), result.get(key, 0.0)
+            if new - old > min_delta and new > old * (1 + tolerance_pct / 100):
+                regressions.append(
+                    f"{result['instance']}: {key} {old}s → {new}s (+{100 * (new - old) / max(old, 1e-9):.0f}%)"
+                )
+        if result['score_global'] < base.get('score_global', 0.0) - SCORE_TOLERANCE:
+            regressions.append(f"{result['instance']}: score {base['score_global']} → {result['score_global']}")
+        for key in ('conflits', 'modules_non_places'):
+            if result[key] > base.get(key, 0):
+                regressions.append(f"{result['instance']}: {key} {base[key]} → {result[key]}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Banc d'essai de la génération d'emplois du temps")
+    parser.add_argument("--instances", nargs="+", choices=list(PRESETS), default=['petit', 'moyen', 'production'])
+    parser.add_argument("--construction", choices=list(CONSTRUCTION_STRATEGIES), default='glouton')
+    parser.add_argument("--improvement", choices=list(IMPROVEMENT_STRATEGIES), default='aucune')
+    parser.add_argument("--time-budget", type=float, default=DEFAULT_TIME_BUDGET)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--academic-year", type=int, default=DEFAULT_ACADEMIC_YEAR,
+                        help="Année universitaire des instances synthétiques")
+    parser.add_argument("--database", nargs=2, metavar=("DEBUT", "FIN"), type=date.fromisoformat,
+                        help="Mesurer sur les données réelles d'exam_platform (lecture seule)")
+    parser.add_argument("--output-dir", default=DEFAULT_OUTPUT_DIR)
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="Référence à comparer")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE_PCT, help="Tolérance des durées (%%)")
+    parser.add_argument("--save-baseline", action="store_true", help="Enregistrer ces résultats comme référence")
+    args = parser.parse_args()
+
+    results = run_benchmark(
+        args.instances, construction=args.construction, improvement=args.improvement,
+        time_budget=args.time_budget, seed=args.seed, database=args.database,
+        academic_year=args.academic_year
+    )
+    period = args.database or default_period(args.academic_year)
+    meta = {
+        'date': datetime.now().isoformat(timespec='seconds'),
+        'machine': platform.node(),
+        'python': platform.python_version(),
+        'cpu': os.cpu_count(),
+        'construction': args.construction,
+        'amelioration': args.improvement,
+        'budget_s': args.time_budget,
+        'graine': args.seed,
+        'annee_academique': None if args.database else args.academic_year,
+        'periode': [day.isoformat() for day in period],
+    }
+    json_path, csv_path = write_results(results, meta, args.output_dir)
+    print(f"📄 Résultats: {json_path}, {csv_path}")
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(args.baseline) or '.', exist_ok=True)
+        with open(args.baseline, 'w', encoding='utf-8') as handle:
+            json.dump({'meta': meta, 'resultats': results}, handle, ensure_ascii=False, indent=2)
+        print(f"📌 Référence enregistrée: {args.baseline}")
+        return
+
+    if not os.path.exists(args.baseline):
+        print("ℹ️ Aucune référence: relancer avec --save-baseline pour en enregistrer une")
+        return
+    with open(args.baseline, encoding='utf-8') as handle:
+        baseline = json.load(handle)
+    reference_meta = baseline.get('meta', {})
+    for key in ('annee_academique', 'periode'):
+        if key in reference_meta and reference_meta[key] != meta[key]:
+            print(f"⚠️ Référence mesurée avec {key}={reference_meta[key]} (ici {meta[key]}): instances non comparables")
+    regressions = compare_to_baseline(results, baseline, tolerance_pct=args.tolerance)
+    if regressions:
+        print("❌ Régressions détectées:")
+        for regression in regressions:
+            print(f"   - {regression}")
+        sys.exit(1)
+    print("✅ Aucune régression par rapport à la référence")
+
+
+if __name__ == "__main__":
+    main()
@@ -10,6 +10,8 @@ def render_department_head_dashboard():
     from datetime import datetime, date
 
     from connection import execute_query
+    from queries import AnalyticsQueries
+    from stats_refresh import request_refresh
 
     # ----------------------------
     # Configuration de la page
@@ -270,44 +272,27 @@ def render_department_head_dashboard():
     elif page == "⚠️ Conflits Département":
         section_header(f"⚠️ Conflits - {dept_nom}")
 
+        formations = execute_query(
+            "SELECT id, nom, code FROM formations WHERE departement_id = %s AND is_active = TRUE ORDER BY nom",
+            (dept_id,)
+        ) or []
+        formation_map = {"Toutes les formations": None}
+        formation_map.update({f"{f['code']} - {f['nom']}": f['id'] for f in formations})
+
+        col1, col2, col3 = st.columns(3)
+        with col1: selected = st.selectbox("Formation", list(formation_map.keys()))
+        with col2: date_debut = st.date_input("Depuis", value=None)
+        with col3: date_fin = st.date_input("Jusqu'au", value=None)
+
         if st.button("🔍 Détecter les conflits", type="primary"):
-            conflits = execute_query(f"""
-                -- Conflits étudiants
-                SELECT 'Étudiant >1 examen/jour' as type_conflit,
-                       'CRITIQUE' as severite,
-                       i.etudiant_id,
-                       DATE(e.date_heure) as jour,
-                       COUNT(*) as nb_examens
-                FROM inscriptions i
-                JOIN examens e ON i.module_id = e.module_id
-                JOIN modules m ON e.module_id = m.id
-                JOIN formations f ON m.formation_id = f.id
-                WHERE f.departement_id = {dept_id}
-                AND e.statut IN ('Planifie', 'Confirme')
-                GROUP BY i.etudiant_id, DATE(e.date_heure)
-                HAVING COUNT(*) > 1
-                
-                UNION ALL
-                
-                -- Conflits professeurs
-                SELECT 'Professeur >3 examens/jour' as type_conflit,
-                       'CRITIQUE' as severite,
-                       e.professeur_id,
-                       DATE(e.date_heure) as jour,
-                       COUNT(*) as nb_examens
-                FROM examens e
-                JOIN modules m ON e.module_id = m.id
-                JOIN formations f ON m.formation_id = f.id
-                WHERE f.departement_id = {dept_id}
-                AND e.statut IN ('Planifie', 'Confirme')
-                GROUP BY e.professeur_id, DATE(e.date_heure)
-                HAVING COUNT(*) > 3
-            """)
-
-            if conflits:
+            # Détection limitée au périmètre du département (filtre appliqué en base)
+            conflits = AnalyticsQueries.get_conflicts_report(
+                dept_id, formation_map[selected], date_debut, date_fin
+            )
+
+            if not conflits.empty:
                 st.error(f"⚠️ {len(conflits)} conflit(s) détecté(s)")
-                df = pd.DataFrame(conflits)
-                st.dataframe(df, use_container_width=True)
+                st.dataframe(conflits, use_container_width=True, hide_index=True)
             else:
                 st.success("✅ Aucun conflit détecté !")
 
@@ -345,5 +330,6 @@ def render_department_head_dashboard():
                 query = f"UPDATE examens SET statut = 'Confirme' WHERE id IN ({placeholders})"
                 result = execute_query(query, tuple(ids), fetch=False)
                 if result:
+                    request_refresh()
                     st.success(f"✅ {result} examen(s) validé(s) !")
                     st.rerun()
\ No newline at end of file
@@ -0,0 +1,176 @@
+"""
+Analyse matricielle des conflits étudiants à l'échelle de l'université (page vice-doyen)
+Les inscriptions forment une matrice creuse étudiant x module, les examens une matrice module x séance
+(un module réparti sur plusieurs salles = une séance). Le produit des deux donne, pour chaque étudiant,
+ses examens par jour et par créneau occupé: on en tire les distributions complètes (combien d'étudiants
+ont 2, 3, 4 examens dans une journée, combien ont des examens qui se chevauchent) en plus des violations
+Les matrices sont tenues en tableaux d'indices NumPy (format COO/CSR), sans dépendance supplémentaire
+"""
+import time
+
+import numpy as np
+import pandas as pd
+
+from connection import execute_query
+
+
+def load_clash_data(start_date=None, end_date=None):
+    """
+    Examens actifs de la période et inscrits de leurs modules
+    Retourne (examens, {module_id: [etudiant_id]})
+    """
+    exams = execute_query("""
+        SELECT id, module_id, date_heure, duree_minutes
+        FROM examens
+        WHERE statut IN ('Planifie', 'Confirme')
+        AND (%s::date IS NULL OR date_heure >= %s::date)
+        AND (%s::date IS NULL OR date_heure < %s::date + 1)
+    """, (start_date, start_date, end_date, end_date)) or []
+    module_ids = list({exam['module_id'] for exam in exams})
+    rows = execute_query("""
+        SELECT module_id, ARRAY_AGG(etudiant_id) AS etudiants
+        FROM inscriptions
+        WHERE statut = 'Inscrit' AND module_id = ANY(%s)
+        GROUP BY module_id
+    """, (module_ids,)) if module_ids else []
+    return exams, {row['module_id']: row['etudiants'] for row in rows or []}
+
+
+class ClashAnalysis:
+    """
+    Examens par étudiant et par jour / par créneau, calculés par produit creux
+    exams: dicts id, module_id, date_heure, duree_minutes; enrolments: {module_id: [etudiant_id]}
+    """
+
+    def __init__(self, exams, enrolments):
+        start_time = time.perf_counter()
+        self._build_sittings(exams)
+        self._build_enrolments(enrolments)
+        self._multiply()
+        self.analysis_time = time.perf_counter() - start_time
+
+    def _build_sittings(self, exams):
+        """Séances (module, début, fin): les parties d'un module réparti n'en font qu'une"""
+        sittings = set()
+        for exam in exams:
+            start = pd.Timestamp(exam['date_heure'])
+            sittings.add((exam['module_id'], start, start + pd.Timedelta(minutes=int(exam['duree_minutes']))))
+
+        keys = sorted(sittings, key=lambda key: (key[1], key[0]))
+        self.sitting_modules = np.array([key[0] for key in keys], dtype=np.int64)
+        starts = pd.DatetimeIndex([key[1] for key in keys])
+        ends = pd.DatetimeIndex([key[2] for key in keys])
+
+        # Jours et créneaux élémentaires (débuts distincts): une séance couvre les débuts de [début, fin)
+        self.days, self.sitting_day = np.unique(starts.normalize().values, return_inverse=True)
+        self.slots = np.unique(starts.values)
+        self.slot_first = np.searchsorted(self.slots, starts.values, side='left')
+        self.slot_last = np.searchsorted(self.slots, ends.values, side='left')
+
+    def _build_enrolments(self, enrolments):
+        """Matrice étudiant x module en COO (lignes = étudiants, colonnes = modules ayant une séance)"""
+        self.module_ids, module_of_sitting = np.unique(self.sitting_modules, return_inverse=True)
+        student_lists = [np.asarray(enrolments.get(module_id) or [], dtype=np.int64) for module_id in self.module_ids]
+        lengths = np.array([len(students) for students in student_lists], dtype=np.int64)
+        raw_students = np.concatenate(student_lists) if lengths.sum() else np.empty(0, dtype=np.int64)
+        self.student_ids, self.enrol_student = np.unique(raw_students, return_inverse=True)
+        self.enrol_module = np.repeat(np.arange(len(self.module_ids)), lengths)
+
+        # Matrice module x séance en CSR: séances de chaque module, contiguës après tri
+        order = np.argsort(module_of_sitting, kind='stable')
+        self.module_sittings = order
+        self.module_indptr = np.concatenate([[0], np.cumsum(np.bincount(module_of_sitting, minlength=len(self.module_ids)))])
+
+    def _multiply(self):
+        """Produits creux étudiant x module . module x séance, puis agrégation par jour et par créneau"""
+        n_days = max(len(self.days), 1)
+        n_slots = max(len(self.slots), 1)
+
+        # Étudiant x séance: chaque inscription est développée sur les séances de son module
+        per_enrolment = np.diff(self.module_indptr)[self.enrol_module]
+        pair_student = np.repeat(self.enrol_student, per_enrolment)
+        offsets = np.arange(per_enrolment.sum()) - np.repeat(np.cumsum(per_enrolment) - per_enrolment, per_enrolment)
+        pair_sitting = self.module_sittings[np.repeat(self.module_indptr[self.enrol_module], per_enrolment) + offsets]
+        self.pair_student, self.pair_sitting = pair_student, pair_sitting
+
+        # Étudiant x jour: nombre d'examens (COO compressé par tri des clés)
+        day_keys, day_counts = np.unique(pair_student * n_days + self.sitting_day[pair_sitting], return_counts=True)
+        self.day_student, self.day_index, self.day_counts = day_keys // n_days, day_keys % n_days, day_counts
+
+        # Étudiant x créneau: une séance occupe tous les créneaux élémentaires qu'elle recouvre
+        spans = (self.slot_last - self.slot_first)[pair_sitting]
+        slot_student = np.repeat(pair_student, spans)
+        slot_offsets = np.arange(spans.sum()) - np.repeat(np.cumsum(spans) - spans, spans)
+        slot_index = np.repeat(self.slot_first[pair_sitting], spans) + slot_offsets
+        slot_keys, slot_counts = np.unique(slot_student * n_slots + slot_index, return_counts=True)
+        busy = slot_counts > 1
+        self.overlap_student, self.overlap_slot = slot_keys[busy] // n_slots, slot_keys[busy] % n_slots
+
+    @property
+    def student_count(self) -> int:
+        return len(self.student_ids)
+
+    def summary(self) -> dict:
+        """Indicateurs globaux"""
+        multi = self.day_counts > 1
+        return {
+            'etudiants': self.student_count,
+            'seances': len(self.sitting_modules),
+            'inscriptions': len(self.enrol_student),
+            'etudiants_plusieurs_examens_jour': int(len(np.unique(self.day_student[multi]))),
+            'journees_en_conflit': int(multi.sum()),
+            'etudiants_chevauchement': int(len(np.unique(self.overlap_student))),
+            'duree_analyse_s': round(self.analysis_time, 3),
+        }
+
+    def day_distribution(self) -> pd.DataFrame:
+        """
+        Répartition des examens par jour: pour k examens dans une journée, nombre de journées-étudiant
+        et nombre d'étudiants dont la journée la plus chargée compte k examens
+        """
+        if not len(self.day_counts):
+            return pd.DataFrame(columns=['examens_par_jour', 'journees_etudiant', 'etudiants_pire_journee'])
+        worst = np.zeros(self.student_count, dtype=np.int64)
+        np.maximum.at(worst, self.day_student, self.day_counts)
+        top = int(self.day_counts.max())
+        return pd.DataFrame({
+            'examens_par_jour': np.arange(1, top + 1),
+            'journees_etudiant': np.bincount(self.day_counts, minlength=top + 1)[1:],
+            'etudiants_pire_journee': np.bincount(worst, minlength=top + 1)[1:],
+        })
+
+    def overlap_distribution(self) -> pd.DataFrame:
+        """Nombre d'étudiants selon le nombre de créneaux où ils ont des examens qui se chevauchent"""
+        per_student = np.bincount(self.overlap_student, minlength=self.student_count)
+        counts = np.bincount(per_student)
+        return pd.DataFrame({'creneaux_en_chevauchement': np.arange(len(counts)), 'etudiants': counts})
+
+    def daily_load(self) -> pd.DataFrame:
+        """Par jour: étudiants convoqués, étudiants à 2 examens ou plus, examens maximum pour un étudiant"""
+        if not len(self.day_counts):
+            return pd.DataFrame(columns=['jour', 'etudiants', 'etudiants_multi_examens', 'max_examens'])
+        n_days = len(self.days)
+        max_per_day = np.zeros(n_days, dtype=np.int64)
+        np.maximum.at(max_per_day, self.day_index, self.day_counts)
+        return pd.DataFrame({
+            'jour': pd.DatetimeIndex(self.days).date,
+            'etudiants': np.bincount(self.day_index, minlength=n_days),
+            'etudiants_multi_examens': np.bincount(self.day_index[self.day_counts > 1], minlength=n_days),
+            'max_examens': max_per_day,
+        })
+
+    def violations(self, limit: int = 1000) -> pd.DataFrame:
+        """Étudiants ayant plus d'un examen le même jour, journées les plus chargées d'abord"""
+        multi = np.flatnonzero(self.day_counts > 1)
+        multi = multi[np.argsort(-self.day_counts[multi], kind='stable')][:limit]
+        return pd.DataFrame({
+            'etudiant_id': self.student_ids[self.day_student[multi]],
+            'jour': pd.DatetimeIndex(self.days[self.day_index[multi]]).date,
+            'nb_examens': self.day_counts[multi],
+        })
+
+
+def analyse_clashes(start_date=None, end_date=None) -> ClashAnalysis:
+    """Charge le planning actif de la période et calcule l'analyse matricielle"""
+    exams, enrolments = load_clash_data(start_date, end_date)
+    return ClashAnalysis(exams, enrolments)
@@ -0,0 +1,67 @@
+# conflict_browser.py
+# Liste paginée des conflits ouverts (pages admin et vice-doyen)
+# Indicateurs et graphiques viennent d'agrégats SQL; seule la page courante est chargée
+import streamlit as st
+import pandas as pd
+import plotly.express as px
+
+from ui_theme import kpi_card
+from queries import OptimizationQueries
+
+SEVERITIES = ["CRITIQUE", "ÉLEVÉ", "MOYEN", "FAIBLE"]
+
+
+def render_conflict_browser(key: str, page_size: int = 100):
+    """
+    Résumé agrégé puis conflits page par page (curseur), filtre de sévérité
+    key: préfixe des clés de session (une navigation indépendante par page appelante)
+    """
+    severity = st.selectbox("Sévérité", ["Toutes"] + SEVERITIES, key=f"{key}_severite")
+    severity = None if severity == "Toutes" else severity
+
+    # Pile des curseurs des pages déjà vues (None = première page); remise à zéro si le filtre change
+    state = st.session_state.setdefault(f"{key}_pagination", {"severite": severity, "curseurs": [None]})
+    if state["severite"] != severity:
+        state.update(severite=severity, curseurs=[None])
+
+    summary = OptimizationQueries.get_conflicts_summary(severity)
+    if summary.empty:
+        st.success("🎉 Aucun conflit détecté.")
+        return
+
+    by_severity = summary.groupby("severite", sort=False)["nb_conflits"].sum()
+    cols = st.columns(len(SEVERITIES) + 1)
+    with cols[0]:
+        kpi_card("⚠️ Total", f"{int(by_severity.sum()):,}", "conflits ouverts", "danger")
+    for col, level in zip(cols[1:], SEVERITIES):
+        with col:
+            kpi_card(level.capitalize(), f"{int(by_severity.get(level, 0)):,}")
+
+    c1, c2 = st.columns(2)
+    with c1:
+        fig = px.bar(summary, x="type_conflit", y="nb_conflits", color="severite", title="Conflits par type")
+        st.plotly_chart(fig, use_container_width=True)
+    with c2:
+        by_day = OptimizationQueries.get_conflicts_by_day(severity)
+        if not by_day.empty:
+            fig = px.bar(by_day, x="jour", y="nb_conflits", color="severite", title="Conflits par jour")
+            st.plotly_chart(fig, use_container_width=True)
+
+    cursors = state["curseurs"]
+    page, next_cursor = OptimizationQueries.get_conflicts_page(page_size, cursors[-1], severity)
+    st.caption(f"Page {len(cursors)} • {len(page)} conflit(s) affiché(s)")
+    st.dataframe(page.drop(columns=["rang"], errors="ignore"), use_container_width=True, hide_index=True)
+
+    p1, p2, p3 = st.columns(3)
+    with p1:
+        if st.button("⏮️ Première page", key=f"{key}_premiere", disabled=len(cursors) == 1):
+            state["curseurs"] = [None]
+            st.rerun()
+    with p2:
+        if st.button("◀️ Page précédente", key=f"{key}_precedente", disabled=len(cursors) == 1):
+            cursors.pop()
+            st.rerun()
+    with p3:
+        if st.button("Page suivante ▶️", key=f"{key}_suivante", disabled=next_cursor is None):
+            cursors.append(next_cursor)
+            st.rerun()
@@ -0,0 +1,395 @@
+"""
+Suggestions de résolution des conflits ouverts (conflits_examens.suggestions)
+Tâche groupée: le planning enregistré est chargé une fois dans des matrices d'occupation comptées
+(salles x créneaux, surveillants x créneaux/jours, étudiants x jours); pour chaque module impliqué
+dans un conflit, tous les créneaux sont évalués d'un coup: un déplacement (créneau, salle) faisable
+est classé par le nombre de conflits qu'il résout moins le nombre de conflits qu'il crée
+(un conflit ne compte que s'il disparaît ou apparaît: un étudiant qui garde deux autres examens
+le même jour reste en conflit)
+Les k meilleurs déplacements de chaque conflit sont enregistrés en JSON et appliqués en un clic
+via apply_schedule_moves, après revérification du créneau cible sur le planning courant
+"""
+import json
+import time
+from datetime import datetime
+
+import numpy as np
+
+from connection import execute_query
+from exam_optimizer import ExamScheduleOptimizer
+
+DEFAULT_TOP_K = 3
+
+
+class ConflictSuggester:
+    """
+    Calcule les k meilleurs déplacements pour chaque conflit ouvert de la période
+    Un module réparti se déplace d'un bloc: vers une salle unique assez grande, sinon dans ses salles d'origine
+    """
+
+    def __init__(self, start_date, end_date, top_k: int = DEFAULT_TOP_K):
+        self.start_date = start_date
+        self.end_date = end_date
+        self.top_k = top_k
+        self.optimizer = ExamScheduleOptimizer(start_date, end_date)
+        self.conflicts = []
+        self.suggestions = {}
+        self.computation_time = 0.0
+
+    def load_state(self):
+        """Ressources et examens actifs de la période, en matrices d'occupation"""
+        self.optimizer._load_resources()
+        self._build_loads()
+
+    def load(self):
+        """Ressources, examens actifs de la période et conflits ouverts"""
+        self.load_state()
+        self.conflicts = execute_query("""
+            SELECT id, cle_type, entite_id, jour, type_conflit, examens_impliques
+            FROM conflits_examens
+            WHERE cle_type IS NOT NULL
+                AND statut <> 'Résolu'
+                AND jour BETWEEN %s AND %s
+        """, (self.start_date, self.end_date)) or []
+
+    # ---------- Occupation comptée ----------
+
+    def _build_loads(self):
+        """
+        Matrices d'occupation en compteurs (et non en booléens): retirer un examen d'une salle
+        occupée deux fois la laisse occupée
+        """
+        opt = self.optimizer
+        cal = opt.calendar
+        rows = opt.existing_exams or []
+        self.rows_by_module = {}
+        for row in rows:
+            self.rows_by_module.setdefault(row['module_id'], []).append(row)
+        self.rows_by_id = {row['id']: row for row in rows}
+
+        modules = [ExamScheduleOptimizer._module_from_rows(module_rows) for module_rows in self.rows_by_module.values()]
+        index = ExamScheduleOptimizer.index_entities(opt.rooms or [], opt.professors or [], [modules])
+        self.room_pos, self.prof_pos = index['room_pos'], index['prof_pos']
+        self.room_capacity = index['room_capacity']
+        self.student_pos = index['student_pos']
+        self.modules = {module['module_id']: module for module in modules}
+        for module in modules:
+            module['_students'] = np.array([self.student_pos[sid] for sid in module['student_ids']], dtype=np.int64)
+
+        self.room_load = np.zeros((len(opt.rooms), cal.n_slots), dtype=np.int32)
+        self.prof_load = np.zeros((len(opt.professors), cal.n_slots), dtype=np.int32)
+        self.prof_day = np.zeros((len(opt.professors), cal.n_days), dtype=np.int32)
+        self.student_day = np.zeros((len(index['student_ids']), cal.n_days), dtype=np.int32)
+
+        for row in opt.unavailabilities or []:
+            prof_idx = self.prof_pos.get(row['professeur_id'])
+            if prof_idx is not None:
+                self.prof_load[prof_idx, cal.slots_overlapping(cal.minutes(row['date_debut']), cal.minutes(row['date_fin']))] += 1
+        for module_id in self.rows_by_module:
+            self._toggle(module_id, +1)
+
+    def _row_position(self, row):
+        cal = self.optimizer.calendar
+        start = cal.minutes(row['date_heure'])
+        return cal.slots_overlapping(start, start + int(row['duree_minutes'] or 0)), cal.day_of(start)
+
+    def _toggle(self, module_id, sign):
+        """Ajoute (+1) ou retire (-1) les examens d'un module des matrices"""
+        days = set()
+        for row in self.rows_by_module[module_id]:
+            slots, day = self._row_position(row)
+            room_idx = self.room_pos.get(row['salle_id'])
+            if room_idx is not None:
+                self.room_load[room_idx, slots] += sign
+            prof_idx = self.prof_pos.get(row['professeur_id'])
+            if prof_idx is not None:
+                self.prof_load[prof_idx, slots] += sign
+                if day >= 0:
+                    self.prof_day[prof_idx, day] += sign
+            if day >= 0:
+                days.add(day)
+        # Un étudiant passe un module réparti une seule fois
+        students = self.modules[module_id]['_students']
+        for day in days:
+            self.student_day[students, day] += sign
+
+    # ---------- Évaluation ----------
+
+    @staticmethod
+    def _overlap_resolved(load):
+        """Chevauchement levé par le départ: il restait un seul autre occupant, sans chevauchement entre eux"""
+        return bool(len(load)) and int(load.max()) == 1
+
+    def _student_conflicts_by_day(self, module):
+        """
+        Par jour, étudiants du module ayant exactement un autre examen (matrices sans le module):
+        leur conflit disparaît si le module quitte ce jour, et apparaît s'il y arrive
+        Un étudiant qui a déjà deux autres examens ce jour-là reste en conflit dans les deux cas
+        """
+        return (self.student_day[module['_students']] == 1).sum(axis=0)
+
+    def _resolved_by_leaving(self, module_id):
+        """Conflits qui disparaissent en retirant le module de sa position (matrices sans le module)"""
+        max_day = ExamScheduleOptimizer.MAX_EXAMS_PER_PROFESSOR_DAY
+        rows = self.rows_by_module[module_id]
+        module = self.modules[module_id]
+        resolved = 0
+        days = set()
+        for row in rows:
+            slots, day = self._row_position(row)
+            room_idx = self.room_pos.get(row['salle_id'])
+            prof_idx = self.prof_pos.get(row['professeur_id'])
+            if room_idx is not None and self._overlap_resolved(self.room_load[room_idx, slots]):
+                resolved += 1
+            if prof_idx is not None and self._overlap_resolved(self.prof_load[prof_idx, slots]):
+                resolved += 1
+            # Surcharge journalière levée seulement si le surveillant revient exactement à la limite
+            if prof_idx is not None and day >= 0 and self.prof_day[prof_idx, day] == max_day:
+                resolved += 1
+            if room_idx is not None and (row.get('nb_etudiants') or 0) > self.room_capacity[room_idx]:
+                resolved += 1
+            if day >= 0:
+                days.add(day)
+        by_day = self._student_conflicts_by_day(module)
+        resolved += sum(int(by_day[day]) for day in days)
+        return resolved
+
+    def _placements(self, module, rows):
+        """
+        Ensembles de salles candidats: une salle unique assez grande (la plus petite suffisante),
+        sinon les salles d'origine d'un module réparti
+        Retourne [(salles, effectifs par salle, masque des créneaux libres)]
+        """
+        opt = self.optimizer
+        cal = opt.calendar
+        duration = module['duration_minutes']
+        count = module['student_count']
+        placements = []
+
+        fitting = [idx for idx in np.argsort(self.room_capacity, kind='stable') if self.room_capacity[idx] >= count]
+        if fitting:
+            rooms = [opt.rooms[idx] for idx in fitting]
+            free = cal.free_starts(self.room_load[fitting], duration) & cal.open_matrix([room['id'] for room in rooms], duration)
+            # Pour chaque créneau, la première salle libre (la plus petite suffisante)
+            first = np.argmax(free, axis=0)
+            has_room = free.any(axis=0)
+            for position in np.unique(first[has_room]):
+                mask = has_room & (first == position)
+                placements.append(([rooms[position]], [count], mask))
+
+        if len(rows) > 1:
+            room_idx = [self.room_pos.get(row['salle_id']) for row in rows]
+            if None not in room_idx:
+                rooms = [opt.rooms[idx] for idx in room_idx]
+                free = cal.free_starts(self.room_load[room_idx], duration) & cal.open_matrix([room['id'] for room in rooms], duration)
+                placements.append((rooms, [row.get('nb_etudiants') or 0 for row in rows], free.all(axis=0)))
+        return placements
+
+    def _pick_supervisors(self, module, rows, slot, count):
+        """Surveillants libres sur tout le créneau: ceux d'origine, le responsable, puis les moins chargés du département"""
+        opt = self.optimizer
+        cal = opt.calendar
+        span = cal.covered_slots(slot, module['duration_minutes'])
+        day = cal.slot_day[slot]
+        available = (self.prof_load[:, span] == 0).all(axis=1) & (self.prof_day[:, day] < opt.MAX_EXAMS_PER_PROFESSOR_DAY)
+
+        chosen = []
+        preferred = [row['professeur_id'] for row in rows] + [module.get('professor_id')]
+        department_id = module.get('departement_id')
+        others = sorted(
+            opt.professors or [],
+            key=lambda p: (p.get('departement_id') != department_id, int(self.prof_day[self.prof_pos[p['id']]].sum()))
+        )
+        for professor_id in preferred + [p['id'] for p in others]:
+            if len(chosen) == count:
+                break
+            prof_idx = self.prof_pos.get(professor_id)
+            if prof_idx is not None and professor_id not in chosen and available[prof_idx]:
+                chosen.append(professor_id)
+        return chosen if len(chosen) == count else []
+
+    def suggest_module(self, module_id):
+        """
+        Meilleurs déplacements d'un module: tous les créneaux sont notés d'un coup
+        (étudiants ayant déjà un examen ce jour-là = conflits créés), puis les k premiers faisables sont gardés
+        """
+        if module_id in self.suggestions:
+            return self.suggestions[module_id]
+        rows = self.rows_by_module.get(module_id)
+        if not rows:
+            return []
+
+        opt = self.optimizer
+        cal = opt.calendar
+        module = self.modules[module_id]
+        original_start = cal.minutes(rows[0]['date_heure'])
+
+        self._toggle(module_id, -1)
+        try:
+            resolved = self._resolved_by_leaving(module_id)
+            created_by_day = self._student_conflicts_by_day(module)
+            candidates = []
+            for rooms, sizes, mask in self._placements(module, rows):
+                for slot in np.flatnonzero(mask):
+                    same_position = cal.slot_start[slot] == original_start and rooms[0]['id'] == rows[0]['salle_id']
+                    if same_position:
+                        continue
+                    # Le même jour, les conflits étudiants résolus au départ sont recréés à l'arrivée
+                    created = int(created_by_day[cal.slot_day[slot]])
+                    candidates.append((created - resolved, abs(int(cal.slot_start[slot]) - original_start),
+                                       int(slot), rooms, sizes, created))
+
+            candidates.sort(key=lambda candidate: candidate[:3])
+            suggestions = []
+            for neg_gain, _, slot, rooms, sizes, created in candidates:
+                if len(suggestions) >= self.top_k:
+                    break
+                supervisors = self._pick_supervisors(module, rows, slot, len(rooms))
+                if not supervisors:
+                    continue
+                suggestions.append({
+                    'module_id': module_id,
+                    'module_nom': module['module_name'],
+                    'examens': [row['id'] for row in rows],
+                    'groupe_examen': str(rows[0]['groupe_examen']) if rows[0].get('groupe_examen') else None,
+                    'ancienne_date': rows[0]['date_heure'].isoformat(),
+                    'date_heure': cal.to_datetime(slot).isoformat(),
+                    'salles': [{'id': room['id'], 'nom': room['nom'], 'effectif': size} for room, size in zip(rooms, sizes)],
+                    'surveillants': supervisors,
+                    'conflits_resolus': resolved,
+                    'conflits_crees': created,
+                    'gain': -neg_gain,
+                })
+        finally:
+            self._toggle(module_id, +1)
+
+        self.suggestions[module_id] = suggestions
+        return suggestions
+
+    def check_move(self, suggestion):
+        """
+        Revérifie une suggestion sur l'état chargé (load_state): salles et surveillants toujours libres
+        sur tout le créneau cible, pas plus de conflits étudiants créés qu'au calcul
+        Retourne None si le déplacement reste valable, sinon le motif du refus
+        """
+        opt = self.optimizer
+        cal = opt.calendar
+        module_id = suggestion['module_id']
+        if module_id not in self.rows_by_module:
+            return "Les examens du module ne sont plus planifiés"
+        slot = cal.slot_of(datetime.fromisoformat(suggestion['date_heure']))
+        if slot < 0:
+            return "Le créneau cible n'existe plus dans la grille"
+        module = self.modules[module_id]
+        duration = module['duration_minutes']
+        span = cal.covered_slots(slot, duration)
+        day = cal.slot_day[slot]
+
+        self._toggle(module_id, -1)
+        try:
+            for room in suggestion['salles']:
+                room_idx = self.room_pos.get(room['id'])
+                if (room_idx is None or not cal.free_starts(self.room_load[room_idx], duration)[slot]
+                        or not cal.open_mask(room['id'], duration)[slot]):
+                    return f"La salle {room['nom']} n'est plus libre sur ce créneau"
+            for professor_id in suggestion['surveillants']:
+                prof_idx = self.prof_pos.get(professor_id)
+                if (prof_idx is None or self.prof_load[prof_idx, span].any()
+                        or self.prof_day[prof_idx, day] >= opt.MAX_EXAMS_PER_PROFESSOR_DAY):
+                    return f"Le surveillant {professor_id} n'est plus disponible sur ce créneau"
+            created = int(self._student_conflicts_by_day(module)[day])
+            if created > suggestion['conflits_crees']:
+                return f"Le créneau cible crée maintenant {created} conflit(s) étudiant(s) (prévu: {suggestion['conflits_crees']})"
+        finally:
+            self._toggle(module_id, +1)
+        return None
+
+    def suggest_conflict(self, conflict):
+        """k meilleurs déplacements parmi les modules des examens impliqués dans le conflit"""
+        exam_ids = conflict.get('examens_impliques') or []
+        module_ids = {self.rows_by_id[exam_id]['module_id'] for exam_id in exam_ids if exam_id in self.rows_by_id}
+        options = [suggestion for module_id in sorted(module_ids) for suggestion in self.suggest_module(module_id)]
+        options.sort(key=lambda suggestion: -suggestion['gain'])
+        return options[:self.top_k]
+
+    def run(self):
+        """Suggestions de tous les conflits ouverts de la période: {conflit_id: [suggestions]}"""
+        start_time = time.time()
+        self.load()
+        results = {conflict['id']: self.suggest_conflict(conflict) for conflict in self.conflicts}
+        self.computation_time = time.time() - start_time
+        return results
+
+    @staticmethod
+    def save(results):
+        """Enregistre les suggestions en une seule mise à jour; retourne le nombre de conflits mis à jour"""
+        if not results:
+            return 0
+        computed_at = datetime.now().isoformat(timespec='seconds')
+        payload = [
+            {'id': conflict_id, 'suggestions': json.dumps({'calcule_le': computed_at, 'deplacements': options},
+                                                          ensure_ascii=False)}
+            for conflict_id, options in results.items()
+        ]
+        return execute_query("""
+            UPDATE conflits_examens c
+            SET suggestions = x.suggestions
+            FROM jsonb_to_recordset(%s::jsonb) AS x(id INT, suggestions TEXT)
+            WHERE c.id = x.id
+        """, (json.dumps(payload),), fetch=False)
+
+
+def compute_suggestions(start_date, end_date, top_k: int = DEFAULT_TOP_K):
+    """Tâche groupée: calcule et enregistre les suggestions; retourne (conflits traités, durée en s)"""
+    suggester = ConflictSuggester(start_date, end_date, top_k)
+    results = suggester.run()
+    ConflictSuggester.save(results)
+    return len(results), suggester.computation_time
+
+
+def suggestion_moves(suggestion):
+    """Mouvements apply_schedule_moves d'une suggestion (les parties en trop d'un module regroupé sont annulées)"""
+    rooms = suggestion['salles']
+    exam_ids = suggestion['examens']
+    split = len(rooms) > 1
+    moves = []
+    for part_index, (exam_id, room, professor_id) in enumerate(zip(exam_ids, rooms, suggestion['surveillants']), start=1):
+        moves.append({
+            'action': 'DEPLACER',
+            'exam_id': exam_id,
+            'professor_id': professor_id,
+            'room_id': room['id'],
+            'exam_time': suggestion['date_heure'],
+            'student_count': room['effectif'],
+            'split_group': suggestion.get('groupe_examen') if split else None,
+            'part_index': part_index if split else None,
+            'part_count': len(rooms) if split else None,
+        })
+    moves.extend({'action': 'ANNULER', 'exam_id': exam_id} for exam_id in exam_ids[len(rooms):])
+    return moves
+
+
+def apply_suggestion(suggestion):
+    """
+    Applique une suggestion si les examens sont toujours à leur position d'origine et si le créneau
+    cible ne crée toujours aucun conflit de salle ou de surveillant, ni plus de conflits étudiants qu'au calcul
+    Retourne (succès, message)
+    """
+    rows = execute_query("""
+        SELECT id, date_heure FROM examens
+        WHERE id = ANY(%s) AND statut IN ('Planifie', 'Confirme')
+    """, (suggestion['examens'],)) or []
+    original = datetime.fromisoformat(suggestion['ancienne_date'])
+    if len(rows) != len(suggestion['examens']) or any(row['date_heure'] != original for row in rows):
+        return False, "Le planning a changé depuis le calcul: relancer le calcul des suggestions"
+
+    # État courant sur les jours d'origine et d'arrivée (le module doit être retiré de sa position)
+    target = datetime.fromisoformat(suggestion['date_heure'])
+    checker = ConflictSuggester(min(original.date(), target.date()), max(original.date(), target.date()))
+    checker.load_state()
+    problem = checker.check_move(suggestion)
+    if problem:
+        return False, f"{problem}: relancer le calcul des suggestions"
+
+    optimizer = ExamScheduleOptimizer(original.date(), original.date())
+    return optimizer.apply_moves(suggestion_moves(suggestion))
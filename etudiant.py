@@ -52,7 +52,7 @@ def render_student_dashboard():
         st.metric("📅 Examens aujourd'hui", exams_today)
 
     with col3:
-        # Détection de conflits rapide
+        # Conflits calculés une fois pour l'indicateur et l'onglet « Mes Conflits »
         conflicts = StudentRequests.detect_student_conflicts(student_info['linked_id'])
         st.metric("⚠️ Conflits détectés", len(conflicts),
                  delta="À résoudre" if conflicts else "Aucun")
@@ -76,7 +76,7 @@ def render_student_dashboard():
         render_registered_modules(student_info['linked_id'])
 
     with tab3:
-        render_student_conflicts(student_info['linked_id'])
+        render_student_conflicts(student_info['linked_id'], conflicts)
 
     with tab4:
         render_modification_requests(student_info['linked_id'])
@@ -191,13 +191,15 @@ def _build_conflict_uid(conflict: dict, idx: int) -> str:
     return f"{type_c}_{exams_part}_{idx}"
 
 
-def render_student_conflicts(student_id: int):
+def render_student_conflicts(student_id: int, conflicts=None):
     """
     Affiche les conflits personnels de l'étudiant
+    conflicts: résultat déjà calculé par le tableau de bord (sinon recalculé)
     """
     st.subheader("⚠️ Mes Conflits d'Examens")
 
-    conflicts = StudentRequests.detect_student_conflicts(student_id)
+    if conflicts is None:
+        conflicts = StudentRequests.detect_student_conflicts(student_id)
 
     if not conflicts:
         st.success("✅ Aucun conflit détecté dans votre emploi du temps")
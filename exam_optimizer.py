@@ -0,0 +1,1758 @@
+"""
+Moteur de génération des plannings d'examens
+Pipeline: chargement -> construction -> amélioration -> évaluation
+Utilisé par la page de génération (tâche d'arrière-plan) et par OptimizationQueries
+"""
+import json
+import multiprocessing
+import os
+import time
+import uuid
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime, date, timedelta
+
+import numpy as np
+import pandas as pd
+
+from connection import execute_query
+from slot_calendar import SlotCalendar, MINUTES_PER_DAY
+from schedule_scoring import ScheduleScorer
+from schedule_bounds import conflict_adjacency, greedy_max_clique, seat_bounds, gap_percent
+from schedule_checkpoint import write_checkpoint, read_checkpoint, delete_checkpoint
+from schedule_publish import publish_schedule
+from schedule_profiling import GenerationProfiler
+
+# Phase de construction: clé -> libellé affiché
+CONSTRUCTION_STRATEGIES = {
+    'glouton': "Glouton par priorité",
+    'parallele': "Décomposition par département",
+}
+
+# Phase d'amélioration: clé -> libellé affiché
+IMPROVEMENT_STRATEGIES = {
+    'aucune': "Aucune",
+    'recherche_locale': "Recherche locale",
+    'recuit': "Recuit simulé",
+}
+
+# Budget de temps par défaut de toute la génération (secondes)
+DEFAULT_TIME_BUDGET = 45.0
+
+# Intervalle de vérification de l'annulation pendant l'attente des départements (secondes)
+CANCEL_POLL_SECONDS = 0.2
+
+# Colonnes du planning généré (interface et OptimizationQueries)
+SCHEDULE_COLUMNS = [
+    'module_id', 'module_nom', 'module_code', 'formation_nom',
+    'salle_id', 'salle_nom', 'salle_capacite',
+    'professeur_id', 'professeur_nom',
+    'date_heure', 'duree_minutes', 'nb_etudiants',
+    'score_optimisation', 'capacite_utilisee'
+]
+
+# Colonnes SCHEDULE_COLUMNS -> clés des placements (démarrage à chaud depuis un export tabulaire)
+PLACEMENT_KEYS = {
+    'date_heure': 'exam_time',
+    'salle_id': 'room_id',
+    'salle_nom': 'room_name',
+    'professeur_id': 'professor_id',
+    'nb_etudiants': 'student_count',
+    'module_nom': 'module_name',
+    'duree_minutes': 'duration_minutes',
+}
+REQUIRED_PLACEMENT_KEYS = ('module_id', 'exam_time', 'room_id', 'professor_id', 'student_count')
+
+
+class GenerationCancelled(Exception):
+    """Levée quand la tâche de génération est annulée par l'utilisateur"""
+
+
+class ExamScheduleOptimizer:
+    """
+    Algorithme d'optimisation automatique des emplois du temps
+    Objectif: Générer un planning optimal en < 45 secondes
+    """
+    
+    # Contrainte projet: un professeur surveille au plus 3 examens par jour
+    MAX_EXAMS_PER_PROFESSOR_DAY = 3
+    
+    def __init__(self, start_date: date, end_date: date, department_id: int = None,
+                 calendar: SlotCalendar = None, progress_callback=None, cancel_event=None,
+                 checkpoint_path: str = None, score_weights: dict = None, profiling: str = None):
+        self.start_date = start_date
+        self.end_date = end_date
+        self.department_id = department_id
+        # Grille de créneaux partagée (chargée depuis la BD si non fournie)
+        self.calendar = calendar
+        self.modules_data = []
+        self.rooms = []
+        self.professors = []
+        self.existing_exams = []
+        self.unavailabilities = []
+        self.conflicts = []
+        self.generated_schedule = []
+        self._supervision_load = {}
+        self.repair_time = 0.0
+        self.merge_stats = {}
+        self.lower_bounds = {}
+        self.score_report = {}
+        self.improvement_stats = {}
+        self.publish_report = []
+        # Pondération des composantes du score (DEFAULT_WEIGHTS de schedule_scoring si None)
+        self.score_weights = score_weights
+        self.generation_time = 0.0
+        # Durée de chaque phase du pipeline (secondes), renseignée à chaque exécution
+        self.phase_times = {}
+        # Profilage optionnel (schedule_profiling.PROFILING_MODES): compteurs et capture de pile
+        self.profiler = GenerationProfiler(profiling) if profiling and profiling != 'aucun' else None
+        # Index des salles, professeurs et étudiants partagé entre plusieurs générations (index_entities)
+        self.entity_index = None
+        # Avancement et annulation (exécution en tâche d'arrière-plan)
+        self.progress_callback = progress_callback
+        self.cancel_event = cancel_event
+        self._seats_used = 0
+        self._seats_offered = 0
+        self.unplaced_modules = []
+        # Points de reprise périodiques (désactivés sans checkpoint_path)
+        self.checkpoint_path = checkpoint_path
+        self.checkpoint_interval = 30.0
+        self._last_checkpoint = 0.0
+        # État de l'amélioration en cours, enregistré avec les points de reprise (None hors amélioration)
+        self._improvement_state = None
+        
+    @classmethod
+    def resume(cls, path: str, improvement='aucune', time_budget=DEFAULT_TIME_BUDGET, **kwargs):
+        """
+        Reprend une génération depuis un point de reprise:
+        les placements déjà calculés sont rejoués, seule la suite de la construction est exécutée
+        (suivie de la phase d'amélioration choisie)
+        Un point de reprise pris pendant l'amélioration la poursuit avec sa stratégie, l'état du
+        générateur aléatoire, le meilleur score et le meilleur planning enregistrés
+        """
+        meta, schedule = read_checkpoint(path)
+        state = meta.get('amelioration')
+        if state:
+            state['meilleur_planning'] = meta.get('meilleur_planning')
+            improvement = state['strategie']
+        optimizer = cls(
+            date.fromisoformat(meta['start_date']),
+            date.fromisoformat(meta['end_date']),
+            meta.get('department_id'),
+            checkpoint_path=path,
+            **kwargs
+        )
+        optimizer.load_data()
+        optimizer.generate_schedule(initial_schedule=schedule, improvement=improvement, time_budget=time_budget,
+                                    improvement_state=state)
+        return optimizer
+    
+    def load_data(self):
+        """Charge toutes les données nécessaires depuis la BD"""
+        start_time = time.time()
+        
+        # Appeler la fonction SQL d'optimisation
+        query = """
+        SELECT * FROM load_optimization_data(%s, %s, %s)
+        """
+        
+        with self._phase('chargement'):
+            self.modules_data = execute_query(
+                query, 
+                (self.start_date, self.end_date, self.department_id)
+            )
+            
+            self._load_resources()
+        
+        load_time = time.time() - start_time
+        self._report(phase="⚡ Données chargées", duree_chargement=round(load_time, 2))
+        
+        return len(self.modules_data or []) > 0
+    
+    def _load_resources(self):
+        """Charge salles, professeurs, examens déjà planifiés et calendrier de la période"""
+        # Charger les salles disponibles
+        self.rooms = execute_query("""
+            SELECT id, nom, capacite, type, batiment, heure_ouverture, heure_fermeture
+            FROM lieux_examen
+            WHERE is_disponible = TRUE
+            ORDER BY capacite DESC
+        """)
+        
+        # Charger les professeurs et leurs préférences de surveillance
+        self.professors = execute_query("""
+            SELECT
+                p.id, p.nom, p.prenom, p.departement_id, p.heures_max,
+                pp.heure_debut_pref, pp.heure_fin_pref,
+                pp.batiments_preferes, pp.types_salles_preferes
+            FROM professeurs p
+            LEFT JOIN preferences_professeurs pp ON pp.professeur_id = p.id
+            WHERE p.is_active = TRUE
+            ORDER BY p.departement_id
+        """)
+        
+        # Indisponibilités et examens déjà planifiés de la période
+        period = self.load_period_constraints(self.start_date, self.end_date)
+        self.unavailabilities = period['unavailabilities']
+        self.existing_exams = period['existing_exams']
+        
+        # Grille de créneaux précalculée une seule fois pour toute l'exécution
+        if self.calendar is None:
+            self.calendar = SlotCalendar.from_database(self.start_date, self.end_date, self.rooms)
+    
+    def load_period_constraints(self, start_date: date, end_date: date) -> dict:
+        """
+        Contraintes datées d'une fenêtre (indisponibilités, examens déjà planifiés, jours de fermeture)
+        La fenêtre peut dépasser la période de l'optimiseur (ex. union des périodes de plusieurs scénarios);
+        ce qui tombe hors du calendrier d'une génération y est simplement ignoré
+        """
+        # Indisponibilités des professeurs sur la période
+        unavailabilities = execute_query("""
+            SELECT professeur_id, date_debut, date_fin
+            FROM indisponibilites_professeurs
+            WHERE date_fin > %s
+                AND date_debut < %s::date + 1
+        """, (start_date, end_date))
+        
+        # Examens déjà planifiés sur la période: ils bloquent salles, surveillants et étudiants
+        existing_exams = execute_query("""
+            SELECT
+                e.id,
+                e.module_id,
+                m.nom AS module_nom,
+                f.departement_id,
+                m.responsable_id,
+                e.salle_id,
+                l.nom AS salle_nom,
+                e.professeur_id,
+                e.date_heure,
+                e.duree_minutes,
+                e.groupe_examen,
+                e.partie_num,
+                e.nb_parties,
+                CASE WHEN e.groupe_examen IS NULL
+                     THEN COUNT(DISTINCT i.etudiant_id)
+                     ELSE e.max_etudiants END AS nb_etudiants,
+                ARRAY_REMOVE(ARRAY_AGG(DISTINCT i.etudiant_id), NULL) AS student_ids
+            FROM examens e
+            JOIN modules m ON m.id = e.module_id
+            JOIN formations f ON f.id = m.formation_id
+            JOIN lieux_examen l ON l.id = e.salle_id
+            LEFT JOIN inscriptions i ON i.module_id = e.module_id AND i.statut = 'Inscrit'
+            WHERE e.statut IN ('Planifie', 'Confirme')
+                AND e.date_heure >= %s
+                AND e.date_heure < %s::date + 1
+            GROUP BY e.id, m.nom, f.departement_id, m.responsable_id, l.nom
+            ORDER BY e.date_heure
+        """, (start_date, end_date))
+        
+        return {
+            'unavailabilities': unavailabilities,
+            'existing_exams': existing_exams,
+            'holidays': SlotCalendar.load_holidays(start_date, end_date),
+        }
+    
+    def generate_schedule(self, parallel=False, max_workers=None, initial_schedule=None,
+                          improvement='aucune', time_budget=DEFAULT_TIME_BUDGET, seed=None,
+                          improvement_state=None):
+        """
+        Génère le planning optimisé automatiquement
+        Algorithme principal d'optimisation
+        parallel: résolution par département dans des processus séparés, puis fusion
+        initial_schedule: placements à reprendre (point de reprise ou planning enregistré);
+        ils sont rejoués tels quels s'ils restent valides, seul le reste est construit
+        improvement: stratégie d'amélioration (IMPROVEMENT_STRATEGIES), exécutée
+        dans ce qui reste du budget de temps après la construction
+        improvement_state: état d'une amélioration interrompue à poursuivre (voir resume)
+        """
+        if improvement not in IMPROVEMENT_STRATEGIES:
+            raise ValueError(f"Stratégie d'amélioration inconnue: {improvement}")
+        start_time = time.time()
+        self._last_checkpoint = start_time
+        
+        # Étape 0: Index des créneaux et matrices d'occupation
+        self._report(phase="🔄 Indexation des créneaux...", pourcentage=0)
+        with self._phase('index'):
+            if self.calendar is None:
+                self.calendar = SlotCalendar(self.start_date, self.end_date)
+            self._build_index()
+        
+        # Étape 1: Tri par priorité
+        self._report(phase="📊 Calcul des priorités...", pourcentage=5)
+        with self._phase('priorites'):
+            modules_sorted = self._sort_modules_by_priority()
+        
+        # Étape 2: Attribution des salles (avancement module par module)
+        self._report(phase="🏫 Attribution des salles...", pourcentage=10)
+        with self._phase('affectation'):
+            if parallel and initial_schedule is None:
+                schedule_with_rooms = self._assign_rooms_by_department(modules_sorted, max_workers)
+            else:
+                schedule_with_rooms = self._assign_rooms(modules_sorted, initial_schedule)
+            self._write_checkpoint(len(modules_sorted), len(modules_sorted))
+        
+        # Étape 3: Amélioration dans le budget restant (une marge est gardée pour l'évaluation)
+        if improvement != 'aucune':
+            remaining = 0.9 * time_budget - (time.time() - start_time)
+            with self._phase('amelioration'):
+                self.improve_schedule(improvement, remaining, seed=seed, state=improvement_state)
+            schedule_with_rooms = self.generated_schedule
+            
+        # Étape 4: Contrôle des conflits (le placement les évite; ceux qui restent sont signalés)
+        self._report(phase="⚠️ Contrôle des conflits...", pourcentage=95)
+        with self._phase('conflits'):
+            final_schedule = schedule_with_rooms
+            self.conflicts = self._detect_conflicts(final_schedule)
+        
+        # Étape 5: Évaluation (score par examen et score global)
+        self._report(phase="🎯 Évaluation du planning...", pourcentage=96)
+        with self._phase('evaluation'):
+            self.score_schedule(final_schedule)
+        
+        # Étape 6: Bornes inférieures pour mesurer l'écart d'optimalité
+        self._report(phase="📐 Calcul des bornes inférieures...", pourcentage=98)
+        with self._phase('bornes'):
+            self.compute_lower_bounds()
+        
+        self.generation_time = time.time() - start_time
+        self._report(
+            phase="✅ Planning généré",
+            pourcentage=100,
+            conflits_restants=len(self.conflicts),
+            non_places=len(self.unplaced_modules),
+            score_global=round(self.score_report.get('global', 0.0), 1),
+            duree=round(self.generation_time, 2)
+        )
+        
+        self.generated_schedule = final_schedule
+        return final_schedule
+    
+    @contextmanager
+    def _phase(self, name):
+        """Mesure la durée d'une phase du pipeline (phase_times), capturée par le profileur s'il est actif"""
+        start = time.perf_counter()
+        try:
+            if self.profiler is None:
+                yield
+            else:
+                with self.profiler.capture():
+                    yield
+        finally:
+            self.phase_times[name] = time.perf_counter() - start
+    
+    def _count(self, name, n=1):
+        """Incrémente un compteur du profileur (sans effet si le profilage est désactivé)"""
+        if self.profiler is not None:
+            self.profiler.count(name, n)
+    
+    def profiling_report(self):
+        """Rapport de profilage de la dernière exécution (None si le profilage est désactivé)"""
+        if self.profiler is None:
+            return None
+        return self.profiler.report(self.phase_times)
+    
+    def _report(self, **fields):
+        """Transmet l'avancement à l'appelant et interrompt la génération si elle est annulée"""
+        if self.cancel_event is not None and self.cancel_event.is_set():
+            raise GenerationCancelled("Génération annulée")
+        if self.progress_callback is not None:
+            self.progress_callback(**fields)
+    
+    def _progress_fields(self, processed, total):
+        """Indicateurs d'avancement de la phase de placement"""
+        return {
+            'pourcentage': 10 + int(80 * processed / total) if total else 90,
+            'modules_places': processed - len(self.unplaced_modules),
+            'modules_total': total,
+            'objectif': round(100 * self._seats_used / self._seats_offered, 1) if self._seats_offered else 0.0,
+            # Les conflits ne sont détectés qu'après le placement: seuls les modules non placés sont connus ici
+            'non_places': len(self.unplaced_modules)
+        }
+    
+    def _maybe_checkpoint(self, processed, total):
+        """Point de reprise périodique pendant la construction"""
+        if self.checkpoint_path and time.time() - self._last_checkpoint >= self.checkpoint_interval:
+            self._write_checkpoint(processed, total)
+    
+    def _write_checkpoint(self, processed, total):
+        """Enregistre les affectations courantes, l'avancement et l'objectif atteint"""
+        if not self.checkpoint_path:
+            return
+        meta = self._progress_fields(processed, total)
+        meta.update({
+            'start_date': self.start_date,
+            'end_date': self.end_date,
+            'department_id': self.department_id,
+            'modules_traites': processed
+        })
+        best_schedule = None
+        if self._improvement_state is not None:
+            meta['amelioration'] = dict(self._improvement_state)
+            best_schedule = meta['amelioration'].pop('meilleur_planning', None)
+        write_checkpoint(self.checkpoint_path, meta, self.generated_schedule, best_schedule)
+        self._last_checkpoint = time.time()
+    
+    def _build_index(self):
+        """
+        Construit les matrices d'occupation indexées par créneau:
+        salles x créneaux, professeurs x créneaux/jours, étudiants x jours
+        """
+        cal = self.calendar
+        self.modules_data = self.modules_data or []
+        self.rooms = self.rooms or []
+        self.professors = self.professors or []
+        
+        index = self.entity_index or self.index_entities(self.rooms, self.professors, [self.modules_data])
+        self._room_pos = index['room_pos']
+        self._prof_pos = index['prof_pos']
+        self._room_capacity = index['room_capacity']
+        self._student_ids = index['student_ids']
+        self._student_pos = index['student_pos']
+        for module in self.modules_data:
+            module['_students'] = np.array(
+                [self._student_pos[sid] for sid in module.get('student_ids') or []],
+                dtype=np.int64
+            )
+        self._modules_by_id = {module['module_id']: module for module in self.modules_data}
+        
+        self.room_busy = np.zeros((len(self.rooms), cal.n_slots), dtype=bool)
+        self.prof_busy = np.zeros((len(self.professors), cal.n_slots), dtype=bool)
+        self.prof_day_count = np.zeros((len(self.professors), cal.n_days), dtype=np.int32)
+        self.student_day = np.zeros((len(self._student_ids), cal.n_days), dtype=bool)
+        
+        # Un professeur indisponible ne peut pas surveiller
+        for row in self.unavailabilities or []:
+            prof_idx = self._prof_pos.get(row['professeur_id'])
+            if prof_idx is not None:
+                cal.mark_interval(self.prof_busy, prof_idx, cal.minutes(row['date_debut']), cal.minutes(row['date_fin']))
+        
+        # Report des examens déjà planifiés (conversion en minutes une seule fois)
+        for exam in self.existing_exams or []:
+            start = cal.minutes(exam['date_heure'])
+            end = start + int(exam.get('duree_minutes') or 0)
+            day = cal.day_of(start)
+            
+            room_idx = self._room_pos.get(exam.get('salle_id'))
+            if room_idx is not None:
+                cal.mark_interval(self.room_busy, room_idx, start, end)
+            
+            prof_idx = self._prof_pos.get(exam.get('professeur_id'))
+            if prof_idx is not None:
+                cal.mark_interval(self.prof_busy, prof_idx, start, end)
+                if day >= 0:
+                    self.prof_day_count[prof_idx, day] += 1
+            
+            if day >= 0:
+                students = [self._student_pos[sid] for sid in exam.get('student_ids') or [] if sid in self._student_pos]
+                self.student_day[students, day] = True
+    
+    @staticmethod
+    def index_entities(rooms, professors, module_lists):
+        """
+        Positions des salles, professeurs et étudiants dans les matrices d'occupation
+        Calculé une fois pour plusieurs générations sur les mêmes ressources (ex. sessions d'un semestre):
+        les étudiants de toutes les listes de modules sont indexés
+        """
+        student_ids = set()
+        for modules in module_lists:
+            for module in modules or []:
+                student_ids.update(module.get('student_ids') or [])
+        student_ids = np.array(sorted(student_ids), dtype=np.int64)
+        return {
+            'room_pos': {room['id']: idx for idx, room in enumerate(rooms)},
+            'prof_pos': {prof['id']: idx for idx, prof in enumerate(professors)},
+            'room_capacity': np.array([room.get('capacite', 0) for room in rooms], dtype=np.int64),
+            'student_ids': student_ids,
+            'student_pos': {int(sid): idx for idx, sid in enumerate(student_ids)},
+        }
+    
+    def _sort_modules_by_priority(self):
+        """Trie les modules par priorité"""
+        if not self.modules_data:
+            return []
+        
+        sorted_modules = []
+        for module in self.modules_data:
+            priority_score = self._calculate_priority(module)
+            sorted_modules.append({
+                **module,
+                'priority_score': priority_score
+            })
+        
+        return sorted(sorted_modules, key=lambda x: x['priority_score'], reverse=True)
+    
+    def _calculate_priority(self, module):
+        """Calcule le score de priorité d'un module"""
+        score = 0
+        
+        # Critère 1: Nombre d'étudiants (40%)
+        student_count = module.get('student_count', 0)
+        score += (student_count / 100) * 40
+        
+        # Critère 2: Nombre de crédits (30%)
+        credits = module.get('credits', 0)
+        score += (credits / 12) * 30
+        
+        # Critère 3: Priorité département (30%)
+        if self.department_id and module.get('departement_id') == self.department_id:
+            score += 30
+        
+        return score
+    
+    def _assign_rooms(self, modules, initial_schedule=None):
+        """Attribue les salles optimales"""
+        schedule = []
+        # Les vérifications de créneaux s'appuient sur le planning en cours de construction
+        self.generated_schedule = schedule
+        self._supervision_load = {}
+        
+        self._seats_used = self._seats_offered = 0
+        self.unplaced_modules = []
+        
+        pending = modules
+        if initial_schedule is not None and len(initial_schedule):
+            pending = self._replay_placements(modules, self._group_placements(initial_schedule))
+        done = len(modules) - len(pending)
+        
+        try:
+            for position, module in enumerate(pending, start=done + 1):
+                if self._place_module(module):
+                    self._count('modules_places')
+                else:
+                    self.unplaced_modules.append(module['module_id'])
+                self._report(**self._progress_fields(position, len(modules)))
+                self._maybe_checkpoint(position, len(modules))
+        except GenerationCancelled:
+            # Conserver le travail effectué pour une reprise ultérieure
+            self._write_checkpoint(position - 1, len(modules))
+            raise
+        
+        return schedule
+    
+    def _place_module(self, module):
+        """
+        Place un module dans la meilleure salle; si elle est saturée (ou si l'effectif dépasse toute salle),
+        _split_across_rooms cherche le premier créneau utilisable: une salle suffisante libre à ce créneau
+        si elle existe, sinon une répartition sur plusieurs salles
+        """
+        student_count = module.get('student_count', 0)
+        best_room = self._find_best_room(student_count)
+        
+        if best_room:
+            # Trouver un créneau disponible (salle, étudiants et surveillant libres)
+            slot, supervisors = self._find_available_slot(module, best_room)
+            
+            if slot is not None:
+                return [self._place(module, slot, best_room, supervisors[0], student_count)]
+        
+        return self._split_across_rooms(module)
+    
+    def _rooms_by_preference(self, student_count, rooms=None):
+        """
+        Salles pouvant accueillir l'effectif seules, par ordre de préférence (parmi rooms si fourni):
+        d'abord les salles idéales (60 à 90% d'occupation) dans leur ordre, puis les plus petites suffisantes
+        """
+        rooms = self.rooms if rooms is None else rooms
+        self._count('sondages_salles')
+        if not rooms:
+            return []
+        
+        # Salle idéale: entre 60% et 90% d'occupation
+        ideal = [
+            room for room in rooms
+            if room.get('capacite', 0) and 60 <= (student_count / room['capacite']) * 100 <= 90
+        ]
+        chosen = {room['id'] for room in ideal}
+        # Sinon, les plus petites salles suffisantes
+        sufficient = sorted(
+            (room for room in rooms if room.get('capacite', 0) >= student_count and room['id'] not in chosen),
+            key=lambda x: x.get('capacite', 0)
+        )
+        return ideal + sufficient
+    
+    def _find_best_room(self, student_count, rooms=None):
+        """Trouve la meilleure salle pour un nombre d'étudiants (parmi rooms si fourni)"""
+        preferred = self._rooms_by_preference(student_count, rooms)
+        return preferred[0] if preferred else None
+    
+    def _module_slot_mask(self, module):
+        """Créneaux dont le jour est libre pour tous les étudiants du module"""
+        students = module.get('_students')
+        if students is None or not len(students):
+            return np.ones(self.calendar.n_slots, dtype=bool)
+        free_days = ~self.student_day[students].any(axis=0)
+        return free_days[self.calendar.slot_day]
+    
+    def _room_free_mask(self, room, duration):
+        """Créneaux de départ où la salle est ouverte et libre pendant toute la durée"""
+        self._count('sondages_salles')
+        room_idx = self._room_pos[room['id']]
+        return (
+            self.calendar.free_starts(self.room_busy[room_idx], duration)
+            & self.calendar.open_mask(room['id'], duration)
+        )
+    
+    def _find_available_slot(self, module, room):
+        """
+        Trouve le premier créneau disponible pour le module dans cette salle
+        Retourne (créneau, [surveillant]) ou (None, [])
+        """
+        duration = module.get('duration_minutes', 120)
+        candidates = self._module_slot_mask(module) & self._room_free_mask(room, duration)
+        
+        for slot in np.flatnonzero(candidates):
+            self._count('sondages_creneaux')
+            supervisors = self._pick_supervisors(module, int(slot), 1)
+            if supervisors:
+                return int(slot), supervisors
+        
+        return None, []
+    
+    def _is_slot_available(self, slot, room_id, module):
+        """Vérifie si un créneau est disponible (salle ouverte et libre, étudiants sans examen ce jour)"""
+        self._count('sondages_creneaux')
+        cal = self.calendar
+        duration = module.get('duration_minutes', 120)
+        room_idx = self._room_pos.get(room_id)
+        if room_idx is None or not cal.open_mask(room_id, duration)[slot]:
+            return False
+        if self.room_busy[room_idx, cal.covered_slots(slot, duration)].any():
+            return False
+        students = module.get('_students')
+        if students is not None and len(students):
+            return not self.student_day[students, cal.slot_day[slot]].any()
+        return True
+    
+    def _place(self, module, slot, room, professor_id, student_count, **part_fields):
+        """Inscrit un examen dans le planning et met à jour les matrices d'occupation"""
+        cal = self.calendar
+        duration = module.get('duration_minutes', 120)
+        span = cal.covered_slots(slot, duration)
+        day = cal.slot_day[slot]
+        
+        self.room_busy[self._room_pos[room['id']], span] = True
+        prof_idx = self._prof_pos.get(professor_id)
+        if prof_idx is not None:
+            self.prof_busy[prof_idx, span] = True
+            self.prof_day_count[prof_idx, day] += 1
+        students = module.get('_students')
+        if students is not None and len(students):
+            self.student_day[students, day] = True
+        self._add_supervision(professor_id)
+        self._seats_used += student_count
+        self._seats_offered += room.get('capacite', 0)
+        
+        exam = {
+            'module_id': module['module_id'],
+            'module_name': module['module_name'],
+            'room_id': room['id'],
+            'room_name': room['nom'],
+            'professor_id': professor_id,
+            'slot': slot,
+            'exam_time': cal.to_datetime(slot),
+            'duration_minutes': duration,
+            'student_count': student_count,
+            'priority_score': module.get('priority_score', 0)
+        }
+        exam.update(part_fields)
+        self.generated_schedule.append(exam)
+        return exam
+    
+    # ---------- Répartition d'un module sur plusieurs salles ----------
+    
+    def _split_across_rooms(self, module):
+        """
+        Place un module au premier créneau dont la capacité libre suffit (matrices d'occupation et d'ouverture):
+        dans une seule salle si l'une des salles libres à ce créneau peut l'accueillir (ordre de préférence),
+        sinon réparti sur plusieurs salles libres
+        Chaque partie reçoit son propre surveillant; les parties partagent un split_group
+        """
+        student_count = module.get('student_count', 0)
+        if student_count <= 0 or not self.rooms:
+            return []
+        
+        cal = self.calendar
+        duration = module.get('duration_minutes', 120)
+        room_ids = [room['id'] for room in self.rooms]
+        free = (
+            cal.free_starts(self.room_busy, duration)
+            & cal.open_matrix(room_ids, duration)
+            & (self._room_capacity > 0)[:, None]
+        )
+        # Créneaux dont la capacité libre totale suffit
+        free_capacity = (free * self._room_capacity[:, None]).sum(axis=0)
+        candidates = self._module_slot_mask(module) & (free_capacity >= student_count)
+        single_rooms = self._rooms_by_preference(student_count)
+        single_idx = np.array([self._room_pos[room['id']] for room in single_rooms], dtype=np.int64)
+        
+        for slot in np.flatnonzero(candidates):
+            slot = int(slot)
+            self._count('sondages_creneaux')
+            
+            # Une salle suffisante libre à ce créneau: pas de répartition
+            single_free = np.flatnonzero(free[single_idx, slot]) if len(single_idx) else single_idx
+            if len(single_free):
+                supervisors = self._pick_supervisors(module, slot, 1)
+                if not supervisors:
+                    continue
+                return [self._place(module, slot, single_rooms[int(single_free[0])], supervisors[0], student_count)]
+            
+            free_rooms = [self.rooms[idx] for idx in np.flatnonzero(free[:, slot])]
+            packing = self._pack_rooms(student_count, free_rooms)
+            if not packing:
+                continue
+            
+            supervisors = self._pick_supervisors(module, slot, len(packing))
+            if not supervisors:
+                continue
+            
+            split_group = str(uuid.uuid4())
+            self._count('modules_decoupes')
+            return [
+                self._place(
+                    module, slot, room, professor_id, part_size,
+                    split_group=split_group, part_index=part_index, part_count=len(packing)
+                )
+                for part_index, ((room, part_size), professor_id) in enumerate(zip(packing, supervisors), start=1)
+            ]
+        
+        return []
+    
+    def _pack_rooms(self, student_count, rooms):
+        """
+        Choisit les salles d'un créneau pour accueillir student_count étudiants
+        First-fit-decreasing par bâtiment; un seul bâtiment est préféré quand il suffit
+        Retourne une liste de (salle, nombre d'étudiants) ou [] si la capacité manque
+        """
+        self._count('sondages_salles')
+        if sum(room.get('capacite', 0) for room in rooms) < student_count:
+            return []
+        
+        buildings = {}
+        for room in rooms:
+            buildings.setdefault(room.get('batiment') or '', []).append(room)
+        
+        # 1) Candidats mono-bâtiment
+        candidates = []
+        for building_rooms in buildings.values():
+            ordered = sorted(building_rooms, key=lambda r: r.get('capacite', 0), reverse=True)
+            chosen = self._first_fit_decreasing(student_count, ordered)
+            if chosen:
+                candidates.append(chosen)
+        
+        # 2) Sinon, bâtiments les plus grands d'abord pour limiter la dispersion
+        if not candidates:
+            building_capacity = {
+                name: sum(r.get('capacite', 0) for r in building_rooms)
+                for name, building_rooms in buildings.items()
+            }
+            ordered = sorted(
+                rooms,
+                key=lambda r: (-building_capacity[r.get('batiment') or ''], -r.get('capacite', 0))
+            )
+            chosen = self._first_fit_decreasing(student_count, ordered)
+            if chosen:
+                candidates.append(chosen)
+        
+        if not candidates:
+            return []
+        
+        # Le moins de salles possible, puis le moins de places perdues
+        best = min(
+            candidates,
+            key=lambda chosen: (len(chosen), sum(r.get('capacite', 0) for r in chosen) - student_count)
+        )
+        return self._balance_parts(student_count, best)
+    
+    @staticmethod
+    def _first_fit_decreasing(student_count, ordered_rooms):
+        """
+        Remplit les salles dans l'ordre donné (capacités décroissantes)
+        La dernière partie prend la plus petite salle restante suffisante pour limiter les places perdues
+        """
+        remaining = student_count
+        chosen = []
+        pool = list(ordered_rooms)
+        
+        while remaining > 0 and pool:
+            fitting = [r for r in pool if r.get('capacite', 0) >= remaining]
+            if fitting:
+                last_building = chosen[-1].get('batiment') if chosen else None
+                room = min(
+                    fitting,
+                    key=lambda r: (r.get('capacite', 0), r.get('batiment') != last_building)
+                )
+            else:
+                room = pool[0]
+            pool.remove(room)
+            chosen.append(room)
+            remaining -= room.get('capacite', 0)
+        
+        return chosen if remaining <= 0 else []
+    
+    @staticmethod
+    def _balance_parts(student_count, rooms):
+        """Répartit les étudiants au prorata des capacités (taux de remplissage homogène)"""
+        total_capacity = sum(r.get('capacite', 0) for r in rooms)
+        sizes = [student_count * r.get('capacite', 0) // total_capacity for r in rooms]
+        
+        # Distribuer le reste vers les salles ayant le plus de places libres
+        leftover = student_count - sum(sizes)
+        while leftover > 0:
+            idx = max(range(len(rooms)), key=lambda i: rooms[i].get('capacite', 0) - sizes[i])
+            sizes[idx] += 1
+            leftover -= 1
+        
+        return [(room, size) for room, size in zip(rooms, sizes) if size > 0]
+    
+    def _pick_supervisors(self, module, slot, count, preferred=()):
+        """
+        Choisit un surveillant par partie: les surveillants préférés (ex. affectation actuelle),
+        le responsable du module, puis les professeurs du département les moins chargés
+        """
+        self._count('sondages_surveillants')
+        span = self.calendar.covered_slots(slot, module.get('duration_minutes', 120))
+        day = self.calendar.slot_day[slot]
+        available = (
+            ~self.prof_busy[:, span].any(axis=1)
+            & (self.prof_day_count[:, day] < self.MAX_EXAMS_PER_PROFESSOR_DAY)
+        )
+        
+        def is_free(professor_id):
+            prof_idx = self._prof_pos.get(professor_id)
+            return prof_idx is not None and bool(available[prof_idx])
+        
+        chosen = []
+        for professor_id in list(preferred) + [module.get('professor_id')]:
+            if len(chosen) < count and professor_id not in chosen and is_free(professor_id):
+                chosen.append(professor_id)
+        
+        department_id = module.get('departement_id')
+        candidates = sorted(
+            self.professors or [],
+            key=lambda p: (p.get('departement_id') != department_id, self._supervision_load.get(p['id'], 0))
+        )
+        for professor in candidates:
+            if len(chosen) >= count:
+                break
+            if professor['id'] not in chosen and is_free(professor['id']):
+                chosen.append(professor['id'])
+        
+        return chosen if len(chosen) == count else []
+    
+    def _add_supervision(self, professor_id):
+        """Comptabilise une surveillance pour équilibrer la charge des professeurs"""
+        if professor_id is not None:
+            self._supervision_load[professor_id] = self._supervision_load.get(professor_id, 0) + 1
+    
+    def _detect_conflicts(self, schedule):
+        """Détecte tous les conflits (contrôles vectorisés sur l'index des créneaux)"""
+        conflicts = []
+        if not schedule:
+            return conflicts
+        
+        cal = self.calendar
+        slots = np.array([exam['slot'] for exam in schedule], dtype=np.int64)
+        days = cal.slot_day[slots]
+        
+        # Conflit 1: Étudiants avec > 1 examen/jour (un module réparti compte une fois)
+        seen = set()
+        student_rows, student_days = [], []
+        for exam, day in zip(schedule, days):
+            key = (exam['module_id'], int(day))
+            if key in seen:
+                continue
+            seen.add(key)
+            students = self._modules_by_id.get(exam['module_id'], {}).get('_students')
+            if students is not None and len(students):
+                student_rows.append(students)
+                student_days.append(np.full(len(students), day))
+        if student_rows:
+            pairs = np.stack([np.concatenate(student_rows), np.concatenate(student_days)])
+            unique_pairs, counts = np.unique(pairs, axis=1, return_counts=True)
+            for student_idx, day in unique_pairs[:, counts > 1].T:
+                conflicts.append({
+                    'type_conflit': 'ETUDIANT',
+                    'details': f"Étudiant {int(self._student_ids[student_idx])}: plusieurs examens le {cal.days[day]}",
+                    'severite': 'HAUTE'
+                })
+        
+        # Conflit 2: Professeurs avec > 3 examens/jour
+        professors = np.array([self._prof_pos.get(exam['professor_id'], -1) for exam in schedule], dtype=np.int64)
+        known = professors >= 0
+        if known.any():
+            per_day = np.zeros((len(self.professors), cal.n_days), dtype=np.int32)
+            np.add.at(per_day, (professors[known], days[known]), 1)
+            for prof_idx, day in np.argwhere(per_day > self.MAX_EXAMS_PER_PROFESSOR_DAY):
+                conflicts.append({
+                    'type_conflit': 'PROFESSEUR',
+                    'details': f"Professeur {self.professors[prof_idx]['id']}: {per_day[prof_idx, day]} examens le {cal.days[day]}",
+                    'severite': 'MOYENNE'
+                })
+        
+        # Conflit 3: Chevauchements de salles
+        room_usage = np.zeros((len(self.rooms), cal.n_slots), dtype=np.int32)
+        for exam in schedule:
+            room_idx = self._room_pos.get(exam['room_id'])
+            if room_idx is not None:
+                room_usage[room_idx, cal.covered_slots(exam['slot'], exam['duration_minutes'])] += 1
+        for room_idx, slot in np.argwhere(room_usage > 1):
+            conflicts.append({
+                'type_conflit': 'SALLE',
+                'details': f"Salle {self.rooms[room_idx]['nom']}: chevauchement le {cal.to_datetime(slot)}",
+                'severite': 'HAUTE'
+            })
+        
+        return conflicts
+    
+    # ---------- Évaluation ----------
+    
+    def _scorer(self):
+        """Évaluateur du planning (données fixes précalculées une fois par génération)"""
+        return ScheduleScorer(
+            self.calendar, self.rooms, self.professors, self.modules_data,
+            priority_department=self.department_id,
+            unavailabilities=self.unavailabilities,
+            weights=self.score_weights
+        )
+    
+    def score_schedule(self, schedule=None):
+        """
+        Évalue le planning: score_optimisation (0-100) et capacite_utilisee (%) sur chaque examen,
+        score global et composantes dans score_report
+        """
+        schedule = self.generated_schedule if schedule is None else schedule
+        result = self._scorer().score_schedule(schedule)
+        for exam, score, fill in zip(schedule, result['par_examen'], result['remplissage_pct']):
+            exam['score_optimisation'] = round(float(score), 1)
+            exam['capacite_utilisee'] = round(float(fill), 1)
+        
+        self.score_report = {
+            'global': result['global'],
+            'composantes': result['global_composantes']
+        }
+        return self.score_report
+    
+    def schedule_dataframe(self, schedule=None):
+        """Planning généré au format tabulaire (colonnes SCHEDULE_COLUMNS), une ligne par examen-salle"""
+        schedule = self.generated_schedule if schedule is None else schedule
+        modules = {module['module_id']: module for module in self.modules_data or []}
+        rooms = {room['id']: room for room in self.rooms or []}
+        professors = {prof['id']: prof for prof in self.professors or []}
+        
+        rows = []
+        for exam in schedule:
+            module = modules.get(exam['module_id'], {})
+            professor = professors.get(exam['professor_id'], {})
+            rows.append({
+                'module_id': exam['module_id'],
+                'module_nom': exam['module_name'],
+                'module_code': module.get('module_code'),
+                'formation_nom': module.get('formation_name'),
+                'salle_id': exam['room_id'],
+                'salle_nom': exam['room_name'],
+                'salle_capacite': rooms.get(exam['room_id'], {}).get('capacite'),
+                'professeur_id': exam['professor_id'],
+                'professeur_nom': f"{professor.get('prenom') or ''} {professor.get('nom') or ''}".strip() or None,
+                'date_heure': exam['exam_time'],
+                'duree_minutes': exam['duration_minutes'],
+                'nb_etudiants': exam['student_count'],
+                'score_optimisation': exam.get('score_optimisation'),
+                'capacite_utilisee': exam.get('capacite_utilisee'),
+            })
+        return pd.DataFrame(rows, columns=SCHEDULE_COLUMNS)
+        
+    # ---------- Bornes inférieures et écart d'optimalité ----------
+    
+    def compute_lower_bounds(self):
+        """
+        Bornes inférieures de l'instance, indépendantes du planning trouvé:
+        jours minimum (clique du graphe des conflits étudiants), créneaux et salles minimum (capacités)
+        """
+        cal = self.calendar
+        modules = self.modules_data or []
+        
+        clique = greedy_max_clique(conflict_adjacency([m.get('_students', []) for m in modules]))
+        
+        # Créneaux couverts par un examen: valeur la plus faible de la grille (borne prudente)
+        spans = {}
+        for module in modules:
+            duration = int(module.get('duration_minutes', 120))
+            if duration not in spans:
+                spans[duration] = int((cal.span_end(duration) - np.arange(cal.n_slots)).min()) if cal.n_slots else 1
+        seats = seat_bounds(
+            [m.get('student_count', 0) for m in modules],
+            [spans[int(m.get('duration_minutes', 120))] for m in modules],
+            self._room_capacity
+        )
+        
+        self.lower_bounds = {
+            'jours_min': len(clique),
+            'clique_modules': [modules[idx]['module_id'] for idx in clique],
+            'jours_disponibles': cal.n_days,
+            'creneaux_disponibles': cal.n_slots,
+            **seats
+        }
+        return self.lower_bounds
+    
+    def optimality_gap(self):
+        """
+        Compare le planning généré aux bornes inférieures (une ligne par indicateur)
+        La clique impose des jours distincts, pas une durée de session: elle est comparée au nombre
+        de jours portant au moins un examen (les jours vides entre deux examens ne comptent pas)
+        """
+        bounds = self.lower_bounds or self.compute_lower_bounds()
+        cal = self.calendar
+        slots = np.array([exam['slot'] for exam in self.generated_schedule], dtype=np.int64)
+        
+        if len(slots):
+            days_used = len(np.unique(cal.slot_day[slots]))
+            last_slot = max(int(cal.span_end(exam['duration_minutes'])[exam['slot']]) for exam in self.generated_schedule)
+            session_slots = last_slot - int(slots.min())
+        else:
+            days_used = session_slots = 0
+        
+        return [
+            {
+                'indicateur': "Jours avec au moins un examen",
+                'borne': bounds['jours_min'],
+                'obtenu': days_used,
+                'ecart_pct': gap_percent(days_used, bounds['jours_min'])
+            },
+            {
+                'indicateur': "Créneaux de session",
+                'borne': bounds['creneaux_min'],
+                'obtenu': session_slots,
+                'ecart_pct': gap_percent(session_slots, bounds['creneaux_min'])
+            },
+            {
+                'indicateur': "Examens-salles (répartitions)",
+                'borne': bounds['salles_min'],
+                'obtenu': len(self.generated_schedule),
+                'ecart_pct': gap_percent(len(self.generated_schedule), bounds['salles_min'])
+            },
+            {
+                'indicateur': "Modules non placés",
+                'borne': 0,
+                'obtenu': len(self.unplaced_modules),
+                'ecart_pct': None
+            }
+        ]
+    
+    # ---------- Amélioration (recherche locale, recuit simulé) ----------
+    
+    def improve_schedule(self, strategy='recherche_locale', time_budget=DEFAULT_TIME_BUDGET, seed=None, state=None):
+        """
+        Améliore le planning construit en déplaçant un module à la fois vers un autre créneau
+        Les modules les moins bien notés sont tirés en priorité; le déplacement est gardé
+        s'il améliore le score global (recherche locale), ou avec une probabilité qui décroît
+        avec la température s'il le dégrade (recuit simulé, meilleur planning conservé)
+        Chaque déplacement est évalué par différence (ScoreTracker): seuls le module déplacé
+        et les jours de ses étudiants sont réévalués
+        Les points de reprise enregistrent la stratégie, la graine, l'état du générateur aléatoire,
+        le meilleur score et le meilleur planning; state (point de reprise relu) les restaure
+        """
+        if strategy not in IMPROVEMENT_STRATEGIES:
+            raise ValueError(f"Stratégie d'amélioration inconnue: {strategy}")
+            
+        start_time = time.time()
+        deadline = start_time + max(0.0, time_budget or 0.0)
+        scorer = self._scorer()
+        rng = np.random.default_rng(seed)
+        total = len(self.modules_data)
+        
+        tracker = scorer.tracker(self.generated_schedule)
+        parts_by_module = {}
+        for exam in self.generated_schedule:
+            parts_by_module.setdefault(exam['module_id'], []).append(exam)
+        current = best = initial = tracker.score
+        best_schedule = None
+        stats = {'iterations': 0, 'acceptes': 0, 'ameliorations': 0}
+        if state:
+            rng.bit_generator.state = state['etat_aleatoire']
+            seed = state.get('graine')
+            initial = state['score_initial']
+            stats.update(state['statistiques'])
+            if state.get('meilleur_planning') and state['meilleur_score'] > current:
+                best, best_schedule = state['meilleur_score'], state['meilleur_planning']
+        
+        def snapshot():
+            self._improvement_state = {
+                'strategie': strategy,
+                'graine': seed,
+                'etat_aleatoire': rng.bit_generator.state,
+                'score_initial': initial,
+                'score_courant': current,
+                'meilleur_score': best,
+                'meilleur_planning': best_schedule,
+                'statistiques': dict(stats),
+            }
+        
+        next_report = start_time
+        
+        try:
+            while strategy != 'aucune' and self.generated_schedule and time.time() < deadline:
+                stats['iterations'] += 1
+                # Examen tiré selon son déficit de score: les plus mal notés bougent le plus souvent
+                weights = (101.0 - tracker.exam_scores()) * tracker.part_alive
+                part = rng.choice(len(weights), p=weights / weights.sum())
+                module = self._modules_by_id[tracker.module_ids[tracker.part_module[part]]]
+                
+                old_parts = parts_by_module[module['module_id']]
+                new_parts, moved = self._relocate(module, old_parts, rng)
+                parts_by_module[module['module_id']] = new_parts
+                if not moved:
+                    continue
+                    
+                candidate = tracker.propose(module['module_id'], new_parts)
+                self._count('mouvements_evalues')
+                self._count('evaluations_score')
+                delta = candidate['score'] - current
+                if strategy == 'recuit':
+                    # Température géométrique: 1 point de score au départ, 0.01 en fin de budget
+                    progress = (time.time() - start_time) / max(deadline - start_time, 1e-9)
+                    temperature = 0.01 ** min(progress, 1.0)
+                    accept = delta >= 0 or rng.random() < np.exp(delta / temperature)
+                else:
+                    accept = delta > 0
+                    
+                if accept:
+                    if delta < 0 and current == best:
+                        # Recuit: mémoriser le meilleur planning avant de s'en éloigner
+                        new_ids = {id(e) for e in new_parts}
+                        best_schedule = [e for e in self.generated_schedule if id(e) not in new_ids] + old_parts
+                    stats['acceptes'] += 1
+                    self._count('mouvements_acceptes')
+                    tracker.commit(candidate)
+                    current = candidate['score']
+                    if current > best:
+                        stats['ameliorations'] += 1
+                        best, best_schedule = current, None
+                else:
+                    self._unplace(module, new_parts)
+                    parts_by_module[module['module_id']] = self._reinstate(module, old_parts)
+                    
+                if time.time() >= next_report:
+                    next_report = time.time() + 0.5
+                    self._report(
+                        phase=f"🔧 {IMPROVEMENT_STRATEGIES[strategy]}: score {current:.1f}",
+                        pourcentage=90 + int(5 * min(1.0, (time.time() - start_time) / max(time_budget, 1e-9))),
+                        score_global=round(best, 1)
+                    )
+                    snapshot()
+                    self._maybe_checkpoint(total, total)
+        finally:
+            # Arrêt (budget épuisé ou annulation): repartir du meilleur planning rencontré
+            if current < best and best_schedule is not None:
+                self._restore(best_schedule)
+                current, best_schedule = best, None
+            if self.cancel_event is not None and self.cancel_event.is_set():
+                snapshot()
+                self._write_checkpoint(total, total)
+            self._improvement_state = None
+                
+        self.improvement_stats = {
+            'strategie': strategy,
+            'score_initial': round(initial, 2),
+            'score_final': round(current, 2),
+            'duree': round(time.time() - start_time, 2),
+            **stats
+        }
+        return self.improvement_stats
+        
+    def _relocate(self, module, parts, rng, tries=5):
+        """
+        Retire le module de son créneau et le replace sur un autre créneau réalisable tiré au hasard
+        Retourne (examens du module, déplacé): les nouveaux examens, ou la position d'origine
+        rétablie (examens recréés) si aucun essai n'aboutit
+        """
+        cal = self.calendar
+        self._unplace(module, parts)
+        
+        duration = module.get('duration_minutes', 120)
+        room_ids = [room['id'] for room in self.rooms]
+        free = (
+            cal.free_starts(self.room_busy, duration)
+            & cal.open_matrix(room_ids, duration)
+            & (self._room_capacity > 0)[:, None]
+        )
+        free_capacity = (free * self._room_capacity[:, None]).sum(axis=0)
+        candidates = np.flatnonzero(self._module_slot_mask(module) & (free_capacity >= module.get('student_count', 0)))
+        candidates = candidates[candidates != parts[0]['slot']]
+        
+        for slot in rng.permutation(candidates)[:tries]:
+            slot = int(slot)
+            self._count('sondages_creneaux')
+            free_rooms = [self.rooms[idx] for idx in np.flatnonzero(free[:, slot])]
+            placed = self._place_at(module, slot, free_rooms, preferred=[e['professor_id'] for e in parts])
+            if placed:
+                return placed, True
+                
+        return self._reinstate(module, parts), False
+        
+    def _unplace(self, module, parts):
+        """
+        Retire des examens du planning et libère salles, surveillants et étudiants
+        Les cases libérées étaient libres avant le placement (vérifié à la pose): l'annulation est exacte
+        """
+        cal = self.calendar
+        duration = module.get('duration_minutes', 120)
+        students = module.get('_students')
+        for exam in parts:
+            span = cal.covered_slots(exam['slot'], duration)
+            day = cal.slot_day[exam['slot']]
+            room_idx = self._room_pos[exam['room_id']]
+            self.room_busy[room_idx, span] = False
+            prof_idx = self._prof_pos.get(exam['professor_id'])
+            if prof_idx is not None:
+                self.prof_busy[prof_idx, span] = False
+                self.prof_day_count[prof_idx, day] -= 1
+            if exam['professor_id'] is not None:
+                self._supervision_load[exam['professor_id']] -= 1
+            if students is not None and len(students):
+                self.student_day[students, day] = False
+            self._seats_used -= exam['student_count']
+            self._seats_offered -= self._room_capacity[room_idx]
+            
+        removed = {id(exam) for exam in parts}
+        self.generated_schedule[:] = [exam for exam in self.generated_schedule if id(exam) not in removed]
+        
+    def _reinstate(self, module, parts):
+        """Remet des examens retirés à leur place; retourne les examens recréés"""
+        start = len(self.generated_schedule)
+        self._replay_placements([module], {module['module_id']: parts})
+        return self.generated_schedule[start:]
+        
+    def _restore(self, schedule):
+        """Rétablit un planning mémorisé: matrices reconstruites puis placements rejoués"""
+        self._build_index()
+        self.generated_schedule = []
+        self._supervision_load = {}
+        self._seats_used = self._seats_offered = 0
+        self._replay_placements(self._sort_modules_by_priority(), self._group_placements(schedule))
+        
+    # ---------- Génération décomposée par département ----------
+    
+    def _assign_rooms_by_department(self, modules, max_workers=None):
+        """
+        Génération décomposée: chaque département est résolu indépendamment (processus séparés)
+        sur sa part du budget salles x créneaux, puis une phase de fusion rejoue les placements
+        sur l'état global et répare les conflits inter-départements (salles, surveillants, étudiants communs)
+        """
+        groups = {}
+        for module in modules:
+            groups.setdefault(module.get('departement_id'), []).append(module)
+        
+        if len(groups) <= 1:
+            return self._assign_rooms(modules)
+        
+        department_ids = list(groups)
+        owner = self._allocate_room_budget([groups[d] for d in department_ids])
+        base_room_busy = self.room_busy.copy()
+        
+        payloads = []
+        for position, department_id in enumerate(department_ids):
+            professors = [p for p in self.professors if p.get('departement_id') == department_id]
+            payloads.append({
+                'start_date': self.start_date,
+                'end_date': self.end_date,
+                'calendar': self.calendar,
+                'rooms': self.rooms,
+                # Surveillants du département (tous si le département n'en a aucun)
+                'professors': professors or self.professors,
+                'modules': [{k: v for k, v in m.items() if k != '_students'} for m in groups[department_id]],
+                'existing_exams': self.existing_exams,
+                'blocked_rooms': base_room_busy | (owner != position)
+            })
+        
+        try:
+            partial_schedules = []
+            # 'spawn': la génération tourne dans un thread du serveur Streamlit, et forker un processus
+            # multithreadé peut bloquer les enfants sur des verrous hérités
+            executor = ProcessPoolExecutor(
+                max_workers=max_workers or min(len(payloads), os.cpu_count() or 1),
+                mp_context=multiprocessing.get_context('spawn')
+            )
+            cancelled = False
+            try:
+                pending = {executor.submit(_solve_department, payload) for payload in payloads}
+                while pending:
+                    done, pending = wait(pending, timeout=CANCEL_POLL_SECONDS, return_when=FIRST_COMPLETED)
+                    if self.cancel_event is not None and self.cancel_event.is_set():
+                        raise GenerationCancelled("Génération annulée")
+                    for future in done:
+                        partial_schedules.append(future.result())
+                        self._report(
+                            phase=f"🏫 Départements résolus: {len(partial_schedules)}/{len(payloads)}",
+                            pourcentage=10 + int(50 * len(partial_schedules) / len(payloads))
+                        )
+            except GenerationCancelled:
+                cancelled = True
+                raise
+            finally:
+                # Annulation: rendre la main tout de suite, les départements en attente sont abandonnés
+                # et ceux en cours se terminent sans être attendus
+                executor.shutdown(wait=not cancelled, cancel_futures=cancelled)
+        except (OSError, BrokenProcessPool):
+            # Pas de processus disponibles (environnement restreint): résolution séquentielle
+            partial_schedules = [_solve_department(payload) for payload in payloads]
+        
+        return self._merge_department_schedules(modules, partial_schedules)
+    
+    def _allocate_room_budget(self, department_modules):
+        """
+        Attribue chaque couple (salle, créneau) libre à un département, au prorata de sa demande
+        (étudiants x durée), chaque salle étant partagée entre tous les départements (grandes salles comprises)
+        Calcul vectorisé sur les matrices: une suite de départements proportionnelle aux parts
+        (ordre de Sainte-Laguë) est parcourue le long des créneaux libres de chaque salle, décalée
+        d'une salle à la suivante pour qu'un même créneau alterne les départements
+        Retourne une matrice salles x créneaux des numéros de département (-1: déjà occupé)
+        """
+        demand = np.array([
+            sum(m.get('student_count', 0) * m.get('duration_minutes', 120) for m in mods)
+            for mods in department_modules
+        ], dtype=float)
+        share = demand / demand.sum() if demand.sum() else np.full(len(demand), 1 / len(demand))
+        owner = np.full(self.room_busy.shape, -1, dtype=np.int32)
+        
+        # Suite de départements: jalons (k + 0.5) / part fusionnés, assez longue pour un tour complet
+        length = max(self.calendar.n_slots, 4 * len(share))
+        counts = np.ceil(share * length).astype(int) + 1
+        departments = np.repeat(np.arange(len(share)), counts)
+        ranks = np.concatenate([np.arange(count) for count in counts])
+        ticks = (ranks + 0.5) / np.maximum(share[departments], 1e-12)
+        sequence = departments[np.argsort(ticks, kind='stable')][:length]
+        
+        # Rang de chaque créneau libre dans sa salle, décalé du rang de taille de la salle
+        free = ~self.room_busy
+        size_rank = np.empty(len(self._room_capacity), dtype=np.int64)
+        size_rank[np.argsort(-self._room_capacity, kind='stable')] = np.arange(len(self._room_capacity))
+        position = np.cumsum(free, axis=1) - 1 + size_rank[:, None]
+        owner[free] = sequence[position[free] % length]
+        return owner
+    
+    def _merge_department_schedules(self, modules, partial_schedules):
+        """
+        Phase de fusion: rejoue les placements des départements dans l'ordre de priorité;
+        un module qui entre en conflit avec l'état global (ou non placé) est replacé sur toutes les salles
+        """
+        schedule = []
+        self.generated_schedule = schedule
+        self._supervision_load = {}
+        self._seats_used = self._seats_offered = 0
+        self.unplaced_modules = []
+        
+        placements = self._group_placements([exam for partial in partial_schedules for exam in partial])
+        to_repair = self._replay_placements(modules, placements)
+        self._report(phase="🔀 Fusion et réparation...", pourcentage=60)
+        
+        for position, module in enumerate(to_repair, start=1):
+            if not self._place_module(module):
+                self.unplaced_modules.append(module['module_id'])
+            fields = self._progress_fields(len(modules) - len(to_repair) + position, len(modules))
+            fields['pourcentage'] = 60 + int(30 * position / len(to_repair))
+            self._report(**fields)
+        
+        self.merge_stats = {
+            'departements': len(partial_schedules),
+            'rejoues': len(modules) - len(to_repair),
+            'repares': len(to_repair),
+            'non_places': len(modules) - len({exam['module_id'] for exam in schedule})
+        }
+        return schedule
+    
+    def _group_placements(self, schedule):
+        """
+        Regroupe des placements par module
+        Accepte une liste de dictionnaires ou un DataFrame: export des placements ou export
+        tabulaire (colonnes SCHEDULE_COLUMNS, renommées). Le créneau est toujours recalculé depuis
+        l'horaire sur la grille courante: un numéro de créneau exporté ne vaut que pour sa période
+        Les placements hors de la grille sont ignorés
+        """
+        if isinstance(schedule, pd.DataFrame):
+            schedule = schedule.rename(columns=PLACEMENT_KEYS)
+            missing = [key for key in REQUIRED_PLACEMENT_KEYS if key not in schedule.columns]
+            if missing:
+                raise ValueError(f"Planning de départ illisible, colonnes manquantes: {', '.join(missing)}")
+            schedule = schedule.astype(object).where(schedule.notna(), None).to_dict('records')
+        
+        placements = {}
+        for exam in schedule:
+            exam = dict(exam)
+            exam['slot'] = self.calendar.slot_of(pd.Timestamp(exam['exam_time']).to_pydatetime())
+            if exam['slot'] < 0:
+                continue
+            exam['room_id'] = int(exam['room_id'])
+            exam['student_count'] = int(exam['student_count'])
+            if exam.get('professor_id') is not None:
+                exam['professor_id'] = int(exam['professor_id'])
+            for key in ('part_index', 'part_count'):
+                if exam.get(key) is not None:
+                    exam[key] = int(exam[key])
+            placements.setdefault(int(exam['module_id']), []).append(exam)
+        return placements
+    
+    def _replay_placements(self, modules, placements):
+        """
+        Rejoue des placements connus (fusion, reprise, démarrage à chaud) sur l'état courant
+        Retourne les modules sans placement valide, à construire
+        """
+        remaining = []
+        for module in modules:
+            parts = placements.get(module['module_id'])
+            if parts and self._placement_fits(module, parts):
+                for exam in parts:
+                    room = self.rooms[self._room_pos[exam['room_id']]]
+                    part_fields = {k: exam[k] for k in ('split_group', 'part_index', 'part_count') if exam.get(k) is not None}
+                    self._place(module, exam['slot'], room, exam['professor_id'], int(exam['student_count']), **part_fields)
+            else:
+                remaining.append(module)
+        return remaining
+    
+    def _placement_fits(self, module, parts):
+        """Vérifie qu'un placement calculé par un département reste valide dans l'état global"""
+        cal = self.calendar
+        slot = parts[0]['slot']
+        if any(exam['slot'] != slot for exam in parts) or not self._module_slot_mask(module)[slot]:
+            return False
+        if sum(exam['student_count'] for exam in parts) < module.get('student_count', 0):
+            return False
+        
+        span = cal.covered_slots(slot, module.get('duration_minutes', 120))
+        day = cal.slot_day[slot]
+        for exam in parts:
+            room_idx = self._room_pos.get(exam['room_id'])
+            prof_idx = self._prof_pos.get(exam['professor_id'])
+            if room_idx is None or self.room_busy[room_idx, span].any():
+                return False
+            if exam['student_count'] > self._room_capacity[room_idx]:
+                return False
+            if prof_idx is None or self.prof_busy[prof_idx, span].any():
+                return False
+            if self.prof_day_count[prof_idx, day] >= self.MAX_EXAMS_PER_PROFESSOR_DAY:
+                return False
+        return len({exam['professor_id'] for exam in parts}) == len(parts)
+    
+    # ---------- Réoptimisation incrémentale ----------
+    
+    def reoptimize(self, changed_exam_ids=()):
+        """
+        Répare le planning enregistré après une modification (examen déplacé, annulé,
+        salle rendue indisponible) sans tout régénérer
+        Les examens non touchés restent figés; seuls les modules voisins en conflit
+        (graphe de conflits) et les examens en salle indisponible sont replacés
+        Retourne la liste minimale des mouvements
+        """
+        start_time = time.time()
+        if not self.rooms:
+            self._load_resources()
+        
+        committed = self.existing_exams or []
+        rows_by_module = {}
+        for row in committed:
+            rows_by_module.setdefault(row['module_id'], []).append(row)
+        
+        dirty_modules = self._repair_neighbourhood(committed, set(changed_exam_ids))
+        if not dirty_modules:
+            self.repair_time = time.time() - start_time
+            return []
+        
+        # Tout le reste est figé: il alimente les matrices comme des examens existants
+        self.existing_exams = [row for row in committed if row['module_id'] not in dirty_modules]
+        self.modules_data = [self._module_from_rows(rows_by_module[module_id]) for module_id in dirty_modules]
+        self.generated_schedule = []
+        self._supervision_load = {}
+        self._build_index()
+        self.existing_exams = committed
+        
+        moves = []
+        for module in self._sort_modules_by_priority():
+            original = sorted(rows_by_module[module['module_id']], key=lambda row: row.get('partie_num') or 0)
+            placed = self._repair_module(module, original)
+            moves.extend(self._diff_module(module, original, placed))
+        
+        self.repair_time = time.time() - start_time
+        return moves
+    
+    def _repair_neighbourhood(self, committed, changed_exam_ids):
+        """
+        Modules à replacer: examens en salle indisponible, et voisins des examens modifiés
+        dans le graphe de conflits (étudiants communs le même jour, salle ou surveillant
+        qui se chevauchent, surveillant au-delà de 3 examens/jour)
+        """
+        cal = self.calendar
+        available_rooms = {room['id'] for room in self.rooms or []}
+        dirty = {row['module_id'] for row in committed if row['salle_id'] not in available_rooms}
+        
+        anchors = [row for row in committed if row['id'] in changed_exam_ids]
+        anchor_modules = {row['module_id'] for row in anchors}
+        students_of = {row['module_id']: set(row.get('student_ids') or []) for row in committed}
+        bounds = {}
+        for row in committed:
+            start = cal.minutes(row['date_heure'])
+            bounds[row['id']] = (start, start + int(row['duree_minutes'] or 0), start // MINUTES_PER_DAY)
+        
+        for anchor in anchors:
+            a_start, a_end, a_day = bounds[anchor['id']]
+            anchor_students = students_of[anchor['module_id']]
+            same_professor_day = []
+            
+            for row in committed:
+                if row['module_id'] in anchor_modules:
+                    continue
+                start, end, day = bounds[row['id']]
+                overlap = start < a_end and a_start < end
+                if day == a_day and not anchor_students.isdisjoint(students_of[row['module_id']]):
+                    dirty.add(row['module_id'])
+                elif overlap and (row['salle_id'] == anchor['salle_id'] or row['professeur_id'] == anchor['professeur_id']):
+                    dirty.add(row['module_id'])
+                elif day == a_day and row['professeur_id'] == anchor['professeur_id']:
+                    same_professor_day.append(row)
+            
+            # Surveillant au-delà du maximum journalier: libérer les derniers examens de la journée
+            surplus = len(same_professor_day) + 1 - self.MAX_EXAMS_PER_PROFESSOR_DAY
+            if surplus > 0:
+                latest = sorted(same_professor_day, key=lambda row: row['date_heure'])[-surplus:]
+                dirty.update(row['module_id'] for row in latest)
+        
+        return dirty
+    
+    @staticmethod
+    def _module_from_rows(rows):
+        """Reconstitue un module à replacer à partir de ses lignes examens"""
+        first = rows[0]
+        student_ids = first.get('student_ids') or []
+        return {
+            'module_id': first['module_id'],
+            'module_name': first['module_nom'],
+            'departement_id': first.get('departement_id'),
+            'professor_id': first.get('responsable_id') or first.get('professeur_id'),
+            'student_count': len(student_ids) or sum(row.get('nb_etudiants') or 0 for row in rows),
+            'student_ids': student_ids,
+            'duration_minutes': first['duree_minutes']
+        }
+    
+    def _repair_module(self, module, original):
+        """
+        Replace un module au plus près de sa position actuelle:
+        créneaux triés par distance à l'horaire d'origine, salles et surveillants d'origine conservés si possible
+        """
+        cal = self.calendar
+        duration = module['duration_minutes']
+        room_ids = [room['id'] for room in self.rooms]
+        free = cal.free_starts(self.room_busy, duration) & cal.open_matrix(room_ids, duration)
+        candidates = np.flatnonzero(self._module_slot_mask(module) & free.any(axis=0))
+        
+        original_start = cal.minutes(original[0]['date_heure'])
+        candidates = candidates[np.argsort(np.abs(cal.slot_start[candidates] - original_start), kind='stable')]
+        
+        for slot in candidates:
+            slot = int(slot)
+            free_rooms = [self.rooms[idx] for idx in np.flatnonzero(free[:, slot])]
+            keep = original if cal.slot_start[slot] == original_start else []
+            placed = self._place_at(
+                module, slot, free_rooms, keep,
+                preferred=[row['professeur_id'] for row in original],
+                split_group=original[0].get('groupe_examen')
+            )
+            if placed:
+                return placed
+                
+        return []
+        
+    def _place_at(self, module, slot, free_rooms, keep_rows=(), preferred=(), split_group=None):
+        """
+        Place le module sur un créneau donné parmi les salles libres (réparti si nécessaire)
+        Les surveillants des salles gardées puis les surveillants préférés sont choisis en premier
+        Retourne les examens placés, ou [] si salles ou surveillants manquent
+        """
+        parts = self._plan_parts(module, free_rooms, keep_rows)
+        if not parts:
+            return []
+            
+        chosen = [professor_id for _, _, professor_id in parts if professor_id is not None]
+        chosen += [professor_id for professor_id in preferred if professor_id not in chosen]
+        supervisors = self._pick_supervisors(module, slot, len(parts), preferred=chosen)
+        if not supervisors:
+            return []
+            
+        if len(parts) == 1:
+            room, size, _ = parts[0]
+            return [self._place(module, slot, room, supervisors[0], size)]
+            
+        split_group = str(split_group or uuid.uuid4())
+        return [
+            self._place(
+                module, slot, room, professor_id, size,
+                split_group=split_group, part_index=part_index, part_count=len(parts)
+            )
+            for part_index, ((room, size, _), professor_id) in enumerate(zip(parts, supervisors), start=1)
+        ]
+    
+    def _plan_parts(self, module, free_rooms, keep_rows):
+        """
+        Salles d'un créneau pour le module: les salles d'origine encore libres sont gardées
+        avec leur effectif, le reste des étudiants est réparti sur les autres salles libres
+        Retourne une liste de (salle, effectif, surveillant d'origine ou None)
+        """
+        student_count = module['student_count']
+        free_by_id = {room['id']: room for room in free_rooms}
+        kept = [
+            (free_by_id[row['salle_id']], row.get('nb_etudiants') or 0, row['professeur_id'])
+            for row in keep_rows if row['salle_id'] in free_by_id
+        ]
+        remaining = student_count - sum(size for _, size, _ in kept)
+        if kept and remaining <= 0:
+            return kept
+        
+        kept_ids = {room['id'] for room, _, _ in kept}
+        others = [room for room in free_rooms if room['id'] not in kept_ids]
+        if not kept:
+            room = self._find_best_room(student_count, others)
+            if room:
+                return [(room, student_count, None)]
+        
+        packing = self._pack_rooms(remaining, others)
+        if not packing:
+            return []
+        return kept + [(room, size, None) for room, size in packing]
+    
+    def _diff_module(self, module, original, placed):
+        """Compare la position d'origine et la position réparée: seules les différences sont retournées"""
+        if not placed:
+            return [self._move('NON_PLACE', module, row, None) for row in original]
+        
+        # Appariement: même salle d'abord, puis dans l'ordre des parties
+        remaining = list(original)
+        pairs = []
+        for exam in placed:
+            match = next((row for row in remaining if row['salle_id'] == exam['room_id']), None)
+            if match:
+                remaining.remove(match)
+            pairs.append([match, exam])
+        for pair in pairs:
+            if pair[0] is None and remaining:
+                pair[0] = remaining.pop(0)
+        
+        moves = []
+        for row, exam in pairs:
+            if row is None:
+                moves.append(self._move('CREER', module, None, exam))
+            elif not self._same_position(row, exam):
+                moves.append(self._move('DEPLACER', module, row, exam))
+        moves.extend(self._move('ANNULER', module, row, None) for row in remaining)
+        return moves
+    
+    @staticmethod
+    def _same_position(row, exam):
+        """Vrai si la ligne examens correspond déjà à la position réparée"""
+        split_group = exam.get('split_group')
+        return (
+            row['date_heure'] == exam['exam_time']
+            and row['salle_id'] == exam['room_id']
+            and row['professeur_id'] == exam['professor_id']
+            and (row.get('partie_num'), row.get('nb_parties')) == (exam.get('part_index'), exam.get('part_count'))
+            and (str(row['groupe_examen']) if row.get('groupe_examen') else None) == split_group
+            and (split_group is None or row.get('nb_etudiants') == exam['student_count'])
+        )
+    
+    @staticmethod
+    def _move(action, module, row, exam):
+        """Mouvement au format de apply_schedule_moves (ancienne position pour l'affichage)"""
+        move = {
+            'action': action,
+            'exam_id': row['id'] if row else None,
+            'module_id': module['module_id'],
+            'module_name': module['module_name'],
+            'ancienne_date': row['date_heure'] if row else None,
+            'ancienne_salle': row['salle_nom'] if row else None,
+            'ancien_professeur_id': row['professeur_id'] if row else None
+        }
+        if exam:
+            move.update({
+                key: exam.get(key)
+                for key in ('exam_time', 'room_id', 'room_name', 'professor_id', 'duration_minutes',
+                            'student_count', 'split_group', 'part_index', 'part_count')
+            })
+        return move
+    
+    def apply_moves(self, moves):
+        """Applique les mouvements d'une réparation dans une seule transaction"""
+        moves = [move for move in moves if move['action'] in ('DEPLACER', 'CREER', 'ANNULER')]
+        if not moves:
+            return False, "Aucun mouvement à appliquer"
+        
+        try:
+            query = "SELECT apply_schedule_moves(%s::jsonb)"
+            result = execute_query(query, (json.dumps(moves, default=str),), fetch=True)
+            
+            if result:
+                count = result[0].get('apply_schedule_moves', 0)
+                return True, f"✅ {count} examens mis à jour"
+            
+            return False, "Erreur lors de l'application des mouvements"
+            
+        except Exception as e:
+            return False, f"Erreur: {str(e)}"
+    
+    def save_schedule(self):
+        """
+        Publie le planning dans la BD en une transaction (copie en bloc, contrôles, insertion)
+        Si un contrôle échoue rien n'est écrit et le rapport de rejet est dans publish_report
+        """
+        self.publish_report = []
+        if not self.generated_schedule:
+            return False, "Aucun planning à sauvegarder"
+        
+        try:
+            with self._phase('sauvegarde'):
+                count, rejections = publish_schedule(self.generated_schedule)
+            
+            if rejections:
+                self.publish_report = rejections
+                return False, f"❌ Publication refusée : {len(rejections)} conflit(s) avec les examens enregistrés"
+            
+            delete_checkpoint(self.checkpoint_path)
+            return True, f"✅ {count} examens sauvegardés"
+            
+        except Exception as e:
+            return False, f"Erreur: {str(e)}"
+
+
+def _solve_department(payload):
+    """
+    Résolution d'un département dans un processus séparé
+    Les couples (salle, créneau) hors de son budget sont marqués occupés
+    """
+    optimizer = ExamScheduleOptimizer(payload['start_date'], payload['end_date'], calendar=payload['calendar'])
+    optimizer.rooms = payload['rooms']
+    optimizer.professors = payload['professors']
+    optimizer.modules_data = payload['modules']
+    optimizer.existing_exams = payload['existing_exams']
+    optimizer._build_index()
+    optimizer.room_busy |= payload['blocked_rooms']
+    return optimizer._assign_rooms(optimizer._sort_modules_by_priority())
+
+
+def build_schedule(start_date: date, end_date: date, department_id: int = None, construction='glouton',
+                   improvement='aucune', time_budget=DEFAULT_TIME_BUDGET, initial_schedule=None,
+                   seed=None, **optimizer_options):
+    """
+    Pipeline complet: chargement -> construction -> amélioration -> évaluation
+    optimizer_options: options du constructeur (calendar, progress_callback, cancel_event, checkpoint_path)
+    Retourne l'optimiseur (planning, scores, bornes); aucun planning si rien n'est à planifier
+    """
+    if construction not in CONSTRUCTION_STRATEGIES:
+        raise ValueError(f"Stratégie de construction inconnue: {construction}")
+
+    optimizer = ExamScheduleOptimizer(start_date, end_date, department_id, **optimizer_options)
+    if optimizer.load_data():
+        optimizer.generate_schedule(
+            parallel=construction == 'parallele',
+            initial_schedule=initial_schedule,
+            improvement=improvement,
+            time_budget=time_budget,
+            seed=seed
+        )
+    return optimizer
@@ -0,0 +1,99 @@
+"""
+Tâches de génération exécutées en arrière-plan
+Les tâches sont conservées au niveau du processus Streamlit: elles survivent aux reruns du script,
+la session ne garde que leur identifiant
+"""
+import threading
+import uuid
+from datetime import datetime
+
+# Statuts d'une tâche
+EN_COURS = "EN_COURS"
+TERMINE = "TERMINE"
+ANNULE = "ANNULE"
+ERREUR = "ERREUR"
+
+_jobs = {}
+_jobs_lock = threading.Lock()
+
+
+class GenerationJob:
+    """
+    Tâche de génération dans un thread séparé
+    target(job) reçoit la tâche pour publier son avancement (job.update) et lire job.cancel_event
+    """
+
+    def __init__(self, target, label: str = ""):
+        self.id = uuid.uuid4().hex[:12]
+        self.label = label
+        self.status = EN_COURS
+        self.progress = {}
+        self.result = None
+        self.error = None
+        self.started_at = datetime.now()
+        self.finished_at = None
+        self.cancel_event = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, args=(target,), name=f"generation-{self.id}", daemon=True)
+
+    def _run(self, target):
+        result, error = None, None
+        try:
+            result = target(self)
+            status = ANNULE if self.cancel_event.is_set() else TERMINE
+        except Exception as e:
+            status = ANNULE if self.cancel_event.is_set() else ERREUR
+            error = str(e)
+
+        with self._lock:
+            self.result = result
+            self.error = error
+            self.status = status
+            self.finished_at = datetime.now()
+
+    def update(self, **fields):
+        """Publie l'avancement (appelé depuis le thread de génération)"""
+        with self._lock:
+            self.progress.update(fields)
+
+    def snapshot(self) -> dict:
+        """Copie cohérente de l'avancement pour l'affichage"""
+        with self._lock:
+            return dict(self.progress)
+
+    def cancel(self):
+        """Demande l'arrêt; la génération s'interrompt au prochain point de contrôle"""
+        self.cancel_event.set()
+
+    @property
+    def is_running(self) -> bool:
+        return self.status == EN_COURS
+
+    @property
+    def elapsed(self) -> float:
+        end = self.finished_at or datetime.now()
+        return (end - self.started_at).total_seconds()
+
+
+def submit_job(target, label: str = "") -> GenerationJob:
+    """Lance target(job) en arrière-plan et enregistre la tâche"""
+    job = GenerationJob(target, label)
+    with _jobs_lock:
+        _jobs[job.id] = job
+    job._thread.start()
+    return job
+
+
+def get_job(job_id):
+    """Retourne la tâche ou None si elle n'existe plus"""
+    with _jobs_lock:
+        return _jobs.get(job_id)
+
+
+def discard_job(job_id):
+    """Annule la tâche si besoin et libère son résultat"""
+    with _jobs_lock:
+        job = _jobs.pop(job_id, None)
+    if job is not None:
+        job.cancel()
+    return job
@@ -0,0 +1,190 @@
+"""
+Détection des chevauchements horaires (et non plus seulement « même jour ») entre examens
+Ressources contrôlées: salles, surveillants et étudiants
+- find_overlaps: contrôle de tout le planning; les intervalles sont triés une seule fois par (ressource, début)
+  puis balayés (maximum courant des fins), seules les ressources en chevauchement sont détaillées
+- OverlapIndex: index trié par ressource pour contrôler un examen inséré ou déplacé en O(log n)
+Les instants sont des datetime; ils sont convertis en minutes pour le calcul
+"""
+from bisect import bisect_left
+from datetime import datetime, timedelta
+import heapq
+
+import numpy as np
+
+# Types de ressources contrôlées
+RESOURCE_KINDS = {
+    'SALLE': "Salle occupée deux fois",
+    'PROFESSEUR': "Surveillant sur deux examens",
+    'ETUDIANT': "Étudiant sur deux examens",
+}
+
+_EPOCH = datetime(2000, 1, 1)
+
+
+def to_minutes(value: datetime) -> int:
+    """Instant -> minutes depuis 2000-01-01"""
+    return int((value - _EPOCH).total_seconds() // 60)
+
+
+def from_minutes(minutes: int) -> datetime:
+    return _EPOCH + timedelta(minutes=int(minutes))
+
+
+def exam_intervals(exams, enrolments=None):
+    """
+    Intervalles (type, ressource, début, fin, examen) d'un planning
+    exams: dicts id, module_id, salle_id, professeur_id, date_heure, duree_minutes
+    enrolments: {module_id: [etudiant_id]}; les parties d'un module réparti comptent une fois par étudiant
+    """
+    student_spans = {}
+    for exam in exams:
+        start = to_minutes(exam['date_heure'])
+        end = start + int(exam['duree_minutes'])
+        yield 'SALLE', exam['salle_id'], start, end, exam['id']
+        yield 'PROFESSEUR', exam['professeur_id'], start, end, exam['id']
+        if enrolments is not None:
+            # Un étudiant passe un module réparti dans une seule salle: une plage par (module, horaire)
+            student_spans.setdefault((exam['module_id'], start, end), exam['id'])
+
+    for (module_id, start, end), exam_id in student_spans.items():
+        for student_id in enrolments.get(module_id) or ():
+            yield 'ETUDIANT', student_id, start, end, exam_id
+
+
+def find_overlaps(intervals) -> list:
+    """
+    Chevauchements d'un ensemble d'intervalles (type, ressource, début, fin, examen)
+    Un tri unique par (ressource, début), puis un balayage vectorisé: un intervalle chevauche un précédent
+    de la même ressource si son début est avant le maximum des fins précédentes. Les paires ne sont
+    énumérées (balayage avec tas des fins) que pour les ressources signalées
+    Retourne des dicts type_conflit, entite_id, examen_a, examen_b, debut, fin (partie commune)
+    """
+    rows = list(intervals)
+    if not rows:
+        return []
+
+    kinds = {kind: code for code, kind in enumerate(RESOURCE_KINDS)}
+    keys = np.array([(kinds[kind], entity) for kind, entity, _, _, _ in rows], dtype=np.int64)
+    starts = np.array([row[2] for row in rows], dtype=np.int64)
+    ends = np.array([row[3] for row in rows], dtype=np.int64)
+
+    order = np.lexsort((starts, keys[:, 1], keys[:, 0]))
+    keys, starts, ends = keys[order], starts[order], ends[order]
+
+    # Rang de la ressource dans l'ordre trié: les groupes sont décalés pour ne jamais se recouvrir
+    new_group = np.ones(len(order), dtype=bool)
+    new_group[1:] = (keys[1:] != keys[:-1]).any(axis=1)
+    group = np.cumsum(new_group) - 1
+    base = starts.min()
+    offset = int(ends.max() - base) + 1
+    shifted_ends = (ends - base) + group * offset
+    previous_max = np.concatenate([[-1], np.maximum.accumulate(shifted_ends)[:-1]])
+    flagged = (starts - base) + group * offset < previous_max
+
+    conflicts = []
+    kind_names = list(RESOURCE_KINDS)
+    for group_id in np.unique(group[flagged]):
+        members = np.flatnonzero(group == group_id)
+        kind = kind_names[keys[members[0], 0]]
+        entity = int(keys[members[0], 1])
+        active = []  # tas (fin, examen)
+        for idx in members:
+            start, end, exam_id = int(starts[idx]), int(ends[idx]), rows[order[idx]][4]
+            while active and active[0][0] <= start:
+                heapq.heappop(active)
+            for other_end, other_id in active:
+                if other_id != exam_id:
+                    conflicts.append({
+                        'type_conflit': kind,
+                        'entite_id': entity,
+                        'examen_a': other_id,
+                        'examen_b': exam_id,
+                        'debut': from_minutes(start),
+                        'fin': from_minutes(min(end, other_end)),
+                    })
+            heapq.heappush(active, (end, exam_id))
+    return conflicts
+
+
+class OverlapIndex:
+    """
+    Intervalles triés par début pour chaque ressource, pour les contrôles ponctuels (insertion ou
+    déplacement d'un examen): recherche dichotomique du dernier début avant la fin demandée, puis
+    remontée tant qu'un intervalle plus ancien peut encore recouvrir (durée maximale de la ressource),
+    soit O(log n) plus les quelques examens voisins
+    """
+
+    def __init__(self):
+        self._starts = {}
+        self._entries = {}
+        self._longest = {}
+
+    @classmethod
+    def from_exams(cls, exams, enrolments=None):
+        index = cls()
+        for kind, entity, start, end, exam_id in exam_intervals(exams, enrolments):
+            index.add(kind, entity, start, end, exam_id)
+        return index
+
+    def add(self, kind, entity, start: int, end: int, exam_id):
+        key = (kind, entity)
+        starts = self._starts.setdefault(key, [])
+        entries = self._entries.setdefault(key, [])
+        position = bisect_left(starts, start)
+        starts.insert(position, start)
+        entries.insert(position, (end, exam_id))
+        self._longest[key] = max(self._longest.get(key, 0), end - start)
+
+    def remove(self, kind, entity, start: int, exam_id):
+        key = (kind, entity)
+        starts, entries = self._starts.get(key, []), self._entries.get(key, [])
+        position = bisect_left(starts, start)
+        while position < len(starts) and starts[position] == start:
+            if entries[position][1] == exam_id:
+                del starts[position]
+                del entries[position]
+                return True
+            position += 1
+        return False
+
+    def overlapping(self, kind, entity, start: int, end: int, ignore=()) -> list:
+        """Examens de la ressource qui recoupent [start, end), hors examens ignorés"""
+        key = (kind, entity)
+        starts, entries = self._starts.get(key), self._entries.get(key)
+        if not starts:
+            return []
+        found = []
+        earliest = start - self._longest[key]
+        position = bisect_left(starts, end) - 1
+        while position >= 0 and starts[position] > earliest:
+            other_end, exam_id = entries[position]
+            if other_end > start and exam_id not in ignore:
+                found.append(exam_id)
+            position -= 1
+        return found
+
+    def check_exam(self, exam, students=(), ignore=()) -> list:
+        """
+        Chevauchements d'un examen placé à exam['date_heure'] (salle, surveillant, étudiants)
+        ignore: identifiants à ne pas compter (l'examen lui-même et ses autres parties lors d'un déplacement)
+        """
+        start = to_minutes(exam['date_heure'])
+        end = start + int(exam['duree_minutes'])
+        ignore = set(ignore) | {exam.get('id')}
+        conflicts = []
+        resources = [('SALLE', exam['salle_id']), ('PROFESSEUR', exam['professeur_id'])]
+        resources += [('ETUDIANT', student_id) for student_id in students]
+        for kind, entity in resources:
+            for other_id in self.overlapping(kind, entity, start, end, ignore):
+                conflicts.append({'type_conflit': kind, 'entite_id': entity, 'examen': other_id})
+        return conflicts
+
+    def move(self, exam, new_start: datetime, students=()):
+        """Déplace un examen indexé (mêmes salle et surveillant) vers new_start"""
+        old_start = to_minutes(exam['date_heure'])
+        for kind, entity in [('SALLE', exam['salle_id']), ('PROFESSEUR', exam['professeur_id'])] + \
+                            [('ETUDIANT', student_id) for student_id in students]:
+            if self.remove(kind, entity, old_start, exam['id']):
+                start = to_minutes(new_start)
+                self.add(kind, entity, start, start + int(exam['duree_minutes']), exam['id'])
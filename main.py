@@ -9,6 +9,7 @@ from vice_doyen import vice_doyen_dashboard
 from chef_departement import render_department_head_dashboard
 from etudiant import render_student_dashboard
 from professeur import render_professor_dashboard
+from stats_refresh import start_refresh_timer
 
 st.set_page_config(
     page_title="🎓 Plateforme Examens Universitaires",
@@ -18,6 +19,7 @@ st.set_page_config(
 )
 
 inject_premium_ui()
+start_refresh_timer()
 
 # ========================
 # PAGE LOGIN
@@ -92,7 +92,7 @@ def get_professor_dashboard_data(prof_id: int):
         COALESCE(l.capacite, 0) as capacite,
         COALESCE(l.type, 'Non spécifié') as type_salle,
         COALESCE(l.batiment, 'Non spécifié') as batiment,
-        COALESCE(COUNT(DISTINCT ins.etudiant_id), 0) as nb_etudiants_inscrits,
+        COALESCE(s.nb_inscrits, 0) as nb_etudiants_inscrits,
         CONCAT(COALESCE(p.nom, ''), ' ', COALESCE(p.prenom, '')) as professeur_nom,
         COALESCE(d.nom, 'Non spécifié') as departement_nom
     FROM examens e
@@ -101,15 +101,14 @@ def get_professor_dashboard_data(prof_id: int):
     JOIN departements d ON f.departement_id = d.id
     JOIN lieux_examen l ON e.salle_id = l.id
     JOIN professeurs p ON e.professeur_id = p.id
-    LEFT JOIN inscriptions ins ON m.id = ins.module_id 
-        AND ins.annee_academique = EXTRACT(YEAR FROM CURRENT_DATE)
-        AND ins.statut = 'Inscrit'
+    LEFT JOIN v_inscrits_module s ON s.module_id = m.id
+        AND s.session = session_examen(e.type_examen)
     WHERE e.professeur_id = %s
         AND e.date_heure >= CURRENT_DATE
         AND e.statut IN ('Planifie', 'Confirme')
     GROUP BY e.id, e.date_heure, e.duree_minutes, e.statut, 
              m.nom, m.code, f.nom, f.code, l.nom, l.capacite, 
-             l.type, l.batiment, p.nom, p.prenom, d.nom
+             l.type, l.batiment, p.nom, p.prenom, d.nom, s.nb_inscrits
     ORDER BY e.date_heure
     """
     return execute_query(query, (prof_id,))
@@ -6,6 +6,9 @@ from typing import Optional, List, Dict, Any
 import pandas as pd
 from datetime import datetime, date
 from connection import execute_query, load_dataframe
+from exam_optimizer import build_schedule, DEFAULT_TIME_BUDGET
+from interval_overlap import OverlapIndex, RESOURCE_KINDS, exam_intervals, find_overlaps
+from stats_refresh import request_refresh
 
 
 class ExamQueries:
@@ -15,7 +18,6 @@ class ExamQueries:
     def get_student_exams(student_id: int, start_date: date = None, end_date: date = None) -> List[Dict]:
         """
         Récupère les examens d'un étudiant
-        Note : statut avec accents ('Planifié', 'Confirmé') pour correspondre à la base
         """
         query = """
         SELECT 
@@ -35,8 +37,8 @@ class ExamQueries:
             e.date_heure + (e.duree_minutes || ' minutes')::INTERVAL as date_fin,
             e.type_examen,
             e.statut,
-            COUNT(i.etudiant_id) as nb_etudiants_inscrits,
-            ROUND((COUNT(i.etudiant_id)::DECIMAL / l.capacite) * 100, 2) as taux_occupation
+            COALESCE(s.nb_inscrits, 0) as nb_etudiants_inscrits,
+            ROUND((COALESCE(s.nb_inscrits, 0)::DECIMAL / l.capacite) * 100, 2) as taux_occupation
         FROM examens e
         JOIN modules m ON e.module_id = m.id
         JOIN formations f ON m.formation_id = f.id
@@ -44,13 +46,15 @@ class ExamQueries:
         JOIN professeurs p ON e.professeur_id = p.id
         JOIN lieux_examen l ON e.salle_id = l.id
         JOIN inscriptions i ON e.module_id = i.module_id AND i.statut = 'Inscrit'
+        LEFT JOIN v_inscrits_module s ON s.module_id = e.module_id
+            AND s.session = session_examen(e.type_examen)
         WHERE i.etudiant_id = %s
-            AND e.statut IN ('Planifié', 'Confirmé')
+            AND e.statut IN ('Planifie', 'Confirme')
             AND (%s IS NULL OR e.date_heure >= %s)
             AND (%s IS NULL OR e.date_heure <= %s)
         GROUP BY e.id, e.uuid, m.code, m.nom, f.nom, d.nom, p.nom, p.prenom, 
                  l.nom, l.type, l.batiment, l.capacite, e.date_heure, 
-                 e.duree_minutes, e.type_examen, e.statut
+                 e.duree_minutes, e.type_examen, e.statut, s.nb_inscrits
         ORDER BY e.date_heure
         """
         return execute_query(query, (student_id, start_date, start_date, end_date, end_date)) or []
@@ -81,7 +85,7 @@ class ExamQueries:
             LEFT JOIN inscriptions i ON e.module_id = i.module_id AND i.statut = 'Inscrit'
             WHERE e.professeur_id = %s
                 AND e.date_heure BETWEEN CURRENT_TIMESTAMP AND CURRENT_TIMESTAMP + %s * INTERVAL '1 day'
-                AND e.statut IN ('Planifié', 'Confirmé')
+                AND e.statut IN ('Planifie', 'Confirme')
             GROUP BY e.id, m.nom, f.nom, l.nom, l.capacite, e.date_heure, 
                      e.duree_minutes, e.type_examen, e.statut
             ORDER BY e.date_heure
@@ -130,7 +134,7 @@ class ExamQueries:
             WHERE f.departement_id = %s
                 AND e.date_heure >= %s
                 AND e.date_heure <= %s
-                AND e.statut IN ('Planifié', 'Confirmé')
+                AND e.statut IN ('Planifie', 'Confirme')
             GROUP BY e.id, e.uuid, m.code, m.nom, f.code, f.nom, p.nom, p.prenom, 
                      p.grade, l.nom, l.type, l.capacite, e.date_heure, 
                      e.duree_minutes, e.type_examen, e.statut
@@ -151,8 +155,8 @@ class ExamQueries:
                 p.specialite,
                 d.nom as departement,
                 (SELECT COUNT(*) FROM modules WHERE responsable_id = p.id) as modules_responsables,
-                (SELECT COUNT(*) FROM examens WHERE professeur_id = p.id AND statut IN ('Planifié', 'Confirmé') AND date_heure > CURRENT_TIMESTAMP) as examens_a_venir,
-                (SELECT COUNT(*) FROM examens WHERE professeur_id = p.id AND statut = 'Terminé') as examens_termines
+                (SELECT COUNT(*) FROM examens WHERE professeur_id = p.id AND statut IN ('Planifie', 'Confirme') AND date_heure > CURRENT_TIMESTAMP) as examens_a_venir,
+                (SELECT COUNT(*) FROM examens WHERE professeur_id = p.id AND statut = 'Termine') as examens_termines
             FROM professeurs p
             JOIN departements d ON p.departement_id = d.id
             WHERE p.id = %s
@@ -200,7 +204,8 @@ class AnalyticsQueries:
                 nb_examens_termines,
                 capacite_moyenne_salles,
                 dernier_examen,
-                premier_examen
+                premier_examen,
+                rafraichi_le
             FROM v_stats_departement
             WHERE departement_id = %s
         """
@@ -208,21 +213,16 @@ class AnalyticsQueries:
         return result[0] if result else {}
     
     @staticmethod
-    def get_conflicts_report(department_id: int) -> pd.DataFrame:
+    def get_conflicts_report(department_id: int = None, formation_id: int = None,
+                             start_date: date = None, end_date: date = None) -> pd.DataFrame:
         """
-        Génère un rapport détaillé des conflits pour un département
-        Note: La fonction detecter_conflits() retourne tous les conflits.
-        Pour filtrer par département, on vérifie si le département est mentionné dans les détails.
+        Rapport des conflits d'un périmètre (département, formation, période)
+        Le filtre est appliqué en base (detecter_conflits_perimetre): seules les lignes du périmètre sont lues
+        Colonnes: type_conflit, severite, cle_type, entite_id, jour, nb, examens, details
         """
-        # Récupérer tous les conflits puis filtrer manuellement par département
         query = """
-            SELECT 
-                type_conflit,
-                details,
-                severite,
-                COUNT(*) as nombre
-            FROM detecter_conflits()
-            GROUP BY type_conflit, details, severite
+            SELECT *
+            FROM detecter_conflits_perimetre(%s, %s, %s, %s)
             ORDER BY 
                 CASE severite 
                     WHEN 'CRITIQUE' THEN 1
@@ -230,25 +230,10 @@ class AnalyticsQueries:
                     WHEN 'MOYEN' THEN 3
                     ELSE 4
                 END,
-                nombre DESC
-        """
-        result = load_dataframe(query)
-        if not result.empty and department_id and 'details' in result.columns:
-            # Filtrer par département si spécifié (recherche dans les détails)
-            try:
-                dept_query = """
-                    SELECT nom FROM departements WHERE id = %s
-                """
-                dept_result = execute_query(dept_query, (department_id,))
-                if dept_result:
-                    dept_nom = dept_result[0].get('nom', '')
-                    if dept_nom:
-                        # Filtrer les lignes qui mentionnent le département dans les détails
-                        result = result[result['details'].astype(str).str.contains(dept_nom, case=False, na=False)]
-            except Exception:
-                # Si erreur lors du filtrage, retourner tous les conflits
-                pass
-        return result if not result.empty else pd.DataFrame()
+                jour,
+                nb DESC
+        """
+        return load_dataframe(query, (department_id, formation_id, start_date, end_date))
     
     @staticmethod
     def get_resource_utilization(start_date: date, end_date: date) -> pd.DataFrame:
@@ -263,18 +248,18 @@ class AnalyticsQueries:
                 COUNT(e.id) as nb_examens,
                 SUM(e.duree_minutes) as total_minutes,
                 COALESCE(ROUND(AVG(
-                    (SELECT COUNT(DISTINCT i.etudiant_id) 
-                     FROM inscriptions i 
-                     WHERE i.module_id = e.module_id AND i.statut = 'Inscrit')::DECIMAL / l.capacite * 100
+                    COALESCE(s.nb_inscrits, 0)::DECIMAL / l.capacite * 100
                 ), 2), 0) as taux_occupation_moyen,
                 ROUND(COUNT(e.id) * 100.0 / 
                     NULLIF((SELECT COUNT(*) FROM examens 
                      WHERE date_heure BETWEEN %s AND %s 
-                     AND statut IN ('Planifié', 'Confirmé')), 0), 2) as pourcentage_utilisation
+                     AND statut IN ('Planifie', 'Confirme')), 0), 2) as pourcentage_utilisation
             FROM lieux_examen l
             LEFT JOIN examens e ON l.id = e.salle_id 
                 AND e.date_heure BETWEEN %s AND %s
-                AND e.statut IN ('Planifié', 'Confirmé')
+                AND e.statut IN ('Planifie', 'Confirme')
+            LEFT JOIN v_inscrits_module s ON s.module_id = e.module_id
+                AND s.session = session_examen(e.type_examen)
             GROUP BY l.id, l.nom, l.type, l.capacite
             ORDER BY pourcentage_utilisation DESC NULLS LAST
         """
@@ -291,12 +276,7 @@ class AnalyticsQueries:
                 DATE(e.date_heure) as jour,
                 COUNT(DISTINCT e.id) as nb_examens,
                 COUNT(DISTINCT i.etudiant_id) as nb_etudiants_convoques,
-                ROUND(AVG(
-                    (SELECT COUNT(*) 
-                     FROM inscriptions i2 
-                     WHERE i2.module_id = e.module_id 
-                     AND i2.statut = 'Inscrit')
-                ), 2) as moyenne_etudiants_par_examen,
+                ROUND(AVG(COALESCE(s.nb_inscrits, 0)), 2) as moyenne_etudiants_par_examen,
                 CASE 
                     WHEN COUNT(DISTINCT i.etudiant_id) > 1000 THEN 'Surcharge'
                     WHEN COUNT(DISTINCT i.etudiant_id) > 500 THEN 'Charge élevée'
@@ -306,9 +286,11 @@ class AnalyticsQueries:
             JOIN modules m ON e.module_id = m.id
             JOIN formations f ON m.formation_id = f.id
             JOIN inscriptions i ON e.module_id = i.module_id AND i.statut = 'Inscrit'
+            LEFT JOIN v_inscrits_module s ON s.module_id = e.module_id
+                AND s.session = session_examen(e.type_examen)
             WHERE f.departement_id = %s
                 AND e.date_heure >= CURRENT_DATE
-                AND e.statut IN ('Planifié', 'Confirmé')
+                AND e.statut IN ('Planifie', 'Confirme')
             GROUP BY DATE(e.date_heure)
             ORDER BY jour
         """
@@ -320,28 +302,22 @@ class OptimizationQueries:
     """Requêtes pour l'optimisation automatique"""
     
     @staticmethod
-    def generate_optimized_schedule(start_date: date, end_date: date, department_id: int = None) -> pd.DataFrame:
-        """
-        Génère un planning optimisé en utilisant la fonction PL/pgSQL
-        """
-        if department_id:
-            query = """
-                SELECT * FROM generer_planning_optimise(%s, %s) gpo
-                WHERE EXISTS (
-                    SELECT 1 FROM modules m
-                    JOIN formations f ON m.formation_id = f.id
-                    WHERE m.id = gpo.module_id
-                    AND f.departement_id = %s
-                )
-                ORDER BY score_optimisation DESC
-            """
-            params = (start_date, end_date, department_id)
-        else:
-            query = "SELECT * FROM generer_planning_optimise(%s, %s) ORDER BY score_optimisation DESC"
-            params = (start_date, end_date)
-        
-        result = load_dataframe(query, params)
-        return result if not result.empty else pd.DataFrame()
+    def generate_optimized_schedule(start_date: date, end_date: date, department_id: int = None,
+                                    construction: str = 'glouton', improvement: str = 'aucune',
+                                    time_budget: float = DEFAULT_TIME_BUDGET) -> pd.DataFrame:
+        """
+        Génère un planning optimisé avec le moteur Python (exam_optimizer):
+        modules réellement inscrits sur la période, placés puis évalués
+        Une ligne par examen-salle, triée par score_optimisation décroissant
+        """
+        optimizer = build_schedule(
+            start_date, end_date, department_id,
+            construction=construction,
+            improvement=improvement,
+            time_budget=time_budget
+        )
+        result = optimizer.schedule_dataframe()
+        return result.sort_values('score_optimisation', ascending=False, ignore_index=True)
     
    
     
@@ -377,6 +353,90 @@ class OptimizationQueries:
             print(f"Erreur dans detect_all_conflicts: {e}")
             # Retourner un DataFrame vide au lieu d'un dict
             return pd.DataFrame()
+    
+    @staticmethod
+    def count_active_conflicts() -> int:
+        """Nombre de conflits ouverts, lu dans le registre conflits_examens (maintenu par triggers)"""
+        result = execute_query("SELECT nb_conflits_actifs() AS nb")
+        return int(result[0]['nb']) if result else 0
+    
+    @staticmethod
+    def get_conflicts_page(page_size: int = 100, cursor: tuple = None, severity: str = None):
+        """
+        Une page de conflits ouverts (pagination par curseur, ordre sévérité > jour > id)
+        cursor: (rang, jour, id) de la dernière ligne de la page précédente, None pour la première page
+        Retourne (page, curseur de la page suivante ou None)
+        """
+        rank, day, conflict_id = cursor or (None, None, None)
+        # Une ligne de plus que la page: indique s'il reste des conflits sans les compter
+        page = load_dataframe("""
+            SELECT * FROM conflits_page(%s, %s, %s, %s, %s)
+        """, (page_size + 1, severity, rank, day, conflict_id))
+        if page.empty:
+            return page, None
+        if len(page) <= page_size:
+            return page, None
+        page = page.iloc[:page_size]
+        last = page.iloc[-1]
+        return page, (int(last['rang']), last['jour'], int(last['id']))
+    
+    @staticmethod
+    def get_conflicts_summary(severity: str = None) -> pd.DataFrame:
+        """Conflits ouverts par sévérité et type (agrégés en SQL)"""
+        return load_dataframe("SELECT * FROM resume_conflits(%s)", (severity,))
+    
+    @staticmethod
+    def get_conflicts_by_day(severity: str = None) -> pd.DataFrame:
+        """Conflits ouverts par jour et sévérité (agrégés en SQL)"""
+        return load_dataframe("SELECT * FROM resume_conflits_par_jour(%s)", (severity,))
+    
+    @staticmethod
+    def load_planning_intervals(start_date: date = None, end_date: date = None):
+        """
+        Examens actifs (Planifie/Confirme) de la période et inscrits de leurs modules
+        Retourne (examens, {module_id: [etudiant_id]}) au format de interval_overlap
+        """
+        exams = execute_query("""
+            SELECT id, module_id, salle_id, professeur_id, date_heure, duree_minutes
+            FROM examens
+            WHERE statut IN ('Planifie', 'Confirme')
+            AND (%s::date IS NULL OR date_heure >= %s::date)
+            AND (%s::date IS NULL OR date_heure < %s::date + 1)
+        """, (start_date, start_date, end_date, end_date)) or []
+        module_ids = list({exam['module_id'] for exam in exams})
+        rows = execute_query("""
+            SELECT module_id, ARRAY_AGG(etudiant_id) AS etudiants
+            FROM inscriptions
+            WHERE statut = 'Inscrit' AND module_id = ANY(%s)
+            GROUP BY module_id
+        """, (module_ids,)) if module_ids else []
+        enrolments = {row['module_id']: row['etudiants'] for row in rows or []}
+        return exams, enrolments
+    
+    @staticmethod
+    def detect_time_overlaps(start_date: date = None, end_date: date = None) -> pd.DataFrame:
+        """
+        Chevauchements horaires réels (salle, surveillant, étudiant) sur tout le planning actif:
+        un tri et un balayage des intervalles au lieu d'une comparaison deux à deux
+        """
+        exams, enrolments = OptimizationQueries.load_planning_intervals(start_date, end_date)
+        overlaps = find_overlaps(exam_intervals(exams, enrolments))
+        columns = ['type_conflit', 'description', 'entite_id', 'examen_a', 'examen_b', 'debut', 'fin']
+        if not overlaps:
+            return pd.DataFrame(columns=columns)
+        result = pd.DataFrame(overlaps)
+        result['description'] = result['type_conflit'].map(RESOURCE_KINDS)
+        return result[columns].sort_values(['debut', 'type_conflit'], ignore_index=True)
+    
+    @staticmethod
+    def build_overlap_index(start_date: date = None, end_date: date = None):
+        """
+        Index des occupations pour contrôler un examen inséré ou déplacé en O(log n)
+        Retourne (index, {examen_id: examen}, {module_id: [etudiant_id]})
+        """
+        exams, enrolments = OptimizationQueries.load_planning_intervals(start_date, end_date)
+        return OverlapIndex.from_exams(exams, enrolments), {exam['id']: exam for exam in exams}, enrolments
+    
     @staticmethod
     def get_available_resources(date_filter: date) -> Dict[str, List]:
         """
@@ -391,7 +451,7 @@ class OptimizationQueries:
                 SELECT 1 FROM examens e
                 WHERE e.salle_id = l.id
                 AND DATE(e.date_heure) = %s
-                AND e.statut IN ('Planifié', 'Confirmé')
+                AND e.statut IN ('Planifie', 'Confirme')
             )
             ORDER BY l.capacite DESC
         """
@@ -509,7 +569,7 @@ class UserQueries:
                 LEFT JOIN inscriptions i ON e.id = i.etudiant_id AND i.statut = 'Inscrit'
                 LEFT JOIN examens ex ON i.module_id = ex.module_id 
                     AND ex.date_heure > CURRENT_TIMESTAMP
-                    AND ex.statut IN ('Planifié', 'Confirmé')
+                    AND ex.statut IN ('Planifie', 'Confirme')
                 WHERE e.id = %s
                 GROUP BY e.id, f.nom, d.nom
             """
@@ -531,7 +591,7 @@ class UserQueries:
                 JOIN departements d ON p.departement_id = d.id
                 LEFT JOIN examens ex ON p.id = ex.professeur_id 
                     AND ex.date_heure > CURRENT_TIMESTAMP
-                    AND ex.statut IN ('Planifié', 'Confirmé')
+                    AND ex.statut IN ('Planifie', 'Confirme')
                 LEFT JOIN modules m ON p.id = m.responsable_id
                 WHERE p.id = %s
                 GROUP BY p.id, d.nom
@@ -604,8 +664,8 @@ class UserQueries:
                 d.nom as departement_nom,
                 d.code as departement_code,
                 (SELECT COUNT(*) FROM modules WHERE responsable_id = p.id) as nb_modules_responsables,
-                (SELECT COUNT(*) FROM examens WHERE professeur_id = p.id AND date_heure > CURRENT_TIMESTAMP AND statut IN ('Planifié', 'Confirmé')) as nb_examens_a_venir,
-                (SELECT COUNT(*) FROM examens WHERE professeur_id = p.id AND statut = 'Terminé') as nb_examens_termines,
+                (SELECT COUNT(*) FROM examens WHERE professeur_id = p.id AND date_heure > CURRENT_TIMESTAMP AND statut IN ('Planifie', 'Confirme')) as nb_examens_a_venir,
+                (SELECT COUNT(*) FROM examens WHERE professeur_id = p.id AND statut = 'Termine') as nb_examens_termines,
                 (SELECT COALESCE(SUM(duree_minutes), 0) FROM examens WHERE professeur_id = p.id AND date_heure >= CURRENT_DATE - INTERVAL '30 days') as minutes_30j,
                 (SELECT COALESCE(SUM(nb_etudiants), 0) FROM (
                     SELECT COUNT(DISTINCT i.etudiant_id) as nb_etudiants
@@ -790,7 +850,7 @@ def get_occupation_salles() -> pd.DataFrame:
 def get_stats_departement() -> pd.DataFrame:
     """
     Récupère les statistiques par département
-    Utilise la vue v_stats_departement de la BDD
+    Utilise la vue matérialisée v_stats_departement de la BDD (voir get_stats_departement_freshness)
     """
     query = """
         SELECT 
@@ -810,11 +870,19 @@ def get_stats_departement() -> pd.DataFrame:
     return pd.DataFrame()
 
 
-def generer_planning_optimise(date_debut: date, date_fin: date) -> pd.DataFrame:
+def get_stats_departement_freshness():
+    """
+    Date du dernier rafraîchissement de v_stats_departement (vue matérialisée), None si inconnue
+    """
+    result = execute_query("SELECT MAX(rafraichi_le) AS rafraichi_le FROM v_stats_departement")
+    return result[0]['rafraichi_le'] if result else None
+
+
+def generer_planning_optimise(date_debut: date, date_fin: date, department_id: int = None) -> pd.DataFrame:
     """
-    Génère un planning optimisé en utilisant la fonction PL/pgSQL
+    Génère un planning optimisé (moteur Python, voir OptimizationQueries.generate_optimized_schedule)
     """
-    return OptimizationQueries.generate_optimized_schedule(date_debut, date_fin)
+    return OptimizationQueries.generate_optimized_schedule(date_debut, date_fin, department_id)
 
 
 def detecter_tous_les_conflits() -> pd.DataFrame:
@@ -824,6 +892,20 @@ def detecter_tous_les_conflits() -> pd.DataFrame:
     return OptimizationQueries.detect_all_conflicts()
 
 
+def compter_conflits_actifs() -> int:
+    """
+    Nombre de conflits ouverts (indicateurs des tableaux de bord)
+    """
+    return OptimizationQueries.count_active_conflicts()
+
+
+def detecter_chevauchements(date_debut: date = None, date_fin: date = None) -> pd.DataFrame:
+    """
+    Chevauchements horaires entre examens (salles, surveillants, étudiants)
+    """
+    return OptimizationQueries.detect_time_overlaps(date_debut, date_fin)
+
+
 def get_planning_examens() -> pd.DataFrame:
     """
     Récupère le planning complet des examens
@@ -847,7 +929,7 @@ def get_planning_examens() -> pd.DataFrame:
             statut,
             etudiants_inscrits as nb_etudiants_inscrits
         FROM v_planning_examens
-        WHERE statut IN ('Planifié', 'Confirmé')
+        WHERE statut IN ('Planifie', 'Confirme')
         ORDER BY date_heure
     """
     result = execute_query(query)
@@ -861,16 +943,18 @@ def get_planning_examens() -> pd.DataFrame:
 
 def valider_examen(examen_id: int) -> bool:
     """
-    Valide un examen (passe le statut à 'Confirmé')
+    Valide un examen (passe le statut à 'Confirme', valeur sans accent de la contrainte CHECK)
     """
     try:
         query = """
             UPDATE examens 
-            SET statut = 'Confirmé'
-            WHERE id = %s AND statut = 'Planifié'
+            SET statut = 'Confirme'
+            WHERE id = %s AND statut = 'Planifie'
             RETURNING id
         """
         result = execute_query(query, (examen_id,), fetch=True)
+        if result:
+            request_refresh()
         return len(result) > 0 if result else False
     except Exception as e:
         print(f"Erreur dans valider_examen: {e}")
@@ -879,15 +963,17 @@ def valider_examen(examen_id: int) -> bool:
 
 def valider_tout_le_planning() -> bool:
     """
-    Valide tout le planning (passe tous les examens planifiés à 'Confirmé')
+    Valide tout le planning (passe tous les examens 'Planifie' à 'Confirme', valeurs de la contrainte CHECK)
     """
     try:
         query = """
             UPDATE examens 
-            SET statut = 'Confirmé'
-            WHERE statut = 'Planifié'
+            SET statut = 'Confirme'
+            WHERE statut = 'Planifie'
         """
         result = execute_query(query, fetch=False)
+        if result > 0:
+            request_refresh()
         return result > 0
     except Exception as e:
         print(f"Erreur dans valider_tout_le_planning: {e}")
@@ -0,0 +1,88 @@
+"""
+Bornes inférieures rapides pour évaluer un planning généré
+- clique du graphe des conflits étudiants: nombre minimum de jours d'examens
+- sièges demandés / capacité des salles: nombre minimum de créneaux et de salles
+"""
+import math
+
+import numpy as np
+
+
+def conflict_adjacency(module_students) -> np.ndarray:
+    """
+    Graphe des conflits étudiants: modules x modules, vrai si au moins un étudiant commun
+    module_students: liste de tableaux d'indices étudiants, un par module
+    """
+    n = len(module_students)
+    adjacency = np.zeros((n, n), dtype=bool)
+    counts = np.array([len(students) for students in module_students], dtype=np.int64)
+    if n == 0 or counts.sum() == 0:
+        return adjacency
+
+    students = np.concatenate([np.asarray(s, dtype=np.int64) for s in module_students])
+    modules = np.repeat(np.arange(n), counts)
+    order = np.lexsort((modules, students))
+    students, modules = students[order], modules[order]
+
+    # Un groupe de modules par étudiant; les étudiants d'une même promotion partagent le même groupe
+    starts = np.flatnonzero(np.r_[True, students[1:] != students[:-1]])
+    groups = {group.tobytes(): group for group in np.split(modules, starts[1:]) if len(group) > 1}
+    for group in groups.values():
+        adjacency[np.ix_(group, group)] = True
+
+    np.fill_diagonal(adjacency, False)
+    return adjacency
+
+
+def greedy_max_clique(adjacency: np.ndarray, tries: int = 20) -> list:
+    """
+    Grande clique par construction gloutonne depuis les sommets de plus fort degré
+    Toute clique est une borne valide: ses modules doivent avoir lieu des jours distincts
+    """
+    if not len(adjacency):
+        return []
+
+    degree = adjacency.sum(axis=1)
+    best = [int(np.argmax(degree))]
+    for seed in np.argsort(-degree, kind='stable')[:tries]:
+        clique = [int(seed)]
+        candidates = adjacency[seed].copy()
+        while candidates.any():
+            pool = np.flatnonzero(candidates)
+            # Le candidat le plus connecté aux autres candidats garde le plus d'options ouvertes
+            vertex = int(pool[np.argmax(adjacency[np.ix_(pool, pool)].sum(axis=1))])
+            clique.append(vertex)
+            candidates &= adjacency[vertex]
+        if len(clique) > len(best):
+            best = clique
+    return best
+
+
+def seat_bounds(student_counts, slot_spans, capacities):
+    """
+    Bornes issues des capacités:
+    - créneaux minimum pour asseoir tous les étudiants si toutes les salles étaient pleines
+    - nombre minimum d'examens-salles (un module dépassant la plus grande salle est réparti)
+    """
+    student_counts = np.asarray(student_counts, dtype=np.int64)
+    slot_spans = np.asarray(slot_spans, dtype=np.int64)
+    capacities = np.asarray(capacities, dtype=np.int64)
+    total_capacity = int(capacities.sum())
+    largest = int(capacities.max()) if len(capacities) else 0
+
+    seat_slots = int((student_counts * slot_spans).sum())
+    min_slots = math.ceil(seat_slots / total_capacity) if total_capacity else 0
+    min_rooms = int(np.ceil(student_counts / largest).sum()) if largest else 0
+    return {
+        'sieges_creneaux': seat_slots,
+        'capacite_par_creneau': total_capacity,
+        'creneaux_min': min_slots,
+        'salles_min': min_rooms
+    }
+
+
+def gap_percent(found, bound):
+    """Écart relatif entre la valeur obtenue et la borne (en %)"""
+    if not bound:
+        return 0.0
+    return round(100.0 * (found - bound) / bound, 1)
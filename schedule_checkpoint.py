@@ -0,0 +1,108 @@
+"""
+Points de reprise des générations de planning
+Format binaire compact (npz compressé): tableaux des affectations + métadonnées JSON
+Pendant l'amélioration, le meilleur planning rencontré est enregistré à côté du planning courant
+"""
+import glob
+import json
+import os
+from datetime import datetime, date
+
+import numpy as np
+
+CHECKPOINT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "checkpoints")
+
+CHECKPOINT_VERSION = 2
+
+
+def new_checkpoint_path(start_date: date, end_date: date, department_id=None) -> str:
+    """Chemin du point de reprise d'une nouvelle exécution"""
+    os.makedirs(CHECKPOINT_DIR, exist_ok=True)
+    name = "generation_{}_{}_{}_{}.npz".format(
+        start_date.isoformat(),
+        end_date.isoformat(),
+        department_id if department_id is not None else "all",
+        datetime.now().strftime("%Y%m%d%H%M%S")
+    )
+    return os.path.join(CHECKPOINT_DIR, name)
+
+
+def _schedule_arrays(schedule: list, prefix: str = '') -> dict:
+    """Colonnes d'un planning, une ligne par examen placé"""
+    return {
+        prefix + 'module_id': np.array([e['module_id'] for e in schedule], dtype=np.int32),
+        prefix + 'room_id': np.array([e['room_id'] for e in schedule], dtype=np.int32),
+        prefix + 'professor_id': np.array([e['professor_id'] for e in schedule], dtype=np.int32),
+        prefix + 'exam_time': np.array([e['exam_time'] for e in schedule], dtype='datetime64[m]'),
+        prefix + 'duration_minutes': np.array([e['duration_minutes'] for e in schedule], dtype=np.int16),
+        prefix + 'student_count': np.array([e['student_count'] for e in schedule], dtype=np.int32),
+        prefix + 'part_index': np.array([e.get('part_index') or 0 for e in schedule], dtype=np.int16),
+        prefix + 'part_count': np.array([e.get('part_count') or 0 for e in schedule], dtype=np.int16),
+        prefix + 'split_group': np.array([e.get('split_group') or '' for e in schedule], dtype='U36'),
+    }
+
+
+def _schedule_from_arrays(columns: dict) -> list:
+    """Inverse de _schedule_arrays (colonnes sans préfixe)"""
+    schedule = []
+    for i in range(len(columns['module_id'])):
+        exam = {
+            'module_id': int(columns['module_id'][i]),
+            'room_id': int(columns['room_id'][i]),
+            'professor_id': int(columns['professor_id'][i]),
+            'exam_time': columns['exam_time'][i].astype(datetime),
+            'duration_minutes': int(columns['duration_minutes'][i]),
+            'student_count': int(columns['student_count'][i]),
+        }
+        if columns['split_group'][i]:
+            exam.update({
+                'split_group': str(columns['split_group'][i]),
+                'part_index': int(columns['part_index'][i]),
+                'part_count': int(columns['part_count'][i]),
+            })
+        schedule.append(exam)
+    return schedule
+
+
+def write_checkpoint(path: str, meta: dict, schedule: list, best_schedule: list = None):
+    """
+    Écrit l'état d'une génération: une ligne par examen placé
+    best_schedule: meilleur planning de l'amélioration s'il diffère du planning courant (recuit)
+    L'écriture passe par un fichier temporaire pour ne jamais laisser un point de reprise tronqué
+    """
+    arrays = _schedule_arrays(schedule)
+    if best_schedule is not None:
+        arrays.update(_schedule_arrays(best_schedule, prefix='best_'))
+    meta = dict(meta, version=CHECKPOINT_VERSION, saved_at=datetime.now().isoformat())
+
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'wb') as f:
+        np.savez_compressed(f, meta=np.array(json.dumps(meta, default=str)), **arrays)
+    os.replace(tmp_path, path)
+
+
+def read_checkpoint(path: str):
+    """
+    Relit un point de reprise: (métadonnées, liste d'examens au format du planning généré)
+    Le meilleur planning éventuel est rendu dans meta['meilleur_planning']
+    """
+    with np.load(path) as data:
+        meta = json.loads(str(data['meta']))
+        columns = {key: data[key] for key in data.files if key != 'meta'}
+
+    best = {key[len('best_'):]: value for key, value in columns.items() if key.startswith('best_')}
+    if best:
+        meta['meilleur_planning'] = _schedule_from_arrays(best)
+    return meta, _schedule_from_arrays({key: value for key, value in columns.items() if not key.startswith('best_')})
+
+
+def list_checkpoints():
+    """Points de reprise disponibles, du plus récent au plus ancien"""
+    paths = glob.glob(os.path.join(CHECKPOINT_DIR, "generation_*.npz"))
+    return sorted(paths, key=os.path.getmtime, reverse=True)
+
+
+def delete_checkpoint(path: str):
+    """Supprime un point de reprise devenu inutile (planning enregistré)"""
+    if path and os.path.exists(path):
+        os.remove(path)
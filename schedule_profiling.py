@@ -0,0 +1,169 @@
+"""
+Profilage optionnel d'une génération d'emploi du temps
+Chronos par phase, compteurs de l'algorithme (créneaux et salles sondés, déplacements évalués/gardés)
+et, au choix, capture cProfile (déterministe) ou par échantillonnage de la pile (faible surcoût)
+Le rapport est exportable en JSON; la capture cProfile au format .prof (pstats, snakeviz)
+"""
+import cProfile
+import json
+import marshal
+import os
+import pstats
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+PROFILING_MODES = {
+    'aucun': "Désactivé",
+    'compteurs': "Chronos et compteurs",
+    'echantillonnage': "Échantillonnage de la pile",
+    'cprofile': "cProfile (détaillé, plus lent)",
+}
+
+# Libellés des compteurs incrémentés par ExamScheduleOptimizer
+COUNTER_LABELS = {
+    'sondages_creneaux': "Créneaux sondés",
+    'sondages_salles': "Recherches de salles",
+    'sondages_surveillants': "Recherches de surveillants",
+    'modules_places': "Modules placés",
+    'modules_decoupes': "Modules répartis sur plusieurs salles",
+    'mouvements_evalues': "Déplacements évalués",
+    'mouvements_acceptes': "Déplacements gardés",
+    'evaluations_score': "Évaluations du score",
+}
+
+
+class _StackSampler(threading.Thread):
+    """Relève périodiquement la pile d'un thread (fonction en cours et fonctions englobantes)"""
+
+    def __init__(self, target_thread_id, interval, own, cumulative):
+        super().__init__(daemon=True)
+        self.target_thread_id = target_thread_id
+        self.interval = interval
+        self.own = own
+        self.cumulative = cumulative
+        self.samples = 0
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            frame = sys._current_frames().get(self.target_thread_id)
+            if frame is None:
+                continue
+            self.samples += 1
+            self.own[_frame_key(frame)] = self.own.get(_frame_key(frame), 0) + 1
+            seen = set()
+            while frame is not None:
+                key = _frame_key(frame)
+                if key not in seen:
+                    seen.add(key)
+                    self.cumulative[key] = self.cumulative.get(key, 0) + 1
+                frame = frame.f_back
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+
+def _frame_key(frame):
+    code = frame.f_code
+    return os.path.basename(code.co_filename), code.co_firstlineno, code.co_name
+
+
+def _function_label(key):
+    filename, line, name = key
+    return f"{filename}:{line}({name})"
+
+
+class GenerationProfiler:
+    """
+    Mesures d'une génération; mode parmi PROFILING_MODES
+    Les captures sont cumulées sur toutes les phases mesurées (capture() peut être rappelé)
+    """
+
+    def __init__(self, mode: str = 'compteurs', interval: float = 0.005, top: int = 30):
+        if mode not in PROFILING_MODES:
+            raise ValueError(f"Mode de profilage inconnu: {mode}")
+        self.mode = mode
+        self.interval = interval
+        self.top = top
+        self.counters = dict.fromkeys(COUNTER_LABELS, 0)
+        self.captured_time = 0.0
+        self._profiler = cProfile.Profile() if mode == 'cprofile' else None
+        self._own_samples = {}
+        self._cumulative_samples = {}
+        self._samples = 0
+
+    def count(self, name: str, n: int = 1):
+        """Incrémente un compteur"""
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    @contextmanager
+    def capture(self):
+        """Capture cProfile ou échantillonnage du thread courant pendant le bloc"""
+        start = time.perf_counter()
+        sampler = None
+        if self._profiler is not None:
+            self._profiler.enable()
+        elif self.mode == 'echantillonnage':
+            sampler = _StackSampler(threading.get_ident(), self.interval, self._own_samples, self._cumulative_samples)
+            sampler.start()
+        try:
+            yield
+        finally:
+            if self._profiler is not None:
+                self._profiler.disable()
+            if sampler is not None:
+                sampler.stop()
+                self._samples += sampler.samples
+            self.captured_time += time.perf_counter() - start
+
+    def hotspots(self) -> list:
+        """Fonctions les plus coûteuses (temps propre décroissant), selon la capture du mode"""
+        rows = []
+        if self._profiler is not None:
+            stats = pstats.Stats(self._profiler).stats
+            for key, (_, calls, own, cumulative, _) in stats.items():
+                rows.append({
+                    'fonction': _function_label((os.path.basename(key[0]), key[1], key[2])),
+                    'appels': calls,
+                    'temps_propre_s': round(own, 4),
+                    'temps_cumule_s': round(cumulative, 4),
+                })
+        elif self._samples:
+            # Durées estimées: part des échantillons x durée capturée
+            per_sample = self.captured_time / self._samples
+            for key, cumulative in self._cumulative_samples.items():
+                rows.append({
+                    'fonction': _function_label(key),
+                    'appels': None,
+                    'temps_propre_s': round(self._own_samples.get(key, 0) * per_sample, 4),
+                    'temps_cumule_s': round(cumulative * per_sample, 4),
+                })
+        rows.sort(key=lambda row: (row['temps_propre_s'], row['temps_cumule_s']), reverse=True)
+        return rows[:self.top]
+
+    def report(self, phase_times: dict) -> dict:
+        """Rapport complet: phases, compteurs et points chauds"""
+        return {
+            'mode': self.mode,
+            'date': datetime.now().isoformat(timespec='seconds'),
+            'phases': {phase: round(duration, 4) for phase, duration in phase_times.items()},
+            'compteurs': dict(self.counters),
+            'duree_capturee_s': round(self.captured_time, 3),
+            'echantillons': self._samples,
+            'points_chauds': self.hotspots(),
+        }
+
+    def to_json(self, phase_times: dict) -> str:
+        """Export du rapport pour analyse hors ligne"""
+        return json.dumps(self.report(phase_times), ensure_ascii=False, indent=2)
+
+    def profile_bytes(self):
+        """Capture cProfile au format .prof (lisible par pstats.Stats), None hors mode cprofile"""
+        if self._profiler is None:
+            return None
+        self._profiler.create_stats()
+        return marshal.dumps(self._profiler.stats)
@@ -0,0 +1,131 @@
+"""
+Publication transactionnelle d'un planning généré
+Les examens sont copiés en bloc (COPY) dans une table temporaire, contrôlés de façon ensembliste
+contre les examens déjà enregistrés (verifier_planning_stage), puis insérés dans la même transaction:
+tout est publié, ou rien et un rapport de rejet est retourné
+Les chevauchements de salle et de surveillant sont refusés par les contraintes d'exclusion de examens
+(bdd.sql, PARTIE 17): la violation est convertie en rejet
+"""
+import csv
+import io
+
+import psycopg2
+import psycopg2.errors
+import psycopg2.extras
+
+from connection import SimpleConnection
+from stats_refresh import request_refresh
+
+STAGE_COLUMNS = [
+    'ligne', 'module_id', 'professeur_id', 'salle_id', 'date_heure', 'duree_minutes',
+    'nb_etudiants', 'groupe_examen', 'partie_num', 'nb_parties', 'type_examen'
+]
+
+# Contraintes d'exclusion de examens -> type de rejet
+EXCLUSION_CONSTRAINTS = {
+    'excl_examens_salle_periode': ('SALLE', "Salle déjà occupée sur ce créneau"),
+    'excl_examens_surveillant_periode': ('SURVEILLANT', "Surveillant déjà affecté sur ce créneau"),
+}
+
+CREATE_STAGE = """
+    CREATE TEMP TABLE planning_stage (
+        ligne INT PRIMARY KEY,
+        module_id INT NOT NULL,
+        professeur_id INT NOT NULL,
+        salle_id INT NOT NULL,
+        date_heure TIMESTAMP NOT NULL,
+        duree_minutes INT NOT NULL,
+        nb_etudiants INT NOT NULL,
+        groupe_examen UUID,
+        partie_num INT,
+        nb_parties INT,
+        type_examen VARCHAR(30)
+    ) ON COMMIT DROP
+"""
+
+
+def stage_rows(schedule):
+    """Lignes à copier (format du planning généré -> colonnes de planning_stage)"""
+    for ligne, exam in enumerate(schedule, start=1):
+        yield (
+            ligne,
+            exam['module_id'],
+            exam['professor_id'],
+            exam['room_id'],
+            exam['exam_time'],
+            exam['duration_minutes'],
+            exam['student_count'],
+            exam.get('split_group'),
+            exam.get('part_index'),
+            exam.get('part_count'),
+            exam.get('exam_type'),
+        )
+
+
+def _copy_buffer(schedule):
+    """Flux CSV pour COPY (champ vide non quoté = NULL)"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator='\n')
+    for row in stage_rows(schedule):
+        writer.writerow(['' if value is None else value for value in row])
+    buffer.seek(0)
+    return buffer
+
+
+def exclusion_rejection(error):
+    """Rejet (format de verifier_planning_stage) d'une violation de contrainte d'exclusion"""
+    nature, reason = EXCLUSION_CONSTRAINTS.get(error.diag.constraint_name, ('CHEVAUCHEMENT', "Créneau déjà pris"))
+    return {
+        'type_conflit': nature,
+        'ligne': None,
+        'module_id': None,
+        'salle_id': None,
+        'professeur_id': None,
+        'date_heure': None,
+        'conflit_avec': error.diag.message_detail,
+        'nb_etudiants': None,
+        'details': reason,
+    }
+
+
+def publish_schedule(schedule):
+    """
+    Publie un planning en une seule transaction
+    Retourne (nombre d'examens insérés, rejets); en cas de rejet rien n'est écrit
+    Chaque rejet: type_conflit, ligne (rang dans le planning, à partir de 1), module_id, salle_id,
+    professeur_id, date_heure, conflit_avec, nb_etudiants, details
+    """
+    if not schedule:
+        return 0, []
+
+    conn = SimpleConnection.get_connection()
+    if not conn:
+        raise ConnectionError("Connexion à la base de données impossible")
+
+    try:
+        with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cursor:
+            cursor.execute(CREATE_STAGE)
+            cursor.copy_expert(
+                f"COPY planning_stage ({', '.join(STAGE_COLUMNS)}) FROM STDIN WITH (FORMAT csv)",
+                _copy_buffer(schedule)
+            )
+
+            cursor.execute("SELECT * FROM verifier_planning_stage() ORDER BY ligne, type_conflit")
+            rejections = [dict(row) for row in cursor.fetchall()]
+            if rejections:
+                conn.rollback()
+                return 0, rejections
+
+            cursor.execute("SELECT publier_planning_stage() AS nb")
+            count = cursor.fetchone()['nb']
+        conn.commit()
+        request_refresh()
+        return count, []
+    except psycopg2.errors.ExclusionViolation as e:
+        conn.rollback()
+        return 0, [exclusion_rejection(e)]
+    except psycopg2.Error:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
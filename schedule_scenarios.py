@@ -0,0 +1,230 @@
+"""
+Bac à sable de scénarios « et si » : fermer une salle, ajouter un jour d'examens, changer les pondérations
+Rien n'est écrit dans examens. Les scénarios partagent les données de base chargées une seule fois :
+chacun ne recrée que ce qu'il modifie. Les processus de calcul sont lancés en 'spawn' (la page tourne
+dans un serveur multithreadé) et reçoivent les données de base une seule fois chacun, à leur démarrage,
+avec les listes d'étudiants converties en tableaux numpy pour une sérialisation compacte
+Les contraintes datées (fermetures, examens existants, indisponibilités) sont chargées une fois sur
+la fenêtre la plus large de tous les scénarios, pour qu'une période décalée ou allongée les voie aussi
+"""
+import multiprocessing
+import os
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+
+from exam_optimizer import ExamScheduleOptimizer, DEFAULT_TIME_BUDGET
+
+# Données de base des comparaisons en cours, par jeton (optimiseur de base, contraintes datées);
+# dans un processus de calcul, reconstruites une fois par _init_worker
+_shared_bases = {}
+
+
+class Scenario:
+    """
+    Variante du problème de base, décrite uniquement par ses modifications
+    closed_rooms: identifiants ou noms des salles fermées
+    extra_days: jours ajoutés en fin de période
+    shift_days: décalage de toute la période (en jours)
+    weights: pondérations du score (clés de schedule_scoring.DEFAULT_WEIGHTS)
+    """
+
+    def __init__(self, name: str, closed_rooms=(), extra_days: int = 0, shift_days: int = 0, weights: dict = None,
+                 improvement: str = 'aucune', time_budget: float = DEFAULT_TIME_BUDGET):
+        self.name = name
+        self.closed_rooms = set(closed_rooms)
+        self.extra_days = int(extra_days)
+        self.shift_days = int(shift_days)
+        self.weights = dict(weights) if weights else None
+        self.improvement = improvement
+        self.time_budget = time_budget
+
+    def describe(self) -> str:
+        """Résumé lisible des modifications"""
+        changes = []
+        if self.closed_rooms:
+            changes.append("salles fermées : " + ", ".join(str(room) for room in sorted(self.closed_rooms, key=str)))
+        if self.extra_days:
+            changes.append(f"+{self.extra_days} jour(s)")
+        if self.shift_days:
+            changes.append(f"période décalée de {self.shift_days:+d} jour(s)")
+        if self.weights:
+            changes.append("pondérations : " + ", ".join(f"{k}={v:g}" for k, v in self.weights.items()))
+        return " ; ".join(changes) or "aucune modification"
+
+    def period(self, base: ExamScheduleOptimizer) -> tuple:
+        """Période (début, fin) du scénario"""
+        start_date = base.start_date + timedelta(days=self.shift_days)
+        end_date = base.end_date + timedelta(days=self.shift_days + self.extra_days)
+        return start_date, end_date
+
+    def build_optimizer(self, base: ExamScheduleOptimizer, constraints: dict = None) -> ExamScheduleOptimizer:
+        """
+        Optimiseur du scénario : modules et professeurs sont les listes de base (partagées);
+        examens existants, indisponibilités et fermetures viennent de constraints
+        (load_period_constraints sur une fenêtre couvrant la période du scénario, celles de base sinon);
+        salles et calendrier ne sont recréés que s'ils changent
+        """
+        if constraints is None:
+            constraints = _base_constraints(base)
+        start_date, end_date = self.period(base)
+        calendar = base.calendar
+        if (start_date, end_date) != (base.start_date, base.end_date):
+            calendar = calendar.with_period(start_date, end_date, holidays=constraints['holidays'])
+
+        optimizer = ExamScheduleOptimizer(
+            start_date, end_date, base.department_id,
+            calendar=calendar, score_weights=self.weights
+        )
+        optimizer.rooms = base.rooms
+        if self.closed_rooms:
+            optimizer.rooms = [
+                room for room in base.rooms
+                if room['id'] not in self.closed_rooms and room['nom'] not in self.closed_rooms
+            ]
+        optimizer.modules_data = base.modules_data
+        optimizer.professors = base.professors
+        optimizer.existing_exams = constraints['existing_exams']
+        optimizer.unavailabilities = constraints['unavailabilities']
+        return optimizer
+
+    def summarize(self, optimizer: ExamScheduleOptimizer, elapsed: float) -> dict:
+        """Indicateurs de comparaison d'un scénario généré"""
+        schedule = optimizer.generated_schedule
+        cal = optimizer.calendar
+        capacities = {room['id']: room.get('capacite', 0) for room in optimizer.rooms}
+        seats_offered = sum(capacities[exam['room_id']] for exam in schedule)
+        return {
+            'scenario': self.name,
+            'modifications': self.describe(),
+            'score_global': round(optimizer.score_report.get('global', 0.0), 1),
+            'conflits': len(optimizer.conflicts),
+            'modules_non_places': len(optimizer.unplaced_modules),
+            'examens': len(schedule),
+            'salles_utilisees': len({exam['room_id'] for exam in schedule}),
+            'salles_disponibles': len(optimizer.rooms),
+            'remplissage_salles_pct': round(
+                100.0 * sum(exam['student_count'] for exam in schedule) / seats_offered, 1
+            ) if seats_offered else 0.0,
+            'jours_utilises': len({int(cal.slot_day[exam['slot']]) for exam in schedule}),
+            'jours_disponibles': cal.n_days,
+            'duree_s': round(elapsed, 2),
+        }
+
+
+def _base_constraints(base: ExamScheduleOptimizer) -> dict:
+    """Contraintes datées déjà chargées par l'optimiseur de base (sa propre période)"""
+    return {
+        'unavailabilities': base.unavailabilities,
+        'existing_exams': base.existing_exams,
+        'holidays': base.calendar.holidays,
+    }
+
+
+def _compact_rows(rows) -> list:
+    """Lignes (modules, examens existants) avec les étudiants en tableau numpy, sans index de calcul"""
+    return [
+        dict({k: v for k, v in row.items() if k != '_students'},
+             student_ids=np.asarray(row.get('student_ids') or [], dtype=np.int64))
+        for row in rows
+    ]
+
+
+def _expand_rows(rows) -> list:
+    """Inverse de _compact_rows: listes d'étudiants attendues par l'optimiseur"""
+    return [dict(row, student_ids=row['student_ids'].tolist()) for row in rows]
+
+
+def _worker_payload(base: ExamScheduleOptimizer, constraints: dict) -> dict:
+    """Données de base transmises une fois à chaque processus de calcul"""
+    return {
+        'start_date': base.start_date,
+        'end_date': base.end_date,
+        'department_id': base.department_id,
+        'calendar': base.calendar,
+        'rooms': base.rooms,
+        'professors': base.professors,
+        'modules': _compact_rows(base.modules_data),
+        'constraints': dict(constraints, existing_exams=_compact_rows(constraints['existing_exams'])),
+    }
+
+
+def _init_worker(token, payload):
+    """Démarrage d'un processus de calcul: reconstruit l'optimiseur de base et ses contraintes"""
+    base = ExamScheduleOptimizer(
+        payload['start_date'], payload['end_date'], payload['department_id'], calendar=payload['calendar']
+    )
+    base.rooms = payload['rooms']
+    base.professors = payload['professors']
+    base.modules_data = _expand_rows(payload['modules'])
+    constraints = dict(payload['constraints'], existing_exams=_expand_rows(payload['constraints']['existing_exams']))
+    _shared_bases[token] = (base, constraints)
+
+
+def _run_scenario(token, scenario):
+    """Génère un scénario sur les données de base partagées (processus de calcul ou appelant)"""
+    start_time = time.time()
+    base, constraints = _shared_bases[token]
+    optimizer = scenario.build_optimizer(base, constraints)
+    optimizer.generate_schedule(improvement=scenario.improvement, time_budget=scenario.time_budget)
+    return {
+        'resume': scenario.summarize(optimizer, time.time() - start_time),
+        'planning': optimizer.schedule_dataframe(),
+    }
+
+
+def run_scenarios(base: ExamScheduleOptimizer, scenarios, max_workers: int = None) -> list:
+    """
+    Génère les scénarios en parallèle à partir d'un optimiseur de base déjà chargé (load_data)
+    Retourne, dans l'ordre des scénarios, {'resume': indicateurs, 'planning': DataFrame}
+    """
+    scenarios = list(scenarios)
+    if not scenarios:
+        return []
+
+    # Fenêtre la plus large: une seule lecture des contraintes datées pour tous les scénarios
+    periods = [scenario.period(base) for scenario in scenarios]
+    start_date = min(start for start, _ in periods)
+    end_date = max(end for _, end in periods)
+    if (start_date, end_date) == (base.start_date, base.end_date):
+        constraints = _base_constraints(base)
+    else:
+        constraints = base.load_period_constraints(start_date, end_date)
+
+    token = uuid.uuid4().hex
+    _shared_bases[token] = (base, constraints)
+    try:
+        if len(scenarios) == 1:
+            return [_run_scenario(token, scenario) for scenario in scenarios]
+
+        try:
+            # 'spawn' et non 'fork': forker le serveur Streamlit multithreadé peut bloquer les processus
+            # sur des verrous hérités; chaque processus reçoit les données de base une seule fois
+            workers = max_workers or min(len(scenarios), os.cpu_count() or 1)
+            with ProcessPoolExecutor(
+                max_workers=workers, mp_context=multiprocessing.get_context('spawn'),
+                initializer=_init_worker, initargs=(token, _worker_payload(base, constraints))
+            ) as executor:
+                return list(executor.map(_run_scenario, [token] * len(scenarios), scenarios))
+        except (OSError, BrokenProcessPool):
+            # Pas de processus disponibles (environnement restreint): exécution séquentielle
+            return [_run_scenario(token, scenario) for scenario in scenarios]
+    finally:
+        _shared_bases.pop(token, None)
+
+
+def compare_scenarios(results) -> pd.DataFrame:
+    """Tableau comparatif côte à côte; les écarts sont calculés par rapport au premier scénario"""
+    table = pd.DataFrame([result['resume'] for result in results])
+    if table.empty:
+        return table
+
+    reference = table.iloc[0]
+    for column in ('score_global', 'conflits', 'modules_non_places', 'salles_utilisees'):
+        table[f'ecart_{column}'] = table[column] - reference[column]
+    return table
@@ -0,0 +1,428 @@
+"""
+Évaluation vectorisée d'un planning d'examens
+Scores par examen (0-100) et score global, assez rapides pour être appelés dans une boucle d'amélioration
+"""
+import numpy as np
+
+from slot_calendar import to_minutes
+
+# Taux de remplissage visé des salles
+FILL_BAND = (0.60, 0.90)
+
+# Écart (en jours) entre deux examens d'un étudiant au-delà duquel l'espacement est jugé suffisant
+SPREAD_TARGET_DAYS = 2
+
+DEFAULT_WEIGHTS = {
+    'remplissage': 0.30,
+    'espacement': 0.30,
+    'equilibre_profs': 0.15,
+    'priorite_departement': 0.10,
+    'preferences': 0.15,
+}
+
+
+class ScheduleScorer:
+    """
+    Évalue des plannings exprimés en tableaux d'indices (module, salle, surveillant, créneau, effectif)
+    Toutes les données fixes (capacités, préférences, inscriptions) sont précalculées une seule fois
+    """
+
+    def __init__(self, calendar, rooms, professors, modules, priority_department=None,
+                 unavailabilities=None, weights=None):
+        self.calendar = calendar
+        self.rooms = rooms
+        self.professors = professors
+        self.modules = modules
+        self.weights = dict(DEFAULT_WEIGHTS, **(weights or {}))
+
+        self.room_pos = {room['id']: idx for idx, room in enumerate(rooms)}
+        self.prof_pos = {prof['id']: idx for idx, prof in enumerate(professors)}
+        self.module_pos = {module['module_id']: idx for idx, module in enumerate(modules)}
+
+        # Salles
+        self.capacity = np.array([room.get('capacite') or 0 for room in rooms], dtype=np.float64)
+        buildings = sorted({room.get('batiment') or '' for room in rooms})
+        types = sorted({room.get('type') or '' for room in rooms})
+        self.room_building = np.array([buildings.index(room.get('batiment') or '') for room in rooms], dtype=np.int64)
+        self.room_type = np.array([types.index(room.get('type') or '') for room in rooms], dtype=np.int64)
+
+        # Préférences des surveillants (préférences absentes: tout est accepté)
+        n_profs = len(professors)
+        self.pref_start = np.zeros(n_profs, dtype=np.int64)
+        self.pref_end = np.full(n_profs, 24 * 60, dtype=np.int64)
+        self.pref_building = np.ones((n_profs, len(buildings)), dtype=bool)
+        self.pref_type = np.ones((n_profs, len(types)), dtype=bool)
+        for idx, prof in enumerate(professors):
+            if prof.get('heure_debut_pref'):
+                self.pref_start[idx] = to_minutes(prof['heure_debut_pref'])
+            if prof.get('heure_fin_pref'):
+                self.pref_end[idx] = to_minutes(prof['heure_fin_pref'])
+            if prof.get('batiments_preferes'):
+                self.pref_building[idx] = [b in prof['batiments_preferes'] for b in buildings]
+            if prof.get('types_salles_preferes'):
+                self.pref_type[idx] = [t in prof['types_salles_preferes'] for t in types]
+
+        # Indisponibilités: créneaux x surveillants
+        self.unavailable = np.zeros((n_profs, calendar.n_slots), dtype=bool)
+        for row in unavailabilities or []:
+            prof_idx = self.prof_pos.get(row['professeur_id'])
+            if prof_idx is not None:
+                calendar.mark_interval(self.unavailable, prof_idx,
+                                       calendar.minutes(row['date_debut']), calendar.minutes(row['date_fin']))
+        self._blocked_cache = {}
+
+        # Modules: durée, département, inscriptions à plat (module, étudiant)
+        self.module_duration = np.array([m.get('duration_minutes', 120) for m in modules], dtype=np.int64)
+        self.module_priority = np.array(
+            [priority_department is not None and m.get('departement_id') == priority_department for m in modules],
+            dtype=bool
+        )
+        students = [np.asarray(m.get('student_ids') or [], dtype=np.int64) for m in modules]
+        self.pair_module = np.repeat(np.arange(len(modules)), [len(s) for s in students])
+        self.pair_student = np.concatenate(students) if students else np.zeros(0, dtype=np.int64)
+
+    # ---------- Conversion ----------
+
+    def arrays_from_schedule(self, schedule):
+        """Convertit un planning (liste de dictionnaires) en tableaux d'indices"""
+        return (
+            np.array([self.module_pos[e['module_id']] for e in schedule], dtype=np.int64),
+            np.array([self.room_pos[e['room_id']] for e in schedule], dtype=np.int64),
+            np.array([self.prof_pos.get(e['professor_id'], -1) for e in schedule], dtype=np.int64),
+            np.array([e['slot'] for e in schedule], dtype=np.int64),
+            np.array([e['student_count'] for e in schedule], dtype=np.float64),
+        )
+
+    def score_schedule(self, schedule):
+        """Évalue un planning au format du planning généré"""
+        if not schedule:
+            return self.evaluate(*(np.zeros(0, dtype=np.int64) for _ in range(5)))
+        return self.evaluate(*self.arrays_from_schedule(schedule))
+
+    # ---------- Composantes ----------
+
+    def fill_scores(self, room_idx, student_counts):
+        """
+        1 dans la bande 60-90 %, décroissant en dessous (salle trop grande),
+        0.5 pour une salle pleine et 0 au-delà de la capacité
+        """
+        low, high = FILL_BAND
+        capacity = self.capacity[room_idx]
+        ratio = np.divide(student_counts, capacity, out=np.full(len(capacity), np.inf), where=capacity > 0)
+        return np.where(
+            ratio < low,
+            ratio / low,
+            np.where(
+                ratio <= high,
+                1.0,
+                np.where(ratio <= 1.0, 1.0 - 0.5 * (ratio - high) / (1.0 - high), 0.0)
+            )
+        )
+
+    def spread_scores(self, module_idx, slots):
+        """
+        Espacement moyen des étudiants de chaque module jusqu'à leur examen le plus proche
+        0 le même jour, 0.5 la veille ou le lendemain, 1 à partir de deux jours
+        """
+        n_modules = len(self.modules)
+        module_day = np.full(n_modules, -1, dtype=np.int64)
+        module_day[module_idx] = self.calendar.day_offset[self.calendar.slot_day[slots]]
+
+        placed = module_day[self.pair_module] >= 0
+        modules = self.pair_module[placed]
+        students = self.pair_student[placed]
+        days = module_day[modules]
+
+        order = np.lexsort((days, students))
+        modules, students, days = modules[order], students[order], days[order]
+
+        gap = np.full(len(days), np.inf)
+        same_student = students[1:] == students[:-1]
+        step = (days[1:] - days[:-1]).astype(np.float64)
+        gap[1:] = np.where(same_student, step, np.inf)
+        gap[:-1] = np.minimum(gap[:-1], np.where(same_student, step, np.inf))
+
+        pair_score = np.minimum(gap, SPREAD_TARGET_DAYS) / SPREAD_TARGET_DAYS
+        totals = np.bincount(modules, weights=pair_score, minlength=n_modules)
+        counts = np.bincount(modules, minlength=n_modules)
+        module_score = np.divide(totals, counts, out=np.ones(n_modules), where=counts > 0)
+        return module_score[module_idx]
+
+    def balance_scores(self, prof_idx):
+        """Charge de surveillance comparée à une répartition égale entre tous les surveillants"""
+        known = prof_idx >= 0
+        load = np.bincount(prof_idx[known], minlength=len(self.professors)).astype(np.float64)
+        target = max(1.0, known.sum() / max(1, len(self.professors)))
+        scores = np.ones(len(prof_idx))
+        scores[known] = np.minimum(1.0, target / load[prof_idx[known]])
+        return scores
+
+    def priority_scores(self, module_idx, slots):
+        """Les modules du département prioritaire sont mieux notés en début de session"""
+        position = slots / max(1, self.calendar.n_slots - 1)
+        return np.where(self.module_priority[module_idx], 1.0 - position, 1.0)
+
+    def preference_scores(self, module_idx, room_idx, prof_idx, slots):
+        """
+        Respect des préférences du surveillant (horaire, bâtiment, type de salle)
+        Un surveillant indisponible sur le créneau donne 0
+        """
+        scores = np.ones(len(slots))
+        known = prof_idx >= 0
+        if not known.any():
+            return scores
+
+        profs, rooms, starts = prof_idx[known], room_idx[known], slots[known]
+        durations = self.module_duration[module_idx[known]]
+        minute = self.calendar.slot_minute_of_day[starts]
+
+        respected = (
+            ((minute >= self.pref_start[profs]) & (minute + durations <= self.pref_end[profs])).astype(np.float64)
+            + self.pref_building[profs, self.room_building[rooms]]
+            + self.pref_type[profs, self.room_type[rooms]]
+        ) / 3.0
+
+        blocked = np.zeros(len(starts), dtype=bool)
+        for duration in np.unique(durations):
+            same = durations == duration
+            blocked[same] = self._blocked_starts(int(duration))[profs[same], starts[same]]
+
+        scores[known] = np.where(blocked, 0.0, respected)
+        return scores
+
+    def _blocked_starts(self, duration):
+        """Créneaux de départ où le surveillant est indisponible pendant l'examen"""
+        blocked = self._blocked_cache.get(duration)
+        if blocked is None:
+            blocked = ~self.calendar.free_starts(self.unavailable, duration)
+            self._blocked_cache[duration] = blocked
+        return blocked
+
+    # ---------- Score ----------
+
+    def evaluate(self, module_idx, room_idx, prof_idx, slots, student_counts):
+        """
+        Évalue un planning
+        Retourne les composantes par examen (0-1), le score par examen (0-100) et le score global
+        """
+        components = {
+            'remplissage': self.fill_scores(room_idx, student_counts),
+            'espacement': self.spread_scores(module_idx, slots),
+            'equilibre_profs': self.balance_scores(prof_idx),
+            'priorite_departement': self.priority_scores(module_idx, slots),
+            'preferences': self.preference_scores(module_idx, room_idx, prof_idx, slots),
+        }
+        total_weight = sum(self.weights.values())
+        per_exam = 100.0 * sum(self.weights[name] * values for name, values in components.items()) / total_weight
+
+        return {
+            'par_examen': per_exam,
+            'composantes': components,
+            'global': float(per_exam.mean()) if len(per_exam) else 0.0,
+            'global_composantes': {
+                name: float(100.0 * values.mean()) if len(values) else 0.0
+                for name, values in components.items()
+            },
+            'remplissage_pct': np.divide(
+                100.0 * student_counts, self.capacity[room_idx],
+                out=np.zeros(len(room_idx)), where=self.capacity[room_idx] > 0
+            ),
+        }
+
+    def tracker(self, schedule):
+        """Score tenu à jour mouvement par mouvement (voir ScoreTracker)"""
+        return ScoreTracker(self, schedule)
+
+
+def _gather(indptr, groups, order=None):
+    """Positions des éléments des groupes donnés d'une structure CSR (indptr, order)"""
+    starts, ends = indptr[groups], indptr[groups + 1]
+    lengths = ends - starts
+    positions = np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(lengths.sum())
+    return positions if order is None else order[positions]
+
+
+class ScoreTracker:
+    """
+    Score global d'un planning maintenu par différences pendant la recherche locale
+    Un déplacement ne réévalue que les examens du module déplacé (remplissage, priorité, préférences)
+    et les couples (étudiant, module) de ses étudiants (espacement); l'équilibre des surveillants
+    se déduit des charges par surveillant: somme des min(charge, charge cible)
+    Les examens sont des parties numérotées: les parties remplacées sont désactivées, les nouvelles ajoutées
+    """
+
+    def __init__(self, scorer, schedule):
+        self.scorer = scorer
+        self.weights = scorer.weights
+        self.total_weight = sum(self.weights.values())
+        n_modules = len(scorer.modules)
+        self.module_ids = [module['module_id'] for module in scorer.modules]
+
+        # Couples (module, étudiant): regroupés par module à la construction, indexés par étudiant ici
+        _, self.pair_student = np.unique(scorer.pair_student, return_inverse=True)
+        self.student_order = np.argsort(self.pair_student, kind='stable')
+        self.student_indptr = np.concatenate([[0], np.cumsum(np.bincount(self.pair_student))])
+        self.module_indptr = np.concatenate([[0], np.cumsum(np.bincount(scorer.pair_module, minlength=n_modules))])
+        self.module_pair_count = np.diff(self.module_indptr)
+
+        # Parties actives
+        self.part_module = np.zeros(0, dtype=np.int64)
+        self.part_prof = np.zeros(0, dtype=np.int64)
+        self.part_local = np.zeros(0, dtype=np.float64)
+        self.part_alive = np.zeros(0, dtype=bool)
+        self.parts_of = {}
+        self.n_parts = np.zeros(n_modules, dtype=np.int64)
+        self.prof_load = np.zeros(len(scorer.professors), dtype=np.int64)
+        self.unknown_profs = 0
+
+        arrays = scorer.arrays_from_schedule(schedule) if schedule else tuple(np.zeros(0, dtype=np.int64) for _ in range(5))
+        module_idx, _, prof_idx, slots, _ = arrays
+        self._add_parts(module_idx, prof_idx, self._local_scores(*arrays))
+        self.module_day = np.full(n_modules, -1, dtype=np.int64)
+        self.module_day[module_idx] = self._days(slots)
+
+        self.pair_score = self._pair_scores(np.arange(len(scorer.pair_module)), self.module_day)
+        self.spread_total = np.bincount(scorer.pair_module, weights=self.pair_score, minlength=n_modules)
+        self.local_sum = float(self.part_local[self.part_alive].sum())
+        self.spread_sum = float(self.n_parts @ self._module_spread(np.arange(n_modules), self.spread_total))
+        self.score = self._global(self.local_sum, self.spread_sum, self.prof_load, self.unknown_profs,
+                                  int(self.n_parts.sum()))
+
+    # ---------- Calculs partiels ----------
+
+    def _days(self, slots):
+        calendar = self.scorer.calendar
+        return calendar.day_offset[calendar.slot_day[slots]]
+
+    def _local_scores(self, module_idx, room_idx, prof_idx, slots, student_counts):
+        """Composantes propres à chaque examen, déjà pondérées"""
+        scorer, weights = self.scorer, self.weights
+        return (
+            weights['remplissage'] * scorer.fill_scores(room_idx, student_counts)
+            + weights['priorite_departement'] * scorer.priority_scores(module_idx, slots)
+            + weights['preferences'] * scorer.preference_scores(module_idx, room_idx, prof_idx, slots)
+        )
+
+    def _pair_scores(self, pairs, module_day):
+        """
+        Espacement des couples donnés (tous les couples de leurs étudiants doivent y figurer)
+        Même règle que ScheduleScorer.spread_scores; les couples de modules non placés valent 1
+        """
+        scores = np.ones(len(pairs))
+        days = module_day[self.scorer.pair_module[pairs]]
+        placed = np.flatnonzero(days >= 0)
+        students, days = self.pair_student[pairs[placed]], days[placed]
+        order = np.lexsort((days, students))
+        students, days = students[order], days[order]
+
+        gap = np.full(len(days), np.inf)
+        same_student = students[1:] == students[:-1]
+        step = np.where(same_student, (days[1:] - days[:-1]).astype(np.float64), np.inf)
+        gap[1:] = step
+        gap[:-1] = np.minimum(gap[:-1], step)
+        scores[placed[order]] = np.minimum(gap, SPREAD_TARGET_DAYS) / SPREAD_TARGET_DAYS
+        return scores
+
+    def _module_spread(self, modules, totals):
+        counts = self.module_pair_count[modules]
+        return np.divide(totals, counts, out=np.ones(len(modules)), where=counts > 0)
+
+    def _global(self, local_sum, spread_sum, prof_load, unknown_profs, n_exams):
+        if not n_exams:
+            return 0.0
+        known = n_exams - unknown_profs
+        target = max(1.0, known / max(1, len(prof_load)))
+        balance_sum = float(np.minimum(prof_load, target).sum()) + unknown_profs
+        weighted = (local_sum + self.weights['espacement'] * spread_sum
+                    + self.weights['equilibre_profs'] * balance_sum)
+        return 100.0 * weighted / self.total_weight / n_exams
+
+    def _add_parts(self, module_idx, prof_idx, local):
+        start = len(self.part_module)
+        self.part_module = np.concatenate([self.part_module, module_idx])
+        self.part_prof = np.concatenate([self.part_prof, prof_idx])
+        self.part_local = np.concatenate([self.part_local, local])
+        self.part_alive = np.concatenate([self.part_alive, np.ones(len(module_idx), dtype=bool)])
+        for position, module in enumerate(module_idx.tolist(), start=start):
+            self.parts_of.setdefault(module, []).append(position)
+        np.add.at(self.n_parts, module_idx, 1)
+        known = prof_idx >= 0
+        np.add.at(self.prof_load, prof_idx[known], 1)
+        self.unknown_profs += int((~known).sum())
+
+    # ---------- Mouvements ----------
+
+    def exam_scores(self):
+        """Score (0-100) de chaque partie active, dans l'ordre des parties (positions inactives: 0)"""
+        known = self.part_prof >= 0
+        n_exams = int(self.n_parts.sum())
+        target = max(1.0, (n_exams - self.unknown_profs) / max(1, len(self.prof_load)))
+        balance = np.ones(len(self.part_prof))
+        balance[known] = np.minimum(1.0, target / np.maximum(self.prof_load[self.part_prof[known]], 1))
+        spread = self._module_spread(self.part_module, self.spread_total[self.part_module])
+        scores = 100.0 * (
+            self.part_local + self.weights['espacement'] * spread + self.weights['equilibre_profs'] * balance
+        ) / self.total_weight
+        return scores * self.part_alive
+
+    def propose(self, module_id, exams):
+        """
+        Score du planning si le module module_id occupait les examens donnés (rien n'est modifié)
+        Retourne un dictionnaire à passer à commit; sa clé 'score' est le nouveau score global
+        """
+        scorer = self.scorer
+        arrays = scorer.arrays_from_schedule(exams)
+        module_idx, _, prof_idx, slots, _ = arrays
+        module = scorer.module_pos[module_id]
+        old_positions = self.parts_of.get(module, [])
+        local = self._local_scores(*arrays)
+
+        # Espacement: couples de tous les étudiants du module, avec le nouveau jour
+        # (le module lui-même figure toujours parmi les modules touchés, même sans étudiant)
+        students = np.unique(self.pair_student[self.module_indptr[module]:self.module_indptr[module + 1]])
+        pairs = _gather(self.student_indptr, students, self.student_order)
+        old_day = self.module_day[module]
+        new_day = self._days(slots[:1])[0] if len(slots) else -1
+        self.module_day[module] = new_day
+        pair_score = self._pair_scores(pairs, self.module_day)
+        self.module_day[module] = old_day
+        affected, inverse = np.unique(np.append(scorer.pair_module[pairs], module), return_inverse=True)
+        changes = np.append(pair_score - self.pair_score[pairs], 0.0)
+        totals = self.spread_total[affected] + np.bincount(inverse, weights=changes, minlength=len(affected))
+        n_parts = self.n_parts[affected].copy()
+        n_parts[affected == module] = len(exams)
+        spread_sum = (self.spread_sum
+                      + float(n_parts @ self._module_spread(affected, totals))
+                      - float(self.n_parts[affected] @ self._module_spread(affected, self.spread_total[affected])))
+
+        # Charges des surveillants
+        prof_load = self.prof_load.copy()
+        old_profs = self.part_prof[old_positions]
+        np.subtract.at(prof_load, old_profs[old_profs >= 0], 1)
+        np.add.at(prof_load, prof_idx[prof_idx >= 0], 1)
+        unknown_profs = self.unknown_profs - int((old_profs < 0).sum()) + int((prof_idx < 0).sum())
+
+        local_sum = self.local_sum - float(self.part_local[old_positions].sum()) + float(local.sum())
+        n_exams = int(self.n_parts.sum()) - len(old_positions) + len(exams)
+        return {
+            'score': self._global(local_sum, spread_sum, prof_load, unknown_profs, n_exams),
+            'module': module, 'arrays': (module_idx, prof_idx, local), 'day': new_day,
+            'pairs': pairs, 'pair_score': pair_score, 'affected': affected, 'totals': totals,
+            'local_sum': local_sum, 'spread_sum': spread_sum,
+        }
+
+    def commit(self, proposal):
+        """Applique un mouvement évalué par propose"""
+        module = proposal['module']
+        old_positions = self.parts_of.pop(module, [])
+        self.part_alive[old_positions] = False
+        old_profs = self.part_prof[old_positions]
+        np.subtract.at(self.prof_load, old_profs[old_profs >= 0], 1)
+        self.unknown_profs -= int((old_profs < 0).sum())
+        self.n_parts[module] -= len(old_positions)
+        self._add_parts(*proposal['arrays'])
+
+        self.module_day[module] = proposal['day']
+        self.pair_score[proposal['pairs']] = proposal['pair_score']
+        self.spread_total[proposal['affected']] = proposal['totals']
+        self.local_sum, self.spread_sum, self.score = proposal['local_sum'], proposal['spread_sum'], proposal['score']
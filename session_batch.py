@@ -0,0 +1,213 @@
+"""
+Génération groupée des sessions d'un semestre (Principale puis Rattrapage)
+Une seule tâche: salles, professeurs, examens enregistrés et configuration des créneaux sont chargés
+une fois pour l'ensemble des périodes, l'index des salles/professeurs/étudiants est construit une fois
+et partagé par les sessions. Les inscriptions de rattrapage sont dérivées des inscriptions 'Echoue'.
+Les examens de la session principale occupent salles, surveillants et étudiants pour le rattrapage
+"""
+import time
+
+import pandas as pd
+
+from connection import execute_query
+from exam_optimizer import ExamScheduleOptimizer, DEFAULT_TIME_BUDGET, GenerationCancelled
+from schedule_publish import publish_schedule
+
+# Sessions dans l'ordre de génération: clé (inscriptions.session) -> (libellé, examens.type_examen)
+SESSIONS = {
+    'Principale': ("Session principale", 'Final'),
+    'Rattrapage': ("Session de rattrapage", 'Rattrapage'),
+}
+
+
+class SessionBatch:
+    """
+    Génération des sessions d'un semestre sur un inventaire de salles partagé
+    periods: {session: (date_debut, date_fin)} pour les sessions de SESSIONS à générer
+    """
+
+    def __init__(self, periods: dict, department_id: int = None, construction: str = 'glouton',
+                 improvement: str = 'aucune', time_budget: float = DEFAULT_TIME_BUDGET,
+                 progress_callback=None, cancel_event=None, **optimizer_options):
+        unknown = set(periods) - set(SESSIONS)
+        if unknown:
+            raise ValueError(f"Session inconnue: {', '.join(sorted(unknown))}")
+        self.periods = {session: periods[session] for session in SESSIONS if session in periods}
+        self.department_id = department_id
+        self.construction = construction
+        self.improvement = improvement
+        self.time_budget = time_budget
+        self.progress_callback = progress_callback
+        self.cancel_event = cancel_event
+        self.optimizer_options = optimizer_options
+        self.optimizers = {}
+        self.timings = {}
+        self.publish_report = []
+        self.generation_time = 0.0
+
+    @property
+    def start_date(self):
+        return min(start for start, _ in self.periods.values())
+
+    @property
+    def end_date(self):
+        return max(end for _, end in self.periods.values())
+
+    def _report(self, session, **fields):
+        """Avancement global: chaque session occupe une part égale de la barre de progression"""
+        if self.progress_callback is None:
+            return
+        position = list(self.periods).index(session)
+        if 'pourcentage' in fields:
+            fields['pourcentage'] = int((100 * position + fields['pourcentage']) / len(self.periods))
+        if 'phase' in fields:
+            fields['phase'] = f"[{session}] {fields['phase']}"
+        self.progress_callback(**fields)
+
+    def _session_optimizer(self, session, base=None):
+        """Optimiseur d'une session; ressources et calendrier repris de la session de base si fournie"""
+        start_date, end_date = self.periods[session]
+        calendar = base.calendar.with_period(start_date, end_date) if base is not None else None
+        return ExamScheduleOptimizer(
+            start_date, end_date, self.department_id,
+            calendar=calendar,
+            progress_callback=lambda **fields: self._report(session, **fields),
+            cancel_event=self.cancel_event,
+            **self.optimizer_options
+        )
+
+    @staticmethod
+    def load_session_modules(session, start_date, end_date, department_id=None):
+        """Modules à planifier pour une session (inscrits en principale, échecs en rattrapage)"""
+        return execute_query("""
+            SELECT * FROM load_session_optimization_data(%s, %s, %s, %s)
+        """, (start_date, end_date, session, department_id)) or []
+
+    def load(self):
+        """
+        Charge une seule fois les ressources communes (sur l'union des périodes) et les modules de chaque session
+        Retourne True s'il y a au moins un module à planifier
+        """
+        start_time = time.time()
+        shared = ExamScheduleOptimizer(self.start_date, self.end_date, self.department_id)
+        shared._load_resources()
+
+        modules = {
+            session: self.load_session_modules(session, start_date, end_date, self.department_id)
+            for session, (start_date, end_date) in self.periods.items()
+        }
+        self.prepare(shared, modules)
+        self.timings['chargement'] = time.time() - start_time
+        return any(modules.values())
+
+    def prepare(self, shared: ExamScheduleOptimizer, modules: dict):
+        """
+        Prépare les optimiseurs des sessions à partir de ressources déjà chargées (shared)
+        et des modules de chaque session; l'index des entités est commun à toutes les sessions
+        """
+        index = ExamScheduleOptimizer.index_entities(shared.rooms or [], shared.professors or [], modules.values())
+        self.optimizers = {}
+        for session in self.periods:
+            optimizer = self._session_optimizer(session, shared)
+            optimizer.rooms = shared.rooms
+            optimizer.professors = shared.professors
+            optimizer.unavailabilities = shared.unavailabilities
+            optimizer.existing_exams = list(shared.existing_exams or [])
+            optimizer.modules_data = modules.get(session) or []
+            optimizer.entity_index = index
+            self.optimizers[session] = optimizer
+
+    def generate(self, seed=None):
+        """Génère les sessions dans l'ordre; les examens d'une session bloquent les suivantes"""
+        start_time = time.time()
+        placed = []
+        for session, optimizer in self.optimizers.items():
+            session_start = time.time()
+            optimizer.existing_exams = optimizer.existing_exams + placed
+            if optimizer.modules_data:
+                optimizer.generate_schedule(
+                    parallel=self.construction == 'parallele',
+                    improvement=self.improvement,
+                    time_budget=self.time_budget,
+                    seed=seed
+                )
+                exam_type = SESSIONS[session][1]
+                for exam in optimizer.generated_schedule:
+                    exam['exam_type'] = exam_type
+                placed = placed + [self._as_existing(optimizer, exam) for exam in optimizer.generated_schedule]
+            self.timings[session] = time.time() - session_start
+            if self.cancel_event is not None and self.cancel_event.is_set():
+                raise GenerationCancelled("Génération annulée")
+        self.generation_time = time.time() - start_time
+        return self
+
+    @staticmethod
+    def _as_existing(optimizer, exam):
+        """Examen généré au format des examens enregistrés (_load_resources)"""
+        module = optimizer._modules_by_id.get(exam['module_id'], {})
+        return {
+            'module_id': exam['module_id'],
+            'salle_id': exam['room_id'],
+            'professeur_id': exam['professor_id'],
+            'date_heure': exam['exam_time'],
+            'duree_minutes': exam['duration_minutes'],
+            'student_ids': module.get('student_ids') or [],
+        }
+
+    @property
+    def generated_schedule(self):
+        """Examens de toutes les sessions (chacun porte son exam_type)"""
+        return [exam for optimizer in self.optimizers.values() for exam in optimizer.generated_schedule]
+
+    def summary(self) -> pd.DataFrame:
+        """Indicateurs par session"""
+        rows = []
+        for session, optimizer in self.optimizers.items():
+            start_date, end_date = self.periods[session]
+            rows.append({
+                'session': session,
+                'periode': f"{start_date} → {end_date}",
+                'modules': len(optimizer.modules_data or []),
+                'examens': len(optimizer.generated_schedule),
+                'non_places': len(optimizer.unplaced_modules),
+                'conflits': len(optimizer.conflicts),
+                'score_global': round(optimizer.score_report.get('global', 0.0), 1),
+                'duree_s': round(self.timings.get(session, 0.0), 2),
+            })
+        return pd.DataFrame(rows)
+
+    def schedule_dataframe(self) -> pd.DataFrame:
+        """Planning de toutes les sessions (colonnes SCHEDULE_COLUMNS précédées de la session)"""
+        frames = []
+        for session, optimizer in self.optimizers.items():
+            frame = optimizer.schedule_dataframe()
+            frame.insert(0, 'session', session)
+            frames.append(frame)
+        return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
+    @property
+    def conflicts(self):
+        return [conflict for optimizer in self.optimizers.values() for conflict in optimizer.conflicts]
+
+    def save_schedule(self):
+        """Publie toutes les sessions en une seule transaction (tout ou rien)"""
+        self.publish_report = []
+        schedule = self.generated_schedule
+        if not schedule:
+            return False, "Aucun planning à sauvegarder"
+        try:
+            count, rejections = publish_schedule(schedule)
+            if rejections:
+                self.publish_report = rejections
+                return False, f"❌ Publication refusée : {len(rejections)} conflit(s) avec les examens enregistrés"
+            return True, f"✅ {count} examens sauvegardés ({', '.join(self.periods)})"
+        except Exception as e:
+            return False, f"Erreur: {str(e)}"
+
+
+def build_sessions(periods: dict, department_id: int = None, seed=None, **options) -> SessionBatch:
+    """Pipeline complet des sessions: chargement commun puis génération successive"""
+    batch = SessionBatch(periods, department_id, **options)
+    if batch.load():
+        batch.generate(seed=seed)
+    return batch
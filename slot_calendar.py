@@ -0,0 +1,224 @@
+"""
+Calendrier des créneaux d'examens partagé
+Grille horaire configurable, jours de fermeture et horaires d'ouverture des salles,
+précalculés une seule fois en un index entier de créneaux (aucun datetime reconstruit en boucle)
+"""
+from datetime import datetime, date, time, timedelta
+import numpy as np
+
+# Grille par défaut: (heure de début, durée nominale en minutes)
+DEFAULT_DAILY_SLOTS = [("08:00", 120), ("10:00", 120), ("14:00", 120), ("16:00", 120)]
+
+# Samedi et dimanche
+DEFAULT_CLOSED_WEEKDAYS = (5, 6)
+
+# Horaires d'ouverture appliqués aux salles sans horaire propre
+DEFAULT_ROOM_HOURS = ("08:00", "20:00")
+
+MINUTES_PER_DAY = 24 * 60
+
+
+def to_minutes(value) -> int:
+    """Convertit 'HH:MM', un objet time ou un tuple (h, m) en minutes depuis minuit"""
+    if isinstance(value, time):
+        return value.hour * 60 + value.minute
+    if isinstance(value, str):
+        hours, minutes = value.split(":")[:2]
+        return int(hours) * 60 + int(minutes)
+    hours, minutes = value
+    return int(hours) * 60 + int(minutes)
+
+
+def _hours_minutes(minutes: int):
+    """Inverse de to_minutes, au format tuple (h, m)"""
+    return minutes // 60, minutes % 60
+
+
+class SlotCalendar:
+    """
+    Grille des créneaux d'une période d'examens
+    Chaque créneau est identifié par un entier; les tableaux slot_* sont indexés par ce numéro
+    """
+
+    def __init__(self, start_date: date, end_date: date, daily_slots=None, holidays=None,
+                 closed_weekdays=DEFAULT_CLOSED_WEEKDAYS, room_hours=None):
+        self.start_date = start_date
+        self.end_date = end_date
+        self.origin = datetime.combine(start_date, time.min)
+        self.holidays = set(holidays or [])
+        self.closed_weekdays = set(closed_weekdays or [])
+        self.daily_slots = sorted((to_minutes(start), int(length)) for start, length in (daily_slots or DEFAULT_DAILY_SLOTS))
+
+        default_open, default_close = DEFAULT_ROOM_HOURS
+        self.default_room_hours = (to_minutes(default_open), to_minutes(default_close))
+        self.room_hours = {
+            room_id: (to_minutes(opening), to_minutes(closing))
+            for room_id, (opening, closing) in (room_hours or {}).items()
+        }
+
+        # Jours ouvrés de la période
+        self.days = []
+        current = start_date
+        while current <= end_date:
+            if current.weekday() not in self.closed_weekdays and current not in self.holidays:
+                self.days.append(current)
+            current += timedelta(days=1)
+        self.n_days = len(self.days)
+
+        # Index entier des créneaux
+        day_offsets = np.array([(d - start_date).days for d in self.days], dtype=np.int64)
+        slot_minutes = np.array([m for m, _ in self.daily_slots], dtype=np.int64)
+        slot_lengths = np.array([l for _, l in self.daily_slots], dtype=np.int64)
+        per_day = len(self.daily_slots)
+
+        self.day_offset = day_offsets
+        self.slot_day = np.repeat(np.arange(self.n_days), per_day)
+        self.slot_minute_of_day = np.tile(slot_minutes, self.n_days)
+        self.slot_length = np.tile(slot_lengths, self.n_days)
+        self.slot_start = day_offsets[self.slot_day] * MINUTES_PER_DAY + self.slot_minute_of_day
+        self.n_slots = len(self.slot_start)
+
+        # Portée d'un créneau: jusqu'au créneau suivant du même jour (ou la fin de journée)
+        day_end = (day_offsets[self.slot_day] + 1) * MINUTES_PER_DAY
+        next_start = np.append(self.slot_start[1:], np.iinfo(np.int64).max)
+        same_day = np.append(self.slot_day[1:] == self.slot_day[:-1], False)
+        self.slot_reach = np.where(same_day, next_start, day_end)
+
+        # Conversions calculées une fois
+        self.slot_datetimes = [self.origin + timedelta(minutes=int(m)) for m in self.slot_start]
+        self._slot_lookup = {int(m): s for s, m in enumerate(self.slot_start)}
+        self._day_lookup = {int(offset): idx for idx, offset in enumerate(day_offsets)}
+        self._span_cache = {}
+        self._open_cache = {}
+
+    @classmethod
+    def from_database(cls, start_date: date, end_date: date, rooms=None):
+        """
+        Construit le calendrier depuis la configuration en base
+        (creneaux_examen, jours_fermeture, horaires de lieux_examen); valeurs par défaut sinon
+        """
+        from connection import execute_query
+
+        slot_rows = execute_query("""
+            SELECT heure_debut, duree_minutes
+            FROM creneaux_examen
+            WHERE is_actif = TRUE
+            ORDER BY heure_debut
+        """)
+        if rooms is None:
+            rooms = execute_query("""
+                SELECT id, heure_ouverture, heure_fermeture
+                FROM lieux_examen
+                WHERE is_disponible = TRUE
+            """)
+
+        daily_slots = [(row['heure_debut'], row['duree_minutes']) for row in slot_rows or []]
+        holidays = cls.load_holidays(start_date, end_date)
+        room_hours = {
+            room['id']: (room['heure_ouverture'], room['heure_fermeture'])
+            for room in rooms or []
+            if room.get('heure_ouverture') and room.get('heure_fermeture')
+        }
+        return cls(start_date, end_date, daily_slots=daily_slots or None,
+                   holidays=holidays, room_hours=room_hours)
+
+    @staticmethod
+    def load_holidays(start_date: date, end_date: date) -> list:
+        """Jours de fermeture (jours_fermeture) compris dans la période"""
+        from connection import execute_query
+
+        rows = execute_query("""
+            SELECT jour FROM jours_fermeture
+            WHERE jour BETWEEN %s AND %s
+        """, (start_date, end_date))
+        return [row['jour'] for row in rows or []]
+
+    def with_period(self, start_date: date, end_date: date, holidays=None):
+        """
+        Même configuration (grille, fermetures, horaires des salles) sur une autre période
+        holidays: jours de fermeture couvrant la nouvelle période (ceux du calendrier sinon,
+        qui ne couvrent que sa propre période)
+        """
+        return SlotCalendar(
+            start_date, end_date,
+            daily_slots=[(_hours_minutes(start), length) for start, length in self.daily_slots],
+            holidays=self.holidays if holidays is None else holidays,
+            closed_weekdays=self.closed_weekdays,
+            room_hours={
+                room_id: (_hours_minutes(opening), _hours_minutes(closing))
+                for room_id, (opening, closing) in self.room_hours.items()
+            }
+        )
+
+    # ---------- Conversions ----------
+
+    def minutes(self, moment: datetime) -> int:
+        """Minutes écoulées depuis l'origine du calendrier"""
+        return int((moment - self.origin).total_seconds() // 60)
+
+    def slot_of(self, moment: datetime) -> int:
+        """Numéro du créneau commençant à cet instant, -1 s'il est hors grille"""
+        return self._slot_lookup.get(self.minutes(moment), -1)
+
+    def day_of(self, minutes: int) -> int:
+        """Numéro du jour ouvré contenant cet instant (en minutes), -1 si jour fermé"""
+        return self._day_lookup.get(int(minutes) // MINUTES_PER_DAY, -1)
+
+    def to_datetime(self, slot: int) -> datetime:
+        """Début du créneau (précalculé)"""
+        return self.slot_datetimes[slot]
+
+    # ---------- Occupation ----------
+
+    def span_end(self, duration: int) -> np.ndarray:
+        """
+        Pour chaque créneau s, fin exclusive des créneaux couverts par un examen de cette durée:
+        l'examen commençant en s occupe les créneaux [s, span_end[s])
+        """
+        duration = int(duration)
+        ends = self._span_cache.get(duration)
+        if ends is None:
+            ends = np.searchsorted(self.slot_start, self.slot_start + duration, side='left')
+            self._span_cache[duration] = ends
+        return ends
+
+    def covered_slots(self, slot: int, duration: int) -> slice:
+        """Créneaux occupés par un examen commençant au créneau slot"""
+        return slice(slot, int(self.span_end(duration)[slot]))
+
+    def slots_overlapping(self, start_minutes: int, end_minutes: int) -> np.ndarray:
+        """
+        Créneaux à bloquer pour un examen déjà planifié hors grille [start, end)
+        Estimation prudente: un créneau couvre l'intervalle jusqu'au créneau suivant
+        """
+        return np.nonzero((self.slot_start < end_minutes) & (self.slot_reach > start_minutes))[0]
+
+    def mark_interval(self, busy: np.ndarray, row: int, start_minutes: int, end_minutes: int):
+        """Reporte un examen existant dans une matrice d'occupation (lignes x créneaux)"""
+        busy[row, self.slots_overlapping(start_minutes, end_minutes)] = True
+
+    def free_starts(self, busy: np.ndarray, duration: int) -> np.ndarray:
+        """
+        Créneaux de départ possibles pour un examen de cette durée
+        busy: occupation (créneaux) ou (lignes x créneaux); calcul vectorisé par sommes cumulées
+        """
+        ends = self.span_end(duration)
+        counts = np.cumsum(busy, axis=-1, dtype=np.int32)
+        counts = np.concatenate([np.zeros(busy.shape[:-1] + (1,), dtype=np.int32), counts], axis=-1)
+        return (counts[..., ends] - counts[..., :-1]) == 0
+
+    def open_mask(self, room_id, duration: int) -> np.ndarray:
+        """Créneaux où la salle est ouverte pendant toute la durée de l'examen"""
+        key = (room_id, int(duration))
+        mask = self._open_cache.get(key)
+        if mask is None:
+            opening, closing = self.room_hours.get(room_id, self.default_room_hours)
+            mask = (self.slot_minute_of_day >= opening) & (self.slot_minute_of_day + int(duration) <= closing)
+            self._open_cache[key] = mask
+        return mask
+
+    def open_matrix(self, room_ids, duration: int) -> np.ndarray:
+        """Masque d'ouverture (salles x créneaux)"""
+        if not len(room_ids):
+            return np.zeros((0, self.n_slots), dtype=bool)
+        return np.vstack([self.open_mask(room_id, duration) for room_id in room_ids])
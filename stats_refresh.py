@@ -0,0 +1,78 @@
+"""
+Rafraîchissement de la vue matérialisée v_stats_departement (bdd.sql, PARTIE 21)
+REFRESH ... CONCURRENTLY: les tableaux de bord lisent l'ancienne version pendant le calcul
+Déclenché après publication d'un planning ou validation d'examens (request_refresh, non bloquant)
+et périodiquement par un thread du processus Streamlit (start_refresh_timer)
+Les demandes rapprochées sont regroupées: au plus un rafraîchissement en cours et un en attente
+"""
+import threading
+import time
+
+import psycopg2
+
+from connection import SimpleConnection
+
+# Période du rafraîchissement automatique (secondes)
+REFRESH_INTERVAL = 600
+
+_lock = threading.Lock()
+_running = False
+_pending = False
+_timer = None
+
+
+def refresh_department_stats():
+    """Rafraîchit la vue (appel bloquant); retourne l'horodatage du rafraîchissement ou None"""
+    conn = SimpleConnection.get_connection()
+    if not conn:
+        return None
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT rafraichir_stats_departement()")
+            refreshed_at = cursor.fetchone()[0]
+        conn.commit()
+        return refreshed_at
+    except psycopg2.Error as e:
+        conn.rollback()
+        print(f"Erreur dans refresh_department_stats: {e}")
+        return None
+    finally:
+        conn.close()
+
+
+def _refresh_worker():
+    global _running, _pending
+    while True:
+        refresh_department_stats()
+        with _lock:
+            if not _pending:
+                _running = False
+                return
+            _pending = False
+
+
+def request_refresh():
+    """Demande un rafraîchissement en arrière-plan; sans effet si un autre est déjà en attente"""
+    global _running, _pending
+    with _lock:
+        if _running:
+            _pending = True
+            return
+        _running = True
+    threading.Thread(target=_refresh_worker, name="stats-departement", daemon=True).start()
+
+
+def _timer_loop(interval: int):
+    while True:
+        time.sleep(interval)
+        request_refresh()
+
+
+def start_refresh_timer(interval: int = REFRESH_INTERVAL):
+    """Lance le rafraîchissement périodique (une seule fois par processus, sans effet ensuite)"""
+    global _timer
+    with _lock:
+        if _timer is not None:
+            return
+        _timer = threading.Thread(target=_timer_loop, args=(interval,), name="stats-departement-timer", daemon=True)
+        _timer.start()
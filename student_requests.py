@@ -2,10 +2,12 @@
 Gestion des demandes de modification d'examens pour les étudiants
 """
 import streamlit as st
+import numpy as np
 import pandas as pd
 from datetime import datetime, timedelta
 from queries import ExamQueries, UserQueries
 from connection import execute_query
+from slot_calendar import SlotCalendar
 
 class StudentRequests:
     """Gestion des demandes étudiantes"""
@@ -13,46 +15,12 @@ class StudentRequests:
     @staticmethod
     def detect_student_conflicts(student_id: int):
         """
-        Détecte les conflits personnels de l'étudiant
+        Détecte les conflits personnels de l'étudiant (plusieurs examens le même jour, moins de 2h
+        entre deux débuts d'examens, consécutifs ou non), à partir de son calendrier (conflits_etudiant)
         """
         try:
-            query = """
-            -- Conflit: Plus d'un examen le même jour
-            SELECT 
-                'Conflit horaire' as type_conflit,
-                'Vous avez ' || COUNT(DISTINCT e.id) || ' examens le ' || DATE(e.date_heure) as details,
-                'CRITIQUE' as severite,
-                ARRAY_AGG(e.id) as examens_ids
-            FROM inscriptions i
-            JOIN examens e ON i.module_id = e.module_id
-            WHERE i.etudiant_id = %s
-                AND e.statut IN ('Planifie', 'Confirme')
-            GROUP BY DATE(e.date_heure)
-            HAVING COUNT(DISTINCT e.id) > 1
-            
-            UNION ALL
-            
-            -- Conflit: Pas assez de temps entre deux examens (< 2h)
-            SELECT 
-                'Intervalle trop court' as type_conflit,
-                'Seulement ' || EXTRACT(HOUR FROM (e2.date_heure - e1.date_heure)) || 'h entre ' || 
-                m1.nom || ' et ' || m2.nom as details,
-                'ÉLEVÉ' as severite,
-                ARRAY[e1.id, e2.id] as examens_ids
-            FROM inscriptions i1
-            JOIN examens e1 ON i1.module_id = e1.module_id
-            JOIN modules m1 ON e1.module_id = m1.id
-            JOIN inscriptions i2 ON i1.etudiant_id = i2.etudiant_id
-            JOIN examens e2 ON i2.module_id = e2.module_id
-            JOIN modules m2 ON e2.module_id = m2.id
-            WHERE i1.etudiant_id = %s
-                AND e1.id < e2.id
-                AND e1.date_heure::date = e2.date_heure::date
-                AND e2.date_heure - e1.date_heure BETWEEN INTERVAL '0 minutes' AND INTERVAL '120 minutes'
-                AND e1.statut IN ('Planifie', 'Confirme')
-                AND e2.statut IN ('Planifie', 'Confirme')
-            """
-            return execute_query(query, (student_id, student_id)) or []
+            query = "SELECT * FROM conflits_etudiant(%s)"
+            return execute_query(query, (student_id,)) or []
         except Exception as e:
             print(f"Erreur détection conflits étudiant: {e}")
             return []
@@ -167,9 +135,11 @@ class StudentRequests:
         return execute_query(query, (student_id,)) or []
     
     @staticmethod
-    def get_available_alternative_slots(student_id: int, exam_id: int):
+    def get_available_alternative_slots(student_id: int, exam_id: int, days_ahead: int = 7, limit: int = 10):
         """
         Trouve des créneaux alternatifs pour un examen
+        Même grille que l'optimiseur: créneaux configurés, jours fermés et horaires des salles
+        Seules les salles dont la capacité couvre l'effectif de l'examen (ou de sa partie) sont proposées
         """
         try:
             # Récupérer l'examen original
@@ -178,9 +148,14 @@ class StudentRequests:
                 e.date_heure,
                 e.duree_minutes,
                 e.module_id,
-                m.formation_id
+                m.formation_id,
+                CASE WHEN e.groupe_examen IS NULL
+                     THEN COALESCE(s.nb_inscrits, 0)
+                     ELSE e.max_etudiants END AS nb_etudiants
             FROM examens e
             JOIN modules m ON e.module_id = m.id
+            LEFT JOIN v_inscrits_module s ON s.module_id = e.module_id
+                AND s.session = session_examen(e.type_examen)
             WHERE e.id = %s
             """
             exam = execute_query(exam_query, (exam_id,))
@@ -189,53 +164,79 @@ class StudentRequests:
                 return []
             
             exam = exam[0]
+            start_day = exam['date_heure'].date()
+            end_day = start_day + timedelta(days=days_ahead)
+            duration = exam['duree_minutes']
+            
+            rooms = execute_query("""
+                SELECT id, nom, capacite, heure_ouverture, heure_fermeture
+                FROM lieux_examen
+                WHERE is_disponible = TRUE
+                    AND capacite >= %s
+                ORDER BY capacite DESC
+            """, (int(exam['nb_etudiants'] or 0),)) or []
+            if not rooms:
+                return []
+            calendar = SlotCalendar.from_database(start_day, end_day, rooms)
             
-            # Trouver des créneaux disponibles dans les 7 jours suivants
-            query = """
-            WITH examens_futurs AS (
-                SELECT date_heure, duree_minutes
-                FROM examens 
-                WHERE statut IN ('Planifie', 'Confirme')
-                    AND date_heure >= %s
-                    AND date_heure <= %s + INTERVAL '7 days'
-            ),
-            creneaux AS (
+            # Examens de la fenêtre: occupation des salles et jours déjà pris par l'étudiant
+            exams = execute_query("""
                 SELECT 
-                    %s + (n || ' hours')::INTERVAL as debut_creneau,
-                    %s + (n || ' hours')::INTERVAL + (%s || ' minutes')::INTERVAL as fin_creneau
-                FROM generate_series(8, 18, 2) n  -- De 8h à 18h par pas de 2h
-            ),
-            salles_disponibles AS (
-                SELECT l.id, l.nom, l.capacite
-                FROM lieux_examen l
-                WHERE l.is_disponible = TRUE
-            )
-            SELECT 
-                c.debut_creneau,
-                c.fin_creneau,
-                sd.nom as salle_suggeree,
-                sd.id as salle_id,
-                sd.capacite,
-                NOT EXISTS (
-                    SELECT 1 FROM examens_futurs ef
-                    WHERE NOT (ef.date_heure + (ef.duree_minutes || ' minutes')::INTERVAL <= c.debut_creneau
-                           OR ef.date_heure >= c.fin_creneau)
-                ) as creneau_libre
-            FROM creneaux c
-            CROSS JOIN salles_disponibles sd
-            WHERE c.debut_creneau::time BETWEEN '08:00' AND '18:00'
-                AND EXTRACT(DOW FROM c.debut_creneau) BETWEEN 1 AND 5  -- Lundi à Vendredi
-            ORDER BY c.debut_creneau, sd.capacite DESC
-            LIMIT 10
-            """
+                    e.salle_id,
+                    e.date_heure,
+                    e.duree_minutes,
+                    EXISTS (
+                        SELECT 1 FROM inscriptions i
+                        WHERE i.module_id = e.module_id
+                            AND i.etudiant_id = %s
+                            AND i.statut = 'Inscrit'
+                    ) AS concerne_etudiant
+                FROM examens e
+                WHERE e.statut IN ('Planifie', 'Confirme')
+                    AND e.id <> %s
+                    AND e.date_heure >= %s
+                    AND e.date_heure < %s::date + 1
+            """, (student_id, exam_id, start_day, end_day)) or []
             
-            return execute_query(
-                query, 
-                (exam['date_heure'], exam['date_heure'], 
-                 exam['date_heure'].date(), exam['date_heure'].date(),
-                 exam['duree_minutes'])
+            room_pos = {room['id']: idx for idx, room in enumerate(rooms)}
+            room_busy = np.zeros((len(rooms), calendar.n_slots), dtype=bool)
+            student_days = np.zeros(calendar.n_days, dtype=bool)
+            for other in exams:
+                start = calendar.minutes(other['date_heure'])
+                end = start + int(other['duree_minutes'] or 0)
+                if other['salle_id'] in room_pos:
+                    calendar.mark_interval(room_busy, room_pos[other['salle_id']], start, end)
+                day = calendar.day_of(start)
+                if other['concerne_etudiant'] and day >= 0:
+                    student_days[day] = True
+            
+            free = (
+                calendar.free_starts(room_busy, duration)
+                & calendar.open_matrix(list(room_pos), duration)
+                & ~student_days[calendar.slot_day]
             )
+            original_slot = calendar.slot_of(exam['date_heure'])
+            if original_slot >= 0:
+                free[:, original_slot] = False
+            
+            # Parcours créneau par créneau, salles par capacité décroissante
+            alternatives = []
+            for slot, room_idx in np.argwhere(free.T):
+                debut = calendar.to_datetime(slot)
+                room = rooms[room_idx]
+                alternatives.append({
+                    'debut_creneau': debut,
+                    'fin_creneau': debut + timedelta(minutes=duration),
+                    'salle_suggeree': room['nom'],
+                    'salle_id': room['id'],
+                    'capacite': room['capacite'],
+                    'creneau_libre': True
+                })
+                if len(alternatives) >= limit:
+                    break
+            
+            return alternatives
             
         except Exception as e:
-            print(f"Erreur recherche créneaux: {e}")
+            st.error(f"Erreur recherche créneaux: {e}")
             return []
\ No newline at end of file
@@ -0,0 +1,365 @@
+"""
+Générateur déterministe de données universitaires synthétiques (tests de performance)
+Départements, formations, modules, professeurs, étudiants, salles et inscriptions à l'échelle voulue,
+copiés en flux (COPY) dans exam_platform ou chargés directement dans le modèle en mémoire de l'optimiseur
+Même graine et même année universitaire = mêmes données, à toutes les échelles
+(l'année est fixe par défaut: rien ne dépend de la date du jour)
+
+Exemple:
+    python synthetic_data.py --preset production --seed 42 --replace
+"""
+import argparse
+import csv
+import io
+import time
+from datetime import date, timedelta
+
+import numpy as np
+
+# Année universitaire par défaut (fixe, pour que deux exécutions restent comparables)
+DEFAULT_ACADEMIC_YEAR = 2026
+# Période d'examens par défaut: quatre semaines à partir du 1er juin
+DEFAULT_PERIOD_DAYS = 28
+
+# Tailles prédéfinies; 'production' correspond à une grande faculté (50 000 étudiants, 5 000 modules)
+PRESETS = {
+    'petit': dict(departments=3, formations_per_department=3, modules_per_formation=6,
+                  students=500, rooms=25, professors_per_department=12),
+    'moyen': dict(departments=7, formations_per_department=8, modules_per_formation=8,
+                  students=5000, rooms=80, professors_per_department=30),
+    'production': dict(departments=25, formations_per_department=20, modules_per_formation=10,
+                       students=50000, rooms=400, professors_per_department=60),
+}
+
+LAST_NAMES = ["Benali", "Haddad", "Mansouri", "Bouzid", "Cherif", "Khelifi", "Saidi", "Brahimi",
+              "Meziane", "Amrani", "Belkacem", "Toumi", "Rahmani", "Ziani", "Hamidi", "Larbi"]
+FIRST_NAMES = ["Amine", "Yasmine", "Karim", "Sara", "Walid", "Imane", "Nassim", "Lina",
+               "Rachid", "Nour", "Sofiane", "Meriem", "Ilyes", "Amel", "Hichem", "Ines"]
+GRADES = ["Professeur", "Maitre Conferences", "Charge Cours", "Assistant"]
+
+# Types de salles: (type, part des salles, capacité min, capacité max, préfixe)
+ROOM_TYPES = [
+    ("Amphitheatre", 0.10, 200, 500, "AMPHI"),
+    ("Salle de cours", 0.60, 40, 80, "SAL"),
+    ("Laboratoire", 0.20, 20, 30, "LAB"),
+    ("Salle specialisee", 0.10, 30, 60, "SPE"),
+]
+
+# Ordre de copie (clés étrangères) et colonnes copiées
+TABLE_COLUMNS = {
+    'departements': ['id', 'code', 'nom'],
+    'formations': ['id', 'code', 'nom', 'departement_id', 'niveau', 'nb_modules', 'annee_academique'],
+    'professeurs': ['id', 'matricule', 'nom', 'prenom', 'grade', 'departement_id', 'email', 'heures_max'],
+    'modules': ['id', 'code', 'nom', 'credits', 'formation_id', 'semestre', 'volume_horaire', 'responsable_id'],
+    'etudiants': ['id', 'matricule', 'nom', 'prenom', 'email_univ', 'formation_id', 'annee_inscription'],
+    'lieux_examen': ['id', 'code', 'nom', 'capacite', 'type', 'batiment', 'etage'],
+    'inscriptions': ['etudiant_id', 'module_id', 'annee_academique', 'session', 'statut'],
+}
+
+
+def default_period(academic_year: int = DEFAULT_ACADEMIC_YEAR) -> tuple:
+    """Période d'examens par défaut (début, fin) de l'année universitaire"""
+    start_date = date(academic_year, 6, 1)
+    return start_date, start_date + timedelta(days=DEFAULT_PERIOD_DAYS - 1)
+
+
+def exam_duration(credits: int) -> int:
+    """Durée d'examen selon les crédits (même règle que load_optimization_data)"""
+    if credits >= 6:
+        return 180
+    if credits >= 4:
+        return 120
+    return 90
+
+
+class SyntheticUniversity:
+    """
+    Jeu de données synthétique, entièrement tiré d'une graine
+    enrolment_density: probabilité qu'un étudiant soit inscrit à chaque module de sa formation
+    elective_rate: probabilité d'une option dans une autre formation du département (étudiants partagés)
+    """
+
+    def __init__(self, departments=7, formations_per_department=8, modules_per_formation=8, students=5000,
+                 rooms=80, professors_per_department=30, enrolment_density=0.9, elective_rate=0.1,
+                 seed=42, academic_year=DEFAULT_ACADEMIC_YEAR):
+        self.seed = seed
+        self.academic_year = int(academic_year)
+        rng = np.random.default_rng(seed)
+
+        # Départements et formations
+        self.n_departments = departments
+        self.n_formations = departments * formations_per_department
+        self.formation_department = np.repeat(np.arange(1, departments + 1), formations_per_department)
+
+        # Professeurs (ids contigus par département)
+        self.n_professors = departments * professors_per_department
+        self.professor_department = np.repeat(np.arange(1, departments + 1), professors_per_department)
+
+        # Modules (ids contigus par formation), responsable tiré dans le département
+        self.modules_per_formation = modules_per_formation
+        self.n_modules = self.n_formations * modules_per_formation
+        self.module_formation = np.repeat(np.arange(1, self.n_formations + 1), modules_per_formation)
+        self.module_credits = rng.integers(2, 7, self.n_modules)
+        department_of_module = self.formation_department[self.module_formation - 1]
+        self.module_responsible = (
+            (department_of_module - 1) * professors_per_department
+            + rng.integers(0, professors_per_department, self.n_modules) + 1
+        )
+
+        # Étudiants: effectifs de formation inégaux (poids gamma), formations triées par id
+        weights = rng.gamma(2.0, 1.0, self.n_formations)
+        sizes = rng.multinomial(students, weights / weights.sum())
+        self.n_students = students
+        self.student_formation = np.repeat(np.arange(1, self.n_formations + 1), sizes)
+        self.student_year = rng.integers(self.academic_year - 3, self.academic_year + 1, students)
+
+        # Inscriptions: modules de la formation (densité), plus une option éventuelle dans le département
+        student_ids, module_ids = [], []
+        first_student = np.concatenate([[0], np.cumsum(sizes)])
+        for formation in range(self.n_formations):
+            count = sizes[formation]
+            if not count:
+                continue
+            taken = rng.random((count, modules_per_formation)) < enrolment_density
+            rows, cols = np.nonzero(taken)
+            student_ids.append(first_student[formation] + rows + 1)
+            module_ids.append(formation * modules_per_formation + cols + 1)
+
+        elective = np.flatnonzero(rng.random(students) < elective_rate) if formations_per_department > 1 else []
+        if len(elective):
+            own = self.student_formation[elective] - 1
+            department = self.formation_department[own] - 1
+            # Autre formation du même département, puis un module de cette formation
+            offset = rng.integers(1, formations_per_department, len(elective))
+            other = department * formations_per_department + (own % formations_per_department + offset) % formations_per_department
+            student_ids.append(elective + 1)
+            module_ids.append(other * modules_per_formation + rng.integers(0, modules_per_formation, len(elective)) + 1)
+
+        self.enrolment_student = np.concatenate(student_ids) if student_ids else np.zeros(0, dtype=np.int64)
+        self.enrolment_module = np.concatenate(module_ids) if module_ids else np.zeros(0, dtype=np.int64)
+
+        # Salles
+        shares = np.array([share for _, share, _, _, _ in ROOM_TYPES])
+        type_counts = rng.multinomial(rooms, shares / shares.sum())
+        self.room_type = np.repeat(np.arange(len(ROOM_TYPES)), type_counts)
+        self.room_capacity = np.array([
+            rng.integers(ROOM_TYPES[t][2], ROOM_TYPES[t][3] + 1) for t in self.room_type
+        ], dtype=np.int64)
+        self.n_rooms = rooms
+
+    @classmethod
+    def from_preset(cls, name: str, **overrides):
+        """Jeu de données d'une taille prédéfinie (PRESETS), paramètres ajustables"""
+        return cls(**dict(PRESETS[name], **overrides))
+
+    def summary(self) -> dict:
+        """Volumes générés"""
+        return {
+            'departements': self.n_departments,
+            'formations': self.n_formations,
+            'modules': self.n_modules,
+            'professeurs': self.n_professors,
+            'etudiants': self.n_students,
+            'salles': self.n_rooms,
+            'inscriptions': len(self.enrolment_student),
+        }
+
+    # ---------- Lignes par table ----------
+
+    def rows(self, table: str):
+        """Lignes d'une table dans l'ordre de TABLE_COLUMNS[table] (générateur)"""
+        return getattr(self, f"_rows_{table}")()
+
+    def _rows_departements(self):
+        for d in range(1, self.n_departments + 1):
+            yield d, f"D{d:03d}", f"Département {d}"
+
+    def _rows_formations(self):
+        for f in range(1, self.n_formations + 1):
+            niveau = "Master" if f % 3 == 0 else "Licence"
+            yield (f, f"F{f:05d}", f"{niveau} {f}", int(self.formation_department[f - 1]), niveau,
+                   self.modules_per_formation, self.academic_year)
+
+    def _rows_professeurs(self):
+        for p in range(1, self.n_professors + 1):
+            yield (p, f"PROF-{p:06d}", LAST_NAMES[p % len(LAST_NAMES)], FIRST_NAMES[(p // 7) % len(FIRST_NAMES)],
+                   GRADES[p % len(GRADES)], int(self.professor_department[p - 1]), f"prof{p}@univ.dz", 192)
+
+    def _rows_modules(self):
+        for m in range(1, self.n_modules + 1):
+            yield (m, f"MOD-{m:06d}", f"Module {m}", int(self.module_credits[m - 1]),
+                   int(self.module_formation[m - 1]), 1 + m % 6, 30 + m % 30, int(self.module_responsible[m - 1]))
+
+    def _rows_etudiants(self):
+        for s in range(1, self.n_students + 1):
+            yield (s, f"ETU-{s:07d}", LAST_NAMES[(s // 3) % len(LAST_NAMES)], FIRST_NAMES[s % len(FIRST_NAMES)],
+                   f"etu{s}@univ.dz", int(self.student_formation[s - 1]), int(self.student_year[s - 1]))
+
+    def _rows_lieux_examen(self):
+        for r in range(1, self.n_rooms + 1):
+            room_type, _, _, _, prefix = ROOM_TYPES[self.room_type[r - 1]]
+            yield (r, f"{prefix}-{r:04d}", f"{room_type} {r}", int(self.room_capacity[r - 1]), room_type,
+                   f"Batiment {chr(65 + r % 6)}", r % 4)
+
+    def _rows_inscriptions(self):
+        for student_id, module_id in zip(self.enrolment_student.tolist(), self.enrolment_module.tolist()):
+            yield student_id, module_id, self.academic_year, 'Principale', 'Inscrit'
+
+    # ---------- Copie en base ----------
+
+    def copy_to_database(self, conn, replace: bool = True) -> dict:
+        """
+        Copie toutes les tables par COPY en flux (aucun fichier intermédiaire), en une transaction
+        replace: vide d'abord les tables (TRUNCATE ... CASCADE vide aussi examens, users, etc.)
+        Retourne le nombre de lignes copiées et la durée par table
+        """
+        report = {}
+        with conn.cursor() as cursor:
+            if replace:
+                cursor.execute(f"TRUNCATE {', '.join(TABLE_COLUMNS)} RESTART IDENTITY CASCADE")
+            for table, columns in TABLE_COLUMNS.items():
+                start_time = time.time()
+                stream = _CsvStream(self.rows(table))
+                cursor.copy_expert(
+                    f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)",
+                    stream
+                )
+                report[table] = {'lignes': stream.count, 'duree': round(time.time() - start_time, 2)}
+
+            # Les identifiants sont fournis: réaligner les séquences
+            for table in TABLE_COLUMNS:
+                cursor.execute(
+                    f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), COALESCE(MAX(id), 1)) FROM {table}"
+                )
+        conn.commit()
+        return report
+
+    # ---------- Modèle en mémoire ----------
+
+    def optimizer_data(self) -> dict:
+        """
+        Données au format chargé par ExamScheduleOptimizer (modules comme load_optimization_data,
+        salles, professeurs), sans base de données
+        """
+        order = np.lexsort((self.enrolment_student, self.enrolment_module))
+        modules_sorted = self.enrolment_module[order]
+        students_sorted = self.enrolment_student[order]
+        bounds = np.searchsorted(modules_sorted, np.arange(1, self.n_modules + 2))
+
+        modules = []
+        for m in range(1, self.n_modules + 1):
+            student_ids = students_sorted[bounds[m - 1]:bounds[m]].tolist()
+            if not student_ids:
+                continue
+            formation = int(self.module_formation[m - 1])
+            credits = int(self.module_credits[m - 1])
+            modules.append({
+                'module_id': m,
+                'module_code': f"MOD-{m:06d}",
+                'module_name': f"Module {m}",
+                'credits': credits,
+                'formation_id': formation,
+                'formation_name': f"{'Master' if formation % 3 == 0 else 'Licence'} {formation}",
+                'departement_id': int(self.formation_department[formation - 1]),
+                'professor_id': int(self.module_responsible[m - 1]),
+                'student_count': len(student_ids),
+                'student_ids': student_ids,
+                'duration_minutes': exam_duration(credits),
+            })
+
+        rooms = [
+            {'id': row[0], 'code': row[1], 'nom': row[2], 'capacite': row[3], 'type': row[4], 'batiment': row[5]}
+            for row in self._rows_lieux_examen()
+        ]
+        rooms.sort(key=lambda room: room['capacite'], reverse=True)
+        professors = [
+            {'id': row[0], 'nom': row[2], 'prenom': row[3], 'departement_id': row[5], 'heures_max': row[7]}
+            for row in self._rows_professeurs()
+        ]
+        return {'modules_data': modules, 'rooms': rooms, 'professors': professors}
+
+    def to_optimizer(self, start_date: date = None, end_date: date = None, calendar=None, **optimizer_options):
+        """Optimiseur prêt à générer (équivalent de load_data) sur la période donnée"""
+        from exam_optimizer import ExamScheduleOptimizer
+        from slot_calendar import SlotCalendar
+
+        if start_date is None:
+            start_date, default_end = default_period(self.academic_year)
+            end_date = end_date or default_end
+        end_date = end_date or start_date + timedelta(days=DEFAULT_PERIOD_DAYS - 1)
+        optimizer = ExamScheduleOptimizer(
+            start_date, end_date,
+            calendar=calendar or SlotCalendar(start_date, end_date),
+            **optimizer_options
+        )
+        data = self.optimizer_data()
+        optimizer.modules_data = data['modules_data']
+        optimizer.rooms = data['rooms']
+        optimizer.professors = data['professors']
+        optimizer.existing_exams = []
+        optimizer.unavailabilities = []
+        return optimizer
+
+
+class _CsvStream(io.TextIOBase):
+    """Fichier en lecture seule qui produit le CSV de lignes à la demande (pour COPY FROM STDIN)"""
+
+    def __init__(self, rows):
+        self._rows = iter(rows)
+        self._buffer = ""
+        self._line = io.StringIO()
+        self._writer = csv.writer(self._line, lineterminator='\n')
+        self.count = 0
+
+    def readable(self):
+        return True
+
+    def read(self, size=-1):
+        while size < 0 or len(self._buffer) < size:
+            row = next(self._rows, None)
+            if row is None:
+                break
+            self._line.seek(0)
+            self._line.truncate()
+            self._writer.writerow(['' if value is None else value for value in row])
+            self._buffer += self._line.getvalue()
+            self.count += 1
+        if size < 0:
+            size = len(self._buffer)
+        chunk, self._buffer = self._buffer[:size], self._buffer[size:]
+        return chunk
+
+    def readline(self, size=-1):
+        return self.read(size)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Génère des données synthétiques dans exam_platform")
+    parser.add_argument("--preset", choices=list(PRESETS), default="moyen")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--academic-year", type=int, default=DEFAULT_ACADEMIC_YEAR, help="Année universitaire")
+    parser.add_argument("--students", type=int, help="Nombre d'étudiants (remplace le preset)")
+    parser.add_argument("--density", type=float, default=0.9, help="Densité d'inscription aux modules de la formation")
+    parser.add_argument("--replace", action="store_true", help="Vider les tables avant la copie")
+    args = parser.parse_args()
+
+    overrides = {'seed': args.seed, 'enrolment_density': args.density, 'academic_year': args.academic_year}
+    if args.students:
+        overrides['students'] = args.students
+    university = SyntheticUniversity.from_preset(args.preset, **overrides)
+    print(f"🎲 Données générées: {university.summary()}")
+
+    from connection import SimpleConnection
+    conn = SimpleConnection.get_connection()
+    if not conn:
+        print("❌ La connexion a échoué.")
+        return
+    try:
+        for table, stats in university.copy_to_database(conn, replace=args.replace).items():
+            print(f"   → {table}: {stats['lignes']} lignes en {stats['duree']}s")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,20 @@
+"""
+Données communes des tests: petite université synthétique (synthetic_data) et planning généré
+Aucune base de données n'est nécessaire
+"""
+import pytest
+
+from synthetic_data import SyntheticUniversity
+
+
+@pytest.fixture(scope="module")
+def university():
+    return SyntheticUniversity.from_preset('petit', seed=7)
+
+
+@pytest.fixture
+def optimizer(university):
+    """Optimiseur chargé avec les données synthétiques et planning construit (sans amélioration)"""
+    optimizer = university.to_optimizer()
+    optimizer.generate_schedule(seed=1)
+    return optimizer
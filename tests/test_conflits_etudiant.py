@@ -0,0 +1,76 @@
+"""
+conflits_etudiant (bdd.sql, PARTIE 22): chaque examen est apparié à tous les examens du même jour
+commencés dans les 120 minutes précédentes, pas seulement à son prédécesseur immédiat
+La structure de la requête est contrôlée par analyse syntaxique (pglast); son exécution sur le cas
+08:00 / 09:00 / 10:00 nécessite un serveur PostgreSQL (paramètres de connection.py), sinon elle est ignorée
+"""
+import os
+import re
+
+import pytest
+
+BDD_SQL = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "bdd.sql")
+
+# Calendrier de l'étudiant (colonnes de calendrier_etudiant): trois examens à une heure d'écart, un le lendemain
+CALENDAR = """(VALUES
+    (1, 'Analyse'::VARCHAR, TIMESTAMP '2026-06-01 08:00', TIMESTAMP '2026-06-01 09:00', ARRAY[11]),
+    (2, 'Algèbre'::VARCHAR, TIMESTAMP '2026-06-01 09:00', TIMESTAMP '2026-06-01 10:00', ARRAY[12]),
+    (3, 'Physique'::VARCHAR, TIMESTAMP '2026-06-01 10:00', TIMESTAMP '2026-06-01 11:00', ARRAY[13, 14]),
+    (4, 'Chimie'::VARCHAR, TIMESTAMP '2026-06-02 08:00', TIMESTAMP '2026-06-02 09:00', ARRAY[15])
+) AS c(module_id, module_nom, date_heure, date_fin, examens_ids)"""
+
+
+def _function_body():
+    """Corps SQL de la dernière définition de conflits_etudiant"""
+    with open(BDD_SQL, encoding='utf-8') as f:
+        source = f.read()
+    definitions = re.findall(r"CREATE OR REPLACE FUNCTION conflits_etudiant\(.*?\$\$ LANGUAGE sql STABLE;", source, re.S)
+    assert definitions, "conflits_etudiant introuvable dans bdd.sql"
+    return definitions[-1], re.search(r"AS \$\$(.*?)\$\$", definitions[-1], re.S).group(1)
+
+
+def test_short_gap_join_covers_the_whole_window():
+    pglast = pytest.importorskip("pglast")
+    from pglast.stream import RawStream
+
+    definition, body = _function_body()
+    pglast.parse_sql(definition)
+    query = pglast.parse_sql(body)[0].stmt
+    assert 'LAG(' not in body.upper()
+
+    join = query.rarg.fromClause[0]
+    assert RawStream()(join.quals) == (
+        "a.jour = p.jour AND a.rang_jour < p.rang_jour"
+        " AND a.date_heure >= p.date_heure - CAST('120 minutes' AS interval)"
+    )
+
+
+@pytest.fixture
+def cursor():
+    psycopg2 = pytest.importorskip("psycopg2")
+    try:
+        conn = psycopg2.connect(dbname="exam_platform", user="postgres", password="postgres",
+                                host="localhost", port="5432", connect_timeout=3)
+    except psycopg2.OperationalError:
+        pytest.skip("serveur PostgreSQL indisponible")
+    try:
+        with conn.cursor() as cur:
+            yield cur
+    finally:
+        conn.rollback()
+        conn.close()
+
+
+def test_every_pair_within_two_hours_is_reported(cursor):
+    _, body = _function_body()
+    query = body.replace("calendrier_etudiant(p_etudiant_id) c", CALENDAR).strip().rstrip(';')
+    cursor.execute(query)
+    rows = cursor.fetchall()
+
+    same_day = [row for row in rows if row[0] == 'Conflit horaire']
+    assert len(same_day) == 1
+    assert sorted(same_day[0][3]) == [11, 12, 13]
+
+    short_gaps = sorted(tuple(row[3]) for row in rows if row[0] == 'Intervalle trop court')
+    # 08:00-10:00 est signalé (il échappait à la comparaison avec le seul prédécesseur)
+    assert short_gaps == [(11, 12), (11, 13), (12, 13)]
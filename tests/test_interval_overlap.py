@@ -0,0 +1,84 @@
+"""
+interval_overlap: find_overlaps et OverlapIndex comparés à une énumération exhaustive des paires
+"""
+from datetime import datetime, timedelta
+from itertools import combinations
+
+import numpy as np
+import pytest
+
+from interval_overlap import (
+    RESOURCE_KINDS, OverlapIndex, exam_intervals, find_overlaps, from_minutes, to_minutes
+)
+
+
+def _random_intervals(rng, n=300, entities=12):
+    """Intervalles (type, ressource, début, fin, examen) resserrés pour provoquer des chevauchements"""
+    base = to_minutes(datetime(2026, 6, 1, 8, 0))
+    kinds = list(RESOURCE_KINDS)
+    rows = []
+    for exam_id in range(1, n + 1):
+        start = base + 15 * int(rng.integers(0, 80))
+        duration = 30 * int(rng.integers(1, 7))
+        rows.append((kinds[int(rng.integers(len(kinds)))], int(rng.integers(entities)), start, start + duration, exam_id))
+    return rows
+
+
+def _brute_force(rows):
+    pairs = set()
+    for a, b in combinations(rows, 2):
+        if a[:2] == b[:2] and a[4] != b[4] and a[2] < b[3] and b[2] < a[3]:
+            pairs.add((a[0], a[1], frozenset((a[4], b[4]))))
+    return pairs
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_find_overlaps_matches_brute_force(seed):
+    rows = _random_intervals(np.random.default_rng(seed))
+    conflicts = find_overlaps(rows)
+
+    found = [(c['type_conflit'], c['entite_id'], frozenset((c['examen_a'], c['examen_b']))) for c in conflicts]
+    assert len(found) == len(set(found))
+    assert set(found) == _brute_force(rows)
+
+    # Partie commune: du début le plus tardif à la fin la plus précoce
+    by_id = {row[4]: row for row in rows}
+    for conflict in conflicts:
+        a, b = by_id[conflict['examen_a']], by_id[conflict['examen_b']]
+        assert conflict['debut'] == from_minutes(max(a[2], b[2]))
+        assert conflict['fin'] == from_minutes(min(a[3], b[3]))
+
+
+def test_touching_intervals_do_not_overlap():
+    rows = [('SALLE', 1, 0, 60, 1), ('SALLE', 1, 60, 120, 2), ('SALLE', 2, 30, 90, 3)]
+    assert find_overlaps(rows) == []
+
+
+def test_split_parts_count_once_per_student():
+    start = datetime(2026, 6, 1, 8, 0)
+    exams = [
+        {'id': 1, 'module_id': 10, 'salle_id': 1, 'professeur_id': 1, 'date_heure': start, 'duree_minutes': 90},
+        {'id': 2, 'module_id': 10, 'salle_id': 2, 'professeur_id': 2, 'date_heure': start, 'duree_minutes': 90},
+        {'id': 3, 'module_id': 11, 'salle_id': 3, 'professeur_id': 3,
+         'date_heure': start + timedelta(minutes=60), 'duree_minutes': 60},
+    ]
+    conflicts = find_overlaps(exam_intervals(exams, {10: [100, 101], 11: [101]}))
+    assert [(c['type_conflit'], c['entite_id']) for c in conflicts] == [('ETUDIANT', 101)]
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_overlap_index_matches_brute_force(seed):
+    rng = np.random.default_rng(seed)
+    rows = _random_intervals(rng)
+    index = OverlapIndex()
+    for row in rows:
+        index.add(*row)
+
+    for kind, entity, start, end, exam_id in _random_intervals(rng, n=100):
+        expected = {row[4] for row in rows if row[:2] == (kind, entity) and row[2] < end and start < row[3]}
+        assert set(index.overlapping(kind, entity, start, end)) == expected
+
+    # Après retrait, l'intervalle n'est plus signalé
+    kind, entity, start, end, exam_id = rows[0]
+    assert index.remove(kind, entity, start, exam_id)
+    assert exam_id not in index.overlapping(kind, entity, start, end)
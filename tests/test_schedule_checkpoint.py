@@ -0,0 +1,75 @@
+"""
+Points de reprise: relecture fidèle du fichier, rejeu des placements et poursuite d'une amélioration
+"""
+import numpy as np
+import pytest
+
+from schedule_checkpoint import read_checkpoint, write_checkpoint
+
+PLACEMENT_KEYS = ('module_id', 'room_id', 'professor_id', 'exam_time', 'duration_minutes', 'student_count')
+
+
+def _placements(schedule):
+    return sorted(
+        tuple(exam[key] for key in PLACEMENT_KEYS) + (exam.get('part_index'), exam.get('part_count'))
+        for exam in schedule
+    )
+
+
+def test_roundtrip_keeps_placements_and_best_schedule(optimizer, tmp_path):
+    schedule = optimizer.generated_schedule
+    best = schedule[: len(schedule) // 2]
+    path = str(tmp_path / "generation.npz")
+
+    write_checkpoint(path, {'start_date': optimizer.start_date, 'modules_traites': 12}, schedule, best)
+    meta, restored = read_checkpoint(path)
+
+    assert meta['modules_traites'] == 12
+    assert meta['start_date'] == optimizer.start_date.isoformat()
+    assert _placements(restored) == _placements(schedule)
+    assert _placements(meta['meilleur_planning']) == _placements(best)
+    # Les parties d'un module réparti gardent leur groupe commun
+    groups = {exam['split_group'] for exam in schedule if exam.get('split_group')}
+    assert {exam['split_group'] for exam in restored if exam.get('split_group')} == groups
+
+
+def test_resume_replays_checkpointed_placements(university, optimizer, tmp_path):
+    path = str(tmp_path / "generation.npz")
+    optimizer.checkpoint_path = path
+    optimizer._write_checkpoint(len(optimizer.modules_data), len(optimizer.modules_data))
+    meta, schedule = read_checkpoint(path)
+    assert meta['non_places'] == len(optimizer.unplaced_modules)
+
+    resumed = university.to_optimizer()
+    resumed.generate_schedule(initial_schedule=schedule, seed=1)
+
+    assert _placements(resumed.generated_schedule) == _placements(optimizer.generated_schedule)
+    assert len(resumed.unplaced_modules) == len(optimizer.unplaced_modules)
+    assert resumed.score_report['global'] == pytest.approx(optimizer.score_report['global'])
+
+
+def test_improvement_state_is_saved_and_resumed(university, tmp_path):
+    path = str(tmp_path / "generation.npz")
+    first = university.to_optimizer(checkpoint_path=path)
+    first.checkpoint_interval = 0.0  # un point de reprise à chaque rapport d'avancement
+    first.generate_schedule(improvement='recuit', time_budget=1.5, seed=5)
+
+    meta, schedule = read_checkpoint(path)
+    state = meta['amelioration']
+    assert state['strategie'] == 'recuit'
+    assert state['graine'] == 5
+    assert state['statistiques']['iterations'] > 0
+    # L'état du générateur aléatoire survit à la sérialisation JSON
+    rng = np.random.default_rng()
+    rng.bit_generator.state = state['etat_aleatoire']
+
+    state['meilleur_planning'] = meta.get('meilleur_planning')
+    resumed = university.to_optimizer(checkpoint_path=path)
+    resumed.generate_schedule(initial_schedule=schedule, improvement=state['strategie'],
+                              time_budget=1.0, improvement_state=state)
+
+    stats = resumed.improvement_stats
+    assert stats['score_initial'] == round(state['score_initial'], 2)
+    assert stats['iterations'] >= state['statistiques']['iterations']
+    # Le meilleur planning enregistré n'est jamais perdu
+    assert stats['score_final'] >= round(state['meilleur_score'], 2) - 0.01
@@ -0,0 +1,76 @@
+"""
+ScoreTracker: le score tenu par différences doit rester égal à une réévaluation complète
+(ScheduleScorer.score_schedule) après une suite de mouvements proposés et appliqués
+"""
+import numpy as np
+import pytest
+
+
+def _by_module(schedule):
+    parts = {}
+    for exam in schedule:
+        parts.setdefault(exam['module_id'], []).append(exam)
+    return parts
+
+
+def _random_move(optimizer, parts, rng):
+    """Nouveau créneau commun, salles et surveillants tirés au hasard; parfois fusion des parties"""
+    slot = int(rng.integers(optimizer.calendar.n_slots))
+    if len(parts) > 1 and rng.random() < 0.3:
+        parts = [dict(parts[0], student_count=sum(p['student_count'] for p in parts))]
+    return [
+        dict(
+            part,
+            slot=slot,
+            room_id=optimizer.rooms[int(rng.integers(len(optimizer.rooms)))]['id'],
+            professor_id=optimizer.professors[int(rng.integers(len(optimizer.professors)))]['id'],
+        )
+        for part in parts
+    ]
+
+
+def test_initial_score_matches_full_rescore(optimizer):
+    scorer = optimizer._scorer()
+    tracker = scorer.tracker(optimizer.generated_schedule)
+    assert tracker.score == pytest.approx(scorer.score_schedule(optimizer.generated_schedule)['global'])
+
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_moves_match_full_rescore(optimizer, seed):
+    scorer = optimizer._scorer()
+    by_module = _by_module([dict(exam) for exam in optimizer.generated_schedule])
+    tracker = scorer.tracker([exam for parts in by_module.values() for exam in parts])
+    rng = np.random.default_rng(seed)
+    module_ids = sorted(by_module)
+
+    for _ in range(150):
+        module_id = module_ids[int(rng.integers(len(module_ids)))]
+        new_parts = _random_move(optimizer, by_module[module_id], rng)
+        proposal = tracker.propose(module_id, new_parts)
+
+        candidate = [e for m, parts in by_module.items() if m != module_id for e in parts] + new_parts
+        expected = scorer.score_schedule(candidate)
+        assert proposal['score'] == pytest.approx(expected['global'])
+
+        if rng.random() < 0.5:
+            tracker.commit(proposal)
+            by_module[module_id] = new_parts
+            alive = tracker.exam_scores()[tracker.part_alive]
+            assert np.sort(alive) == pytest.approx(np.sort(expected['par_examen']))
+
+    schedule = [exam for parts in by_module.values() for exam in parts]
+    assert tracker.score == pytest.approx(scorer.score_schedule(schedule)['global'])
+
+
+def test_propose_leaves_tracker_unchanged(optimizer):
+    scorer = optimizer._scorer()
+    tracker = scorer.tracker(optimizer.generated_schedule)
+    by_module = _by_module(optimizer.generated_schedule)
+    before = (tracker.score, tracker.module_day.copy(), tracker.prof_load.copy())
+
+    module_id = next(iter(by_module))
+    tracker.propose(module_id, _random_move(optimizer, by_module[module_id], np.random.default_rng(3)))
+
+    assert tracker.score == before[0]
+    assert np.array_equal(tracker.module_day, before[1])
+    assert np.array_equal(tracker.prof_load, before[2])
@@ -4,10 +4,13 @@ import pandas as pd
 
 from ui_theme import section_header, kpi_card, hero_header
 from connection import execute_query
+from clash_analysis import analyse_clashes
+from conflict_browser import render_conflict_browser
 from queries import (
     get_occupation_salles,
     get_stats_departement,
-    detecter_tous_les_conflits,
+    get_stats_departement_freshness,
+    compter_conflits_actifs,
     get_planning_examens,
     valider_tout_le_planning,
 )
@@ -121,9 +124,8 @@ def vice_doyen_dashboard():
             """
         ) or 0
 
-        # si detecter_conflits() n'existe pas mais detecter_tous_les_conflits() oui,
-        # laisse comme ça si ta DB a bien la fonction detecter_conflits()
-        conflits = q_scalar("SELECT COUNT(*) FROM detecter_conflits()") or 0
+        # Registre des conflits maintenu par triggers: simple comptage indexé
+        conflits = compter_conflits_actifs()
 
         # ✅ CORRECTION ICI : COUNT() -> COUNT(*)
         # + on calcule sur les examens planifiés/confirmés uniquement (plus logique pour un taux)
@@ -170,6 +172,9 @@ def vice_doyen_dashboard():
         if stats is None or stats.empty:
             st.info("Aucune statistique.")
         else:
+            refreshed_at = get_stats_departement_freshness()
+            if refreshed_at:
+                st.caption(f"🕒 Données au {refreshed_at:%d/%m/%Y %H:%M}")
             st.dataframe(stats, use_container_width=True, height=300 if not compact else 200)
 
     # =========================================================
@@ -177,12 +182,7 @@ def vice_doyen_dashboard():
     # =========================================================
     elif page == "📊 Conflits par sévérité":
         section_header("📊 Conflits par sévérité", "Priorisation")
-        conflits_df = detecter_tous_les_conflits()
-
-        if conflits_df is None or conflits_df.empty:
-            st.success("🎉 Aucun conflit détecté.")
-        else:
-            st.dataframe(conflits_df, use_container_width=True)
+        render_conflict_browser("vd_severite")
 
     # =========================================================
     # PAGE 3 : Analyse détaillée
@@ -190,17 +190,53 @@ def vice_doyen_dashboard():
     elif page == "⚠️ Analyse des conflits":
         section_header("🔍 Analyse détaillée", "Détection complète")
 
-        if st.button("🔍 Lancer l'analyse", type="primary"):
-            conflits_df = detecter_tous_les_conflits()
-            st.session_state["vd_conflits"] = conflits_df
-
-        conflits_df = st.session_state.get("vd_conflits", pd.DataFrame())
+        mode = st.radio("Mode d'analyse", ["Registre des conflits", "Analyse matricielle (distributions)"],
+                        horizontal=True)
 
-        if conflits_df is None or conflits_df.empty:
-            st.success("🎉 Aucun conflit détecté.")
+        if mode == "Registre des conflits":
+            render_conflict_browser("vd_analyse")
         else:
-            st.error(f"{len(conflits_df)} conflit(s) détecté(s)")
-            st.dataframe(conflits_df, use_container_width=True)
+            c1, c2 = st.columns(2)
+            with c1:
+                debut = st.date_input("Début", value=None, key="vd_clash_debut")
+            with c2:
+                fin = st.date_input("Fin", value=None, key="vd_clash_fin")
+
+            if st.button("🧮 Lancer l'analyse matricielle", type="primary"):
+                with st.spinner("Calcul des matrices étudiants x modules x créneaux..."):
+                    st.session_state["vd_clash"] = analyse_clashes(debut, fin)
+
+            analyse = st.session_state.get("vd_clash")
+            if analyse is not None:
+                resume = analyse.summary()
+                k1, k2, k3, k4 = st.columns(4)
+                with k1:
+                    kpi_card("🎓 Étudiants", f"{resume['etudiants']:,}", f"{resume['seances']:,} séances")
+                with k2:
+                    kpi_card("📅 Plusieurs examens/jour", f"{resume['etudiants_plusieurs_examens_jour']:,}",
+                             f"{resume['journees_en_conflit']:,} journées",
+                             "danger" if resume['etudiants_plusieurs_examens_jour'] else "ok")
+                with k3:
+                    kpi_card("⏱️ Chevauchements", f"{resume['etudiants_chevauchement']:,}", "étudiants",
+                             "danger" if resume['etudiants_chevauchement'] else "ok")
+                with k4:
+                    kpi_card("⚡ Calcul", f"{resume['duree_analyse_s']} s")
+
+                tab1, tab2, tab3, tab4 = st.tabs(["Examens par jour", "Chevauchements", "Charge quotidienne", "Violations"])
+                with tab1:
+                    distribution = analyse.day_distribution()
+                    st.dataframe(distribution, use_container_width=True, hide_index=True)
+                    if not distribution.empty:
+                        st.bar_chart(distribution.set_index("examens_par_jour")["etudiants_pire_journee"])
+                with tab2:
+                    st.dataframe(analyse.overlap_distribution(), use_container_width=True, hide_index=True)
+                with tab3:
+                    charge = analyse.daily_load()
+                    st.dataframe(charge, use_container_width=True, hide_index=True)
+                    if not charge.empty:
+                        st.line_chart(charge.set_index("jour")[["etudiants", "etudiants_multi_examens"]])
+                with tab4:
+                    st.dataframe(analyse.violations(), use_container_width=True, hide_index=True)
 
     # =========================================================
     # PAGE 4 : VALIDATION FINALE
@@ -208,7 +244,7 @@ def vice_doyen_dashboard():
     elif page == "✅ Validation finale EDT":
         section_header("✅ Validation finale du planning", "Décision institutionnelle")
 
-        conflits_val = int(q_scalar("SELECT COUNT(*) FROM detecter_conflits()") or 0)
+        conflits_val = compter_conflits_actifs()
 
         # 1) Essai via queries.py
         planning = get_planning_examens()